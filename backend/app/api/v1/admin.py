@@ -9,7 +9,14 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, File, UploadFile,
 from fastapi.responses import StreamingResponse
 from app.models.case import UpdateRequest, OrganizationType
 from app.services.scraper_service import scraper_service
-from app.services.task_service import task_service, create_update_cases_task, create_update_details_task, TaskType
+from app.services.task_service import task_service, create_update_cases_task, create_update_details_task, create_compaction_task, TaskType
+from app.services.dataset_cache import dataset_cache
+from app.services.snapshot_store import snapshot_store
+from app.services.csv_reader import read_csv_files
+from app.services.case_store import case_store
+from app.services.case_service import case_service
+from app.services.query_cache import query_cache
+from app.services.compaction_service import compaction_service, COMPACT_FAMILIES
 from app.core.database import db_manager
 from app.core.config import settings
 from pymongo import MongoClient
@@ -86,24 +93,12 @@ def get_cbircdetail(orgname=""):
 
 
 def get_csvdf(penfolder, beginwith):
-    """Read CSV files matching pattern from root directory only"""
+    """Read data files matching pattern from root directory only.
+    Files covered by the Parquet snapshot are read from it, newer ones from CSV.
+    """
     # 只读取根目录下的文件，不递归查找子目录
-    files = glob.glob(os.path.join(penfolder, f"{beginwith}*.csv"))
-    
-    dflist = []
-    for filepath in files:
-        try:
-            pendf = pd.read_csv(filepath)
-            dflist.append(pendf)
-        except Exception as e:
-            logger.warning(f"Failed to read {filepath}: {e}")
-    
-    if len(dflist) > 0:
-        df = pd.concat(dflist)
-        df.reset_index(drop=True, inplace=True)
-    else:
-        df = pd.DataFrame()
-    return df
+    files = sorted(glob.glob(os.path.join(penfolder, f"{beginwith}*.csv")))
+    return snapshot_store.load(files, read_csv_files)
 
 def get_cbircdetail(orgname=""):
     """Get CBIRC detail data"""
@@ -550,13 +545,126 @@ async def get_case_detail_summary_by_org(org_name: str):
 async def refresh_data():
     """Refresh cached data"""
     try:
-        # Clear any caches if implemented
+        # Drop parsed datasets so the next request re-reads the data folder
+        dataset_cache.invalidate()
+        case_store.invalidate()
+        query_cache.clear()
         return {"message": "Data refresh completed"}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/build-snapshot")
+async def build_snapshot():
+    """Compact the CSV files in the data folder into a Parquet snapshot"""
+    try:
+        if not snapshot_store.available:
+            raise HTTPException(status_code=503, detail="pyarrow is not installed")
+        manifest = await asyncio.to_thread(snapshot_store.build, DATA_FOLDER)
+        return {
+            "message": "Snapshot build completed",
+            "built_at": manifest.get("built_at"),
+            "families": {
+                family: {"rows": info["rows"], "files": len(info["sources"])}
+                for family, info in manifest.get("families", {}).items()
+            },
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Snapshot build failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/compact-data")
+async def compact_data(
+    background_tasks: BackgroundTasks,
+    org_name: Optional[str] = Query(None, description="Organization to compact, all when omitted")
+):
+    """Merge timestamped CSV fragments into per-org, per-month segments"""
+    try:
+        org_code = org2name.get(org_name or "")
+        if org_code is None:
+            raise HTTPException(status_code=400, detail=f"Unknown organization: {org_name}")
+        if compaction_service.status(DATA_FOLDER)["running"]:
+            raise HTTPException(status_code=409, detail="Compaction is already running")
+
+        task = create_compaction_task(org_name or "")
+        background_tasks.add_task(_run_compaction_with_tracking, task.id, org_code)
+        return {
+            "task_id": task.id,
+            "message": "Compaction task started",
+            "org_name": org_name or "",
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/compaction-status")
+async def get_compaction_status():
+    """Get segment/fragment counts per prefix and the last compaction result"""
+    try:
+        return compaction_service.status(DATA_FOLDER)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/snapshot-manifest")
+async def get_snapshot_manifest():
+    """Get the Parquet snapshot manifest for the data folder"""
+    try:
+        return snapshot_store.read_manifest(DATA_FOLDER)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get dataset cache hit/miss/rebuild counters, case view status and query cache hit ratio"""
+    try:
+        return {**dataset_cache.stats(), "case_view": case_store.stats(), "query_cache": query_cache.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/memory-report")
+async def get_memory_report():
+    """Get resident memory of the case view per column"""
+    try:
+        return case_store.memory_report()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/index-stats")
+async def get_index_stats():
+    """Get index usage counters and provisioning status for MongoDB collections"""
+    try:
+        if not db_manager.client:
+            raise HTTPException(status_code=503, detail="Database not connected")
+        return await db_manager.get_index_stats()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/ensure-indexes")
+async def ensure_indexes():
+    """Create missing or changed MongoDB indexes"""
+    try:
+        if not db_manager.client:
+            raise HTTPException(status_code=503, detail="Database not connected")
+        return await db_manager.ensure_indexes()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/reconnect-database")
 async def reconnect_database():
     """Reconnect to MongoDB database"""
@@ -664,82 +772,14 @@ async def get_task(task_id: str):
 async def get_classification_stats():
     """Get classification statistics"""
     try:
-        # Get CBIRC detail data (all organizations)
-        newdf = get_cbircdetail("")
-        
-        if newdf.empty:
+        # Served from the aggregate cube of the case view (all organizations)
+        stats = await case_service.get_classification_stats()
+        if not stats["total_cases"]:
             logger.warning("No detail data found for stats")
-            return {
-                "total_cases": 0,
-                "categorized_cases": 0,
-                "uncategorized_cases": 0,
-                "categories": {},
-                "monthly_stats": {}
-            }
         
-        # Get categorized data
-        amtdf = get_cbirccat()
+        logger.info(f"Classification stats: {stats['total_cases']} total, {stats['categorized_cases']} categorized, {stats['uncategorized_cases']} uncategorized")
         
-        # Calculate basic statistics - use unique IDs only
-        total_cases = newdf["id"].nunique() if "id" in newdf.columns else len(newdf)
-        
-        if amtdf.empty:
-            categorized_cases = 0
-            categorized_ids = []
-        else:
-            categorized_ids = amtdf["id"].tolist() if "id" in amtdf.columns else []
-            # Count unique categorized IDs only
-            categorized_cases = amtdf["id"].nunique() if "id" in amtdf.columns else 0
-        
-        uncategorized_cases = total_cases - categorized_cases
-        
-        # Calculate category distribution
-        categories = {}
-        if not amtdf.empty and "industry" in amtdf.columns:
-            category_counts = amtdf["industry"].value_counts().to_dict()
-            categories = {str(k): int(v) for k, v in category_counts.items() if pd.notna(k) and k != ""}
-        
-        # Calculate monthly statistics
-        monthly_stats = {}
-        if "发布日期" in newdf.columns:
-            try:
-                # Convert date column to datetime if it's not already
-                newdf_copy = newdf.copy()
-                if newdf_copy["发布日期"].dtype == 'object':
-                    newdf_copy["发布日期"] = pd.to_datetime(newdf_copy["发布日期"], errors='coerce')
-                
-                # Group by year-month
-                newdf_copy["year_month"] = newdf_copy["发布日期"].dt.to_period('M')
-                monthly_counts = newdf_copy.groupby("year_month").size()
-                
-                # Calculate categorized cases per month
-                if not amtdf.empty and "id" in amtdf.columns:
-                    categorized_monthly = newdf_copy[newdf_copy["id"].isin(categorized_ids)].groupby("year_month").size()
-                else:
-                    categorized_monthly = pd.Series(dtype=int)
-                
-                # Build monthly stats dictionary
-                for period in monthly_counts.index:
-                    month_str = str(period)
-                    total_month = int(monthly_counts[period])
-                    categorized_month = int(categorized_monthly.get(period, 0))
-                    monthly_stats[month_str] = {
-                        "total": total_month,
-                        "categorized": categorized_month
-                    }
-            except Exception as e:
-                logger.warning(f"Failed to calculate monthly stats: {e}")
-                monthly_stats = {}
-        
-        logger.info(f"Classification stats: {total_cases} total, {categorized_cases} categorized, {uncategorized_cases} uncategorized")
-        
-        return {
-            "total_cases": total_cases,
-            "categorized_cases": categorized_cases,
-            "uncategorized_cases": uncategorized_cases,
-            "categories": categories,
-            "monthly_stats": monthly_stats
-        }
+        return stats
         
     except Exception as e:
         logger.error(f"Error in get_classification_stats: {str(e)}")
@@ -1084,6 +1124,31 @@ async def _run_scrape_cases_with_tracking(task_id: str, org_name: str, start_pag
         logger.error(f"Task {task_id} failed: {str(e)}")
 
 
+async def _run_compaction_with_tracking(task_id: str, org_code: str):
+    """Run data file compaction with task tracking"""
+    try:
+        task_service.start_task(task_id)
+        result = await asyncio.to_thread(compaction_service.compact, DATA_FOLDER, org_code or None)
+
+        # Keep an existing Parquet snapshot in step with the new segment files
+        if snapshot_store.available and snapshot_store.read_manifest(DATA_FOLDER).get("families"):
+            task_service.update_task_progress(task_id, 80)
+            await asyncio.to_thread(snapshot_store.build, DATA_FOLDER, COMPACT_FAMILIES)
+
+        prefixes = result["prefixes"]
+        task_service.complete_task(task_id, {
+            "status": "completed",
+            "fragments": sum(p["fragments"] for p in prefixes.values()),
+            "rows": sum(p["rows"] for p in prefixes.values()),
+            "segments_written": sum(len(p["segments_written"]) for p in prefixes.values()),
+            "seconds": result["seconds"],
+            "prefixes": prefixes,
+        })
+    except Exception as e:
+        task_service.fail_task(task_id, str(e))
+        logger.error(f"Task {task_id} failed: {str(e)}")
+
+
 async def _run_update_details_with_tracking(task_id: str, org_name: str):
     """Run update details with task tracking"""
     try:
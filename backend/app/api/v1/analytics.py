@@ -5,6 +5,7 @@ import io
 import pandas as pd
 from app.models.case import MonthlyTrend, RegionalStats, CaseSearchRequest
 from app.services.case_service import case_service
+from app.services.case_store import case_store
 
 router = APIRouter()
 
@@ -75,139 +76,55 @@ async def export_cases_csv(
         print(f"Has filters: {has_filters}")
         
         if has_filters:
-            # For export, bypass the pagination limits by directly calling case service methods
-            # Get the data directly without going through CaseSearchRequest pagination
+            # For export, bypass pagination: filter the shared case view with the search pipeline
+            search_request = CaseSearchRequest(
+                start_date=start_date or date_start,
+                end_date=end_date or date_end,
+                title_text=title_text or "",
+                wenhao_text=wenhao_text or "",
+                people_text=people_text or "",
+                event_text=event_text or "",
+                law_text=law_text or "",
+                penalty_text=penalty_text or "",
+                org_text=org_text or "",
+                industry=industry or "",
+                province=province or "",
+                keyword=keyword or "",
+                min_penalty=min_penalty or 0,
+                org_name=org_name or "",
+            )
+            filtered_df = await case_service.find_cases(search_request)
+            filtered_df = case_store.with_text(filtered_df)
             
-            # Get combined data
-            detail_df = await case_service.get_case_detail(org_name or "")
-            if detail_df.empty and org_name:
-                detail_df = await case_service.get_case_detail("")
-            
-            analysis_df = await case_service.get_case_analysis(org_name or "")
-            category_df = await case_service.get_case_categories()
-            
-            if detail_df.empty:
+            if filtered_df.empty:
                 df = pd.DataFrame(columns=[
                     'id', 'title', 'subtitle', 'publish_date', 'content', 'summary',
                     'wenhao', 'people', 'event', 'law', 'penalty', 'org',
                     'penalty_date', 'category', 'amount', 'province', 'industry'
                 ])
             else:
-                # Merge dataframes
-                merged_df = detail_df.copy()
-                if not analysis_df.empty:
-                    merged_df = pd.merge(merged_df, analysis_df, on="id", how="left")
-                if not category_df.empty:
-                    merged_df = pd.merge(merged_df, category_df, on="id", how="left")
-                
-                # Apply filters directly to the DataFrame using the same logic as search
-                filtered_df = merged_df.copy()
-                
-                # Helper function for text filtering (same as case_service)
-                def split_words(text: str) -> str:
-                    """Split string by space into words, add regex patterns"""
-                    if not text:
-                        return ""
-                    words = text.split()
-                    words = ["(?=.*" + word + ")" for word in words]
-                    return "".join(words)
-                
-                # Apply date filters
-                if start_date:
-                    filtered_df = filtered_df[filtered_df['发布日期'] >= start_date]
-                if end_date:
-                    filtered_df = filtered_df[filtered_df['发布日期'] <= end_date]
-                
-                # Apply text filters using same logic as search
-                text_filters = [
-                    ("wenhao", wenhao_text),
-                    ("people", people_text),
-                    ("event", event_text),
-                    ("law", law_text),
-                    ("penalty", penalty_text),
-                    ("org", org_text),
-                    ("industry", industry),
-                    ("province", province),
-                ]
-                
-                for column, text in text_filters:
-                    if text and column in filtered_df.columns:
-                        pattern = split_words(text)
-                        if pattern:
-                            filtered_df = filtered_df[
-                                filtered_df[column].astype(str).str.contains(pattern, case=False, na=False, regex=True)
-                            ]
-                
-                # Title filter
-                if title_text and "标题" in filtered_df.columns:
-                    title_pattern = split_words(title_text)
-                    if title_pattern:
-                        filtered_df = filtered_df[
-                            filtered_df["标题"].astype(str).str.contains(title_pattern, case=False, na=False, regex=True)
-                        ]
-                
-                # Amount filter
-                if min_penalty and min_penalty > 0 and "amount" in filtered_df.columns:
-                    filtered_df = filtered_df[
-                        pd.to_numeric(filtered_df["amount"], errors='coerce').fillna(0) >= min_penalty
-                    ]
-                
-                # General keyword filter across multiple fields
-                if keyword:
-                    keyword_pattern = split_words(keyword)
-                    if keyword_pattern:
-                        candidate_columns = [
-                            "标题", "文号", "内容", "wenhao", "people", "event",
-                            "law", "penalty", "org", "province", "industry", "category"
-                        ]
-                        existing_columns = [c for c in candidate_columns if c in filtered_df.columns]
-                        if existing_columns:
-                            mask = pd.Series(False, index=filtered_df.index)
-                            for col in existing_columns:
-                                mask = mask | filtered_df[col].astype(str).str.contains(keyword_pattern, case=False, na=False, regex=True)
-                            filtered_df = filtered_df[mask]
-                
-                # Sort by date descending (same as search)
-                if "发布日期" in filtered_df.columns and filtered_df["发布日期"].notna().any():
-                    filtered_df = filtered_df.sort_values(["发布日期", "id"], ascending=[False, False])
-                elif "id" in filtered_df.columns:
-                    filtered_df = filtered_df.sort_values("id", ascending=False)
-                
-                # Remove duplicates (same as search)
-                if "id" in filtered_df.columns:
-                    filtered_df = filtered_df.drop_duplicates(subset=["id"])
-                
-                filtered_df = filtered_df.reset_index(drop=True)
-                
                 print(f"Filtered DataFrame: {len(filtered_df)} rows")
                 
                 # Convert to export format
-                if not filtered_df.empty:
-                    df = pd.DataFrame({
-                        'id': filtered_df['id'].astype(str) if 'id' in filtered_df.columns else '',
-                        'title': filtered_df['标题'].astype(str) if '标题' in filtered_df.columns else '',
-                        'subtitle': filtered_df['文号'].astype(str) if '文号' in filtered_df.columns else '',
-                        'publish_date': filtered_df['发布日期'].astype(str) if '发布日期' in filtered_df.columns else '',
-                        'content': filtered_df['内容'].astype(str) if '内容' in filtered_df.columns else '',
-                        'summary': filtered_df['summary'].astype(str) if 'summary' in filtered_df.columns else '',
-                        'wenhao': filtered_df['wenhao'].astype(str) if 'wenhao' in filtered_df.columns else '',
-                        'people': filtered_df['people'].astype(str) if 'people' in filtered_df.columns else '',
-                        'event': filtered_df['event'].astype(str) if 'event' in filtered_df.columns else '',
-                        'law': filtered_df['law'].astype(str) if 'law' in filtered_df.columns else '',
-                        'penalty': filtered_df['penalty'].astype(str) if 'penalty' in filtered_df.columns else '',
-                        'org': filtered_df['org'].astype(str) if 'org' in filtered_df.columns else '',
-                        'penalty_date': filtered_df['penalty_date'].astype(str) if 'penalty_date' in filtered_df.columns else '',
-                        'category': filtered_df['category'].astype(str) if 'category' in filtered_df.columns else '',
-                        'amount': pd.to_numeric(filtered_df['amount'], errors='coerce').fillna(0) if 'amount' in filtered_df.columns else 0,
-                        'province': filtered_df['province'].astype(str) if 'province' in filtered_df.columns else '',
-                        'industry': filtered_df['industry'].astype(str) if 'industry' in filtered_df.columns else '',
-                    })
-                else:
-                    df = pd.DataFrame(columns=[
-                        'id', 'title', 'subtitle', 'publish_date', 'content', 'summary',
-                        'wenhao', 'people', 'event', 'law', 'penalty', 'org',
-                        'penalty_date', 'category', 'amount', 'province', 'industry'
-                    ])
+                df = pd.DataFrame({
+                    'id': filtered_df['id'].astype(str) if 'id' in filtered_df.columns else '',
+                    'title': filtered_df['标题'].astype(str) if '标题' in filtered_df.columns else '',
+                    'subtitle': filtered_df['文号'].astype(str) if '文号' in filtered_df.columns else '',
+                    'publish_date': filtered_df['发布日期'].astype(str) if '发布日期' in filtered_df.columns else '',
+                    'content': filtered_df['内容'].astype(str) if '内容' in filtered_df.columns else '',
+                    'summary': filtered_df['summary'].astype(str) if 'summary' in filtered_df.columns else '',
+                    'wenhao': filtered_df['wenhao'].astype(str) if 'wenhao' in filtered_df.columns else '',
+                    'people': filtered_df['people'].astype(str) if 'people' in filtered_df.columns else '',
+                    'event': filtered_df['event'].astype(str) if 'event' in filtered_df.columns else '',
+                    'law': filtered_df['law'].astype(str) if 'law' in filtered_df.columns else '',
+                    'penalty': filtered_df['penalty'].astype(str) if 'penalty' in filtered_df.columns else '',
+                    'org': filtered_df['org'].astype(str) if 'org' in filtered_df.columns else '',
+                    'penalty_date': filtered_df['penalty_date'].astype(str) if 'penalty_date' in filtered_df.columns else '',
+                    'category': filtered_df['category'].astype(str) if 'category' in filtered_df.columns else '',
+                    'amount': filtered_df['amount'].fillna(0) if 'amount' in filtered_df.columns else 0,
+                    'province': filtered_df['province'].astype(str) if 'province' in filtered_df.columns else '',
+                    'industry': filtered_df['industry'].astype(str) if 'industry' in filtered_df.columns else '',
+                })
         else:
             # Get all case data when no filters
             print("Getting all case data")
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List
-from app.models.case import CaseDetail, CaseSummary, CaseStats, OrganizationType
+from app.models.case import (
+    CaseDetail, CaseSummary, CaseStats, OrganizationType, CaseBatchRequest, CaseBatchResponse,
+    SimilarCasesResponse, NearDuplicatesResponse
+)
 from app.services.case_service import case_service
 
 router = APIRouter()
@@ -45,58 +48,54 @@ async def get_case_detail(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/batch", response_model=CaseBatchResponse)
+async def get_cases_batch(batch_request: CaseBatchRequest):
+    """Get several cases by ID in one request, in request order"""
+    try:
+        cases, missing = await case_service.get_cases_by_ids(batch_request.ids)
+        return CaseBatchResponse(cases=cases, missing=missing)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/duplicates", response_model=NearDuplicatesResponse)
+async def get_near_duplicate_cases(
+    limit: int = Query(50, ge=1, le=500, description="Number of clusters")
+):
+    """Get clusters of near-duplicate cases (republished or lightly edited decisions)"""
+    try:
+        return await case_service.get_near_duplicates(limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{case_id}/similar", response_model=SimilarCasesResponse)
+async def get_similar_cases(
+    case_id: str,
+    limit: int = Query(10, ge=1, le=100, description="Number of similar cases")
+):
+    """Get the cases most similar to a case (TF-IDF over facts and full text)"""
+    try:
+        cases = await case_service.similar_to_case(case_id, limit)
+        if cases is None:
+            raise HTTPException(status_code=404, detail="Case not found")
+        return SimilarCasesResponse(cases=cases)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{case_id}", response_model=CaseDetail)
 async def get_case_by_id(case_id: str):
     """Get specific case by ID"""
     try:
-        # Get all case details
-        df = await case_service.get_case_detail("")
-        analysis_df = await case_service.get_case_analysis("")
-        category_df = await case_service.get_case_categories()
-        
-        # Find the specific case
-        case_row = df[df["id"] == case_id]
-        if case_row.empty:
+        case = await case_service.get_case(case_id)
+        if case is None:
             raise HTTPException(status_code=404, detail="Case not found")
-        
-        # Merge with additional data
-        if not analysis_df.empty:
-            analysis_row = analysis_df[analysis_df["id"] == case_id]
-            if not analysis_row.empty:
-                for col in analysis_row.columns:
-                    if col != "id":
-                        case_row[col] = analysis_row[col].iloc[0]
-        
-        if not category_df.empty:
-            category_row = category_df[category_df["id"] == case_id]
-            if not category_row.empty:
-                for col in category_row.columns:
-                    if col != "id":
-                        case_row[col] = category_row[col].iloc[0]
-        
-        # Convert to CaseDetail model
-        row = case_row.iloc[0]
-        return CaseDetail(
-            id=str(row.get("id", "")),
-            title=str(row.get("标题", "")),
-            subtitle=str(row.get("文号", "")),
-            publish_date=row.get("发布日期"),
-            content=str(row.get("内容", "")),
-            summary=str(row.get("summary", "")),
-            wenhao=str(row.get("wenhao", "")),
-            people=str(row.get("people", "")),
-            event=str(row.get("event", "")),
-            law=str(row.get("law", "")),
-            penalty=str(row.get("penalty", "")),
-            org=str(row.get("org", "")),
-            penalty_date=row.get("penalty_date"),
-            category=str(row.get("category", "")),
-            amount=float(row.get("amount", 0)) if row.get("amount") else 0,
-            province=str(row.get("province", "")),
-            industry=row.get("industry")
-        )
+        return case
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,20 +1,76 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import Response
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal
 from app.services.case_service import case_service
+from app.services.case_store import normalize_ids, decode_categoricals
 from app.core.database import db_manager
 from app.core.config import settings
 from app.models.case import CaseSearchRequest, CaseSearchResponse, CaseDetail
+from app.services.online_query import (
+    SEARCH_TOKEN_FIELD, backfill_search_tokens, build_online_query, search_tokens, uses_text_index
+)
 import pandas as pd
 from datetime import datetime, date
 import logging
 import asyncio
+import base64
+import hashlib
+import time
 import re
 import math
+from bson import json_util
+from pymongo import DESCENDING
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Online search order, served by the publish_date_id index
+ONLINE_SORT = [("发布日期", DESCENDING), ("id", DESCENDING)]
+# Exact totals per query hash, so paging through one query counts it once
+TOTAL_CACHE_SECONDS = 300
+TOTAL_CACHE_SIZE = 256
+_total_cache: Dict[str, Any] = {}
+
+
+def _encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque cursor holding the sort key of the last document of a page"""
+    raw = json_util.dumps([doc.get("发布日期"), doc.get("id")])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _cursor_filter(cursor: str) -> Dict[str, Any]:
+    """Query for the documents that sort after the cursor position.
+    Assumes 发布日期 values of one BSON type, with missing dates sorting last.
+    """
+    try:
+        last_date, last_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if last_date is None:
+        return {"发布日期": None, "id": {"$lt": last_id}}
+    return {"$or": [
+        {"发布日期": {"$lt": last_date}},
+        {"发布日期": last_date, "id": {"$lt": last_id}},
+        {"发布日期": None},
+    ]}
+
+
+async def _cached_total(collection, query: Dict[str, Any], exact: bool) -> int:
+    """Exact match count, cached per query; without exact, only a cached or
+    cheaply estimated count is returned (-1 when unknown).
+    """
+    key = hashlib.sha1(json_util.dumps(query, sort_keys=True).encode("utf-8")).hexdigest()
+    cached = _total_cache.get(key)
+    if cached is not None and time.time() - cached[0] < TOTAL_CACHE_SECONDS:
+        return cached[1]
+    if not exact:
+        return await collection.estimated_document_count() if not query else -1
+    total = await collection.count_documents(query)
+    if len(_total_cache) >= TOTAL_CACHE_SIZE:
+        _total_cache.pop(next(iter(_total_cache)))
+    _total_cache[key] = (time.time(), total)
+    return total
+
 
 @router.get("/health")
 async def check_online_health():
@@ -77,7 +133,8 @@ async def get_online_data_with_timeout(timeout: int = 10):
         
         # Use async timeout for MongoDB operations
         online_collection = db_manager.get_collection(settings.MONGODB_COLLECTION)
-        cursor = online_collection.find({})
+        # Callers only compare ids, so skip the rest of each document
+        cursor = online_collection.find({}, {"id": 1, "_id": 0})
         
         # Convert cursor to list with timeout
         online_data_list = await asyncio.wait_for(cursor.to_list(length=None), timeout=timeout)
@@ -144,38 +201,23 @@ def get_online_ids_sync_with_timeout(timeout: int = 10) -> List[str]:
 async def get_online_stats():
     """获取案例数据统计 - 参考uplink_cbircsum函数逻辑"""
     try:
-        # 1. 获取事件数据 (对应uplink_cbircsum中的eventdf)
-        detail_df = await case_service.get_case_detail("")
-        # 去重处理
-        detail_df_dedup = detail_df.drop_duplicates(subset=["id"]) if not detail_df.empty else pd.DataFrame()
-        
-        # 2. 获取分析数据 (对应uplink_cbircsum中的analysisdf)
-        analysis_df = await case_service.get_case_analysis("")
-        # 去重处理
-        analysis_df_dedup = analysis_df.drop_duplicates(subset=["id"]) if not analysis_df.empty else pd.DataFrame()
-        
-        # 3. 获取分类数据 (对应uplink_cbircsum中的amountdf，通过get_cbirccat获取)
-        category_df = await case_service.get_case_categories()
-        # 去重处理
-        category_df_dedup = category_df.drop_duplicates(subset=["id"]) if not category_df.empty else pd.DataFrame()
-        
-        # 4. 计算事件数据统计 (使用去重后的数据避免冗余统计)
-        event_data = {
-            "count": len(detail_df_dedup) if not detail_df_dedup.empty else 0,
-            "unique_ids": detail_df_dedup["id"].nunique() if not detail_df_dedup.empty and "id" in detail_df_dedup.columns else 0
-        }
+        # 1-3. 物化案例视图 (事件/分析/分类数据按id合并且去重，对应uplink_cbircsum中的eventdf/analysisdf/amountdf)
+        case_view = await case_service.get_case_view(require_detail=False)
+        has_detail = case_view["has_detail"] if not case_view.empty else pd.Series(dtype=bool)
+        has_analysis = case_view["has_analysis"] if not case_view.empty else pd.Series(dtype=bool)
+        has_category = case_view["has_category"] if not case_view.empty else pd.Series(dtype=bool)
         
-        # 5. 计算分析数据统计 (使用去重后的数据避免冗余统计)
-        analysis_data = {
-            "count": len(analysis_df_dedup) if not analysis_df_dedup.empty else 0,
-            "unique_ids": analysis_df_dedup["id"].nunique() if not analysis_df_dedup.empty and "id" in analysis_df_dedup.columns else 0
-        }
+        # 4. 计算事件数据统计 (视图中id唯一，避免冗余统计)
+        event_count = int(has_detail.sum())
+        event_data = {"count": event_count, "unique_ids": event_count}
+        
+        # 5. 计算分析数据统计
+        analysis_count = int(has_analysis.sum())
+        analysis_data = {"count": analysis_count, "unique_ids": analysis_count}
         
         # 6. 计算分类数据统计 (对应uplink_cbircsum中的amountdf)
-        amount_data = {
-            "count": len(category_df) if not category_df.empty else 0,
-            "unique_ids": category_df["id"].nunique() if not category_df.empty and "id" in category_df.columns else 0
-        }
+        amount_count = int(has_category.sum())
+        amount_data = {"count": amount_count, "unique_ids": amount_count}
         
         # 7. 获取在线数据统计 (对应uplink_cbircsum中的online_data)
         online_data = {"count": 0, "unique_ids": 0}
@@ -191,24 +233,16 @@ async def get_online_stats():
         
         # 8. 计算差异数据 (完全按照uplink_cbircsum函数的逻辑)
         diff_data = {"count": 0, "unique_ids": 0}
-        if not analysis_df_dedup.empty:
-            # 合并分析数据和事件数据 (对应uplink_cbircsum中的alldf = pd.merge(analysisdf, eventdf, on="id", how="left"))
-            if not detail_df_dedup.empty:
-                merged_df = pd.merge(analysis_df_dedup, detail_df_dedup, on="id", how="left")
-            else:
-                merged_df = analysis_df_dedup.copy()
-            
-            # 然后合并分类数据（包含新增字段）(对应uplink_cbircsum中的alldf = pd.merge(alldf, amountdf, on="id", how="left"))
-            if not category_df_dedup.empty:
-                merged_df = pd.merge(merged_df, category_df_dedup, on="id", how="left")
-                logger.info("Merged category data with new fields for stats calculation")
+        if analysis_count:
+            # 分析数据为主的合并结果 (对应uplink_cbircsum中的alldf = pd.merge(analysisdf, eventdf, on="id", how="left")，再合并amountdf)
+            merged_df = case_view[has_analysis]
             
             # Get online data with timeout - try to get IDs only for better performance
             online_data_list = await get_online_data_with_timeout(timeout=20)  # Increased timeout
             
             if online_data_list:
                 # 筛选出未上线的数据 (对应uplink_cbircsum中的diff_data = alldf[~alldf["id"].isin(online_data["id"])])
-                online_ids = set(doc.get("id") for doc in online_data_list if doc.get("id"))
+                online_ids = set(normalize_ids(pd.Series([doc.get("id") for doc in online_data_list if doc.get("id")], dtype=object)))
                 diff_data_filtered = merged_df[~merged_df["id"].isin(online_ids)]
                 
                 # 进一步筛选有违法事实的案例 (对应uplink_cbircsum中的diff_data4 = diff_data3[diff_data3["主要违法违规事实"].notnull()])
@@ -223,9 +257,12 @@ async def get_online_stats():
                     # 如果没有event字段，使用所有未上线的数据
                     diff_data_with_events = diff_data_df
                 
+                # 未上线案例中与已上线案例或其他未上线案例近似重复的数量
+                near_duplicates = case_service.near_duplicate_ids(diff_data_with_events, list(online_ids))
                 diff_data = {
                     "count": len(diff_data_with_events),
-                    "unique_ids": diff_data_with_events["id"].nunique() if not diff_data_with_events.empty else 0
+                    "unique_ids": diff_data_with_events["id"].nunique() if not diff_data_with_events.empty else 0,
+                    "near_duplicates": int(near_duplicates.notna().sum())
                 }
                 
                 logger.info(f"Diff calculation: Total merged: {len(merged_df)}, Online IDs: {len(online_ids)}, Filtered: {len(diff_data_filtered)}, With events: {len(diff_data_with_events)}")
@@ -237,9 +274,11 @@ async def get_online_stats():
                 else:
                     diff_data_with_events = merged_df
                 
+                near_duplicates = case_service.near_duplicate_ids(diff_data_with_events)
                 diff_data = {
                     "count": len(diff_data_with_events),
-                    "unique_ids": diff_data_with_events["id"].nunique() if not diff_data_with_events.empty else 0
+                    "unique_ids": diff_data_with_events["id"].nunique() if not diff_data_with_events.empty else 0,
+                    "near_duplicates": int(near_duplicates.notna().sum())
                 }
                 
                 logger.warning(f"Could not access online data for diff calculation, using all local data with events: {len(diff_data_with_events)}")
@@ -273,32 +312,22 @@ async def get_case_diff_data():
             logger.warning("Database not connected")
             return []
         
-        # Get case detail, analysis data, and category data
-        detail_df = await case_service.get_case_detail("")
-        analysis_df = await case_service.get_case_analysis("")
-        category_df = await case_service.get_case_categories()  # Get category data with new fields
+        # Joined case view: detail + analysis + category (amount, industry, category, province)
+        merged_df = await case_service.get_case_view()
         
-        if detail_df.empty:
+        if merged_df.empty:
             return []
         
-        # Merge with analysis data if available
-        merged_df = detail_df.copy()
-        if not analysis_df.empty:
-            merged_df = pd.merge(merged_df, analysis_df, on="id", how="left")
-        
-        # Merge with category data (containing new fields: amount, industry, category, province)
-        if not category_df.empty:
-            merged_df = pd.merge(merged_df, category_df, on="id", how="left")
-            logger.info("Merged category data with new fields for diff data")
-        
         # Get online data from MongoDB with timeout
         online_data_list = await get_online_data_with_timeout(timeout=20)
         
+        online_ids = pd.Series(dtype=object)
         if online_data_list:
             online_data = pd.DataFrame(online_data_list)
             # Get different data (cases not in online data)
             if not online_data.empty:
-                diff_data_df = merged_df[~merged_df["id"].isin(online_data["id"])]
+                online_ids = normalize_ids(online_data["id"].dropna())
+                diff_data_df = merged_df[~merged_df["id"].isin(online_ids)]
             else:
                 diff_data_df = merged_df
         else:
@@ -307,10 +336,12 @@ async def get_case_diff_data():
         
         # Filter out rows with null main violation facts
         diff_data_df = diff_data_df[diff_data_df.get("event", "").notna()]
+        # Flag cases that near-duplicate an online case or another diff case
+        near_duplicates = case_service.near_duplicate_ids(diff_data_df, online_ids.tolist())
         
         # Convert to diff data format
         diff_data = []
-        for _, row in diff_data_df.head(100).iterrows():  # Limit to first 100 for performance
+        for index, row in diff_data_df.head(100).iterrows():  # Limit to first 100 for performance
             diff_item = {
                 "id": str(row.get("id", "")),
                 "title": str(row.get("title", row.get("标题", ""))),
@@ -327,7 +358,8 @@ async def get_case_diff_data():
                 "amount": float(row.get("amount", 0)) if pd.notna(row.get("amount")) else 0,
                 "industry": str(row.get("industry", "")),
                 "category": str(row.get("category", "")),
-                "province": str(row.get("province", ""))
+                "province": str(row.get("province", "")),
+                "near_duplicate_of": near_duplicates[index] or ""
             }
             diff_data.append(diff_item)
         
@@ -340,8 +372,11 @@ async def get_case_diff_data():
 
 
 @router.post("/update")
-async def update_online_cases():
-    """Update online cases by inserting diff data to MongoDB"""
+async def update_online_cases(skip_near_duplicates: bool = False):
+    """Update online cases by inserting diff data to MongoDB.
+    With skip_near_duplicates, cases that near-duplicate an online case or
+    another new case are left out.
+    """
     try:
         # Check if database connection is enabled
         if not db_manager._connection_enabled:
@@ -352,12 +387,10 @@ async def update_online_cases():
             logger.warning("Database not connected")
             raise HTTPException(status_code=503, detail="Database not connected")
         
-        # Get case detail, analysis data, and category data
-        detail_df = await case_service.get_case_detail("")
-        analysis_df = await case_service.get_case_analysis("")
-        category_df = await case_service.get_case_categories()  # Get category data with new fields
+        # Joined case view: detail + analysis + category (amount, industry, category, province)
+        merged_df = await case_service.get_case_view()
         
-        if detail_df.empty:
+        if merged_df.empty:
             return {
                 "message": "No case data available for update",
                 "timestamp": datetime.now().isoformat(),
@@ -365,27 +398,19 @@ async def update_online_cases():
                 "updated_count": 0
             }
         
-        # Merge with analysis data if available
-        merged_df = detail_df.copy()
-        if not analysis_df.empty:
-            merged_df = pd.merge(merged_df, analysis_df, on="id", how="left")
-        
-        # Merge with category data (containing new fields: amount, industry, category, province)
-        if not category_df.empty:
-            merged_df = pd.merge(merged_df, category_df, on="id", how="left")
-            logger.info("Merged category data with new fields: amount, industry, category, province")
-        
         try:
             collection = db_manager.get_collection("cbircanalysis")
             
             # Get online data to find differences with timeout
             online_data_list = await get_online_data_with_timeout(timeout=25)
             
+            online_ids = pd.Series(dtype=object)
             if online_data_list:
                 online_data = pd.DataFrame(online_data_list)
                 # Get different data (cases not in online data)
                 if not online_data.empty:
-                    diff_data_df = merged_df[~merged_df["id"].isin(online_data["id"])]
+                    online_ids = normalize_ids(online_data["id"].dropna())
+                    diff_data_df = merged_df[~merged_df["id"].isin(online_ids)]
                 else:
                     diff_data_df = merged_df
             else:
@@ -395,8 +420,11 @@ async def update_online_cases():
             # Filter out rows with null main violation facts
             diff_data_df = diff_data_df[diff_data_df.get("event", "").notna()]
             
-            # Remove duplicates by id
-            diff_data_df = diff_data_df.drop_duplicates(subset=["id"])
+            skipped_near_duplicates = 0
+            if skip_near_duplicates:
+                near_duplicates = case_service.near_duplicate_ids(diff_data_df, online_ids.tolist()).notna()
+                skipped_near_duplicates = int(near_duplicates.sum())
+                diff_data_df = diff_data_df[~near_duplicates]
             
             # Select and rename columns to match MongoDB structure (following dbcbirc.py uplink_cbircsum logic)
             base_columns = [
@@ -444,19 +472,22 @@ async def update_online_cases():
             if "发布日期" in diff_data_renamed.columns:
                 diff_data_renamed["发布日期"] = pd.to_datetime(diff_data_renamed["发布日期"], errors='coerce')
             
-            # Fill NaN values
-            diff_data_df = diff_data_renamed.fillna("")
+            # Fill NaN values (categorical columns are decoded so "" can be filled in)
+            diff_data_df = decode_categoricals(diff_data_renamed).fillna("")
             
             if diff_data_df.empty:
                 return {
                     "message": "No new cases to update",
                     "timestamp": datetime.now().isoformat(),
                     "status": "success",
-                    "updated_count": 0
+                    "updated_count": 0,
+                    "skipped_near_duplicates": skipped_near_duplicates
                 }
             
             # Convert to records and insert in batches with timeout
             records = diff_data_df.to_dict("records")
+            for record in records:
+                record[SEARCH_TOKEN_FIELD] = search_tokens(record)
             batch_size = 1000  # Reduced batch size for better timeout handling
             total_inserted = 0
             
@@ -482,7 +513,8 @@ async def update_online_cases():
                 "message": "Online cases update completed successfully",
                 "timestamp": datetime.now().isoformat(),
                 "status": "success",
-                "updated_count": total_inserted
+                "updated_count": total_inserted,
+                "skipped_near_duplicates": skipped_near_duplicates
             }
             
         except Exception as e:
@@ -496,6 +528,33 @@ async def update_online_cases():
             raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/rebuild-search-tokens")
+async def rebuild_online_search_tokens():
+    """Add search tokens to online cases inserted before text search mode existed"""
+    try:
+        if not db_manager._connection_enabled:
+            raise HTTPException(status_code=503, detail="Database connection is disabled")
+        if not db_manager.client:
+            raise HTTPException(status_code=503, detail="Database not connected")
+        
+        collection = db_manager.get_collection(settings.MONGODB_COLLECTION)
+        updated = await backfill_search_tokens(collection, batch_size=settings.DB_WRITE_BATCH_SIZE)
+        logger.info(f"Added search tokens to {updated} online cases")
+        
+        return {
+            "message": "Search tokens rebuilt",
+            "timestamp": datetime.now().isoformat(),
+            "status": "success",
+            "updated_count": updated
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rebuilding online search tokens: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/search", response_model=CaseSearchResponse)
 async def search_online_cases(search_request: CaseSearchRequest):
     """Search online cases from MongoDB based on criteria"""
@@ -524,72 +583,36 @@ async def search_online_cases(search_request: CaseSearchRequest):
         # Get online data from MongoDB
         collection = db_manager.get_collection(settings.MONGODB_COLLECTION)
         
-        # Build MongoDB query
-        query = {}
-        
-        # Date range filter
-        if search_request.start_date or search_request.end_date:
-            date_filter = {}
-            if search_request.start_date:
-                date_filter["$gte"] = search_request.start_date
-            if search_request.end_date:
-                date_filter["$lte"] = search_request.end_date
-            query["发布日期"] = date_filter
-        
-        # Text search filters
-        if search_request.title_text:
-            query["标题"] = {"$regex": search_request.title_text, "$options": "i"}
-        
-        if search_request.wenhao_text:
-            query["$or"] = [
-                {"文号": {"$regex": search_request.wenhao_text, "$options": "i"}},
-                {"行政处罚决定书文号": {"$regex": search_request.wenhao_text, "$options": "i"}}
-            ]
-        
-        if search_request.people_text:
-            query["被处罚当事人"] = {"$regex": search_request.people_text, "$options": "i"}
-        
-        if search_request.event_text:
-            query["主要违法违规事实"] = {"$regex": search_request.event_text, "$options": "i"}
-        
-        if search_request.law_text:
-            query["行政处罚依据"] = {"$regex": search_request.law_text, "$options": "i"}
-        
-        if search_request.penalty_text:
-            query["行政处罚决定"] = {"$regex": search_request.penalty_text, "$options": "i"}
-        
-        if search_request.org_text:
-            query["作出处罚决定的机关名称"] = {"$regex": search_request.org_text, "$options": "i"}
-        
-        if search_request.industry:
-            query["industry"] = {"$regex": search_request.industry, "$options": "i"}
-        
-        if search_request.province:
-            query["province"] = {"$regex": search_request.province, "$options": "i"}
-        
-        # General keyword search across multiple fields
-        if search_request.keyword:
-            keyword_regex = {"$regex": search_request.keyword, "$options": "i"}
-            query["$or"] = [
-                {"标题": keyword_regex},
-                {"文号": keyword_regex},
-                {"被处罚当事人": keyword_regex},
-                {"主要违法违规事实": keyword_regex},
-                {"行政处罚依据": keyword_regex},
-                {"行政处罚决定": keyword_regex},
-                {"作出处罚决定的机关名称": keyword_regex}
-            ]
-        
-        # Get total count
-        total = await collection.count_documents(query)
-        
-        # Calculate pagination
-        total_pages = math.ceil(total / search_request.page_size)
-        skip = (search_request.page - 1) * search_request.page_size
-        
-        # Execute search with pagination
-        cursor = collection.find(query).skip(skip).limit(search_request.page_size)
+        # Build MongoDB query (text mode narrows through the search token index)
+        text_mode = search_request.search_mode == "text"
+        query = build_online_query(search_request, text_mode=text_mode)
+        relevance = uses_text_index(query)
+        
+        # Total count (cached per query; optional in cursor mode)
+        total = await _cached_total(collection, query, exact=search_request.include_total)
+        total_pages = math.ceil(total / search_request.page_size) if total >= 0 else 0
+        
+        # Execute search with pagination: after the cursor when one is given,
+        # otherwise by page offset. Both walk the (发布日期, id) index, except
+        # relevance-ranked text searches, which page by offset only.
+        if relevance:
+            skip = (search_request.page - 1) * search_request.page_size
+            cursor = (
+                collection.find(query, {"score": {"$meta": "textScore"}})
+                .sort([("score", {"$meta": "textScore"})] + ONLINE_SORT)
+                .skip(skip)
+                .limit(search_request.page_size)
+            )
+        elif search_request.cursor:
+            page_query = {"$and": [query, _cursor_filter(search_request.cursor)]} if query else _cursor_filter(search_request.cursor)
+            cursor = collection.find(page_query).sort(ONLINE_SORT).limit(search_request.page_size)
+        else:
+            skip = (search_request.page - 1) * search_request.page_size
+            cursor = collection.find(query).sort(ONLINE_SORT).skip(skip).limit(search_request.page_size)
         documents = await cursor.to_list(length=search_request.page_size)
+        next_cursor = None
+        if not relevance and len(documents) == search_request.page_size:
+            next_cursor = _encode_cursor(documents[-1])
         
         # Convert to CaseDetail objects
         cases = []
@@ -653,9 +676,12 @@ async def search_online_cases(search_request: CaseSearchRequest):
             total=total,
             page=search_request.page,
             page_size=search_request.page_size,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error searching online cases: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -675,7 +701,8 @@ async def export_online_cases_csv(
     org_text: str = None,
     industry: str = None,
     province: str = None,
-    min_penalty: float = None
+    min_penalty: float = None,
+    search_mode: Literal["regex", "text"] = "regex"
 ):
     """Export online cases to CSV format"""
     try:
@@ -691,57 +718,32 @@ async def export_online_cases_csv(
         # Get online data from MongoDB
         collection = db_manager.get_collection(settings.MONGODB_COLLECTION)
         
-        # Build query from query parameters
-        query = {}
-        
-        # Date range filter
-        if start_date or end_date:
-            date_filter = {}
-            if start_date:
-                date_filter["$gte"] = start_date
-            if end_date:
-                date_filter["$lte"] = end_date
-            query["发布日期"] = date_filter
-        
-        # Text search filters
-        text_filters = []
-        if title_text:
-            text_filters.append({"标题": {"$regex": title_text, "$options": "i"}})
-        if wenhao_text:
-            text_filters.append({"文号": {"$regex": wenhao_text, "$options": "i"}})
-        if people_text:
-            text_filters.append({"被处罚当事人": {"$regex": people_text, "$options": "i"}})
-        if event_text:
-            text_filters.append({"主要违法违规事实": {"$regex": event_text, "$options": "i"}})
-        if law_text:
-            text_filters.append({"行政处罚依据": {"$regex": law_text, "$options": "i"}})
-        if penalty_text:
-            text_filters.append({"行政处罚决定": {"$regex": penalty_text, "$options": "i"}})
-        if org_text:
-            text_filters.append({"作出处罚决定的机关名称": {"$regex": org_text, "$options": "i"}})
-        if industry:
-            text_filters.append({"行业": {"$regex": industry, "$options": "i"}})
-        if province:
-            text_filters.append({"省份": {"$regex": province, "$options": "i"}})
-        
-        if text_filters:
-            query["$and"] = text_filters
-        
-        # General keyword search
-        if keyword:
-            keyword_regex = {"$regex": keyword, "$options": "i"}
-            query["$or"] = [
-                {"标题": keyword_regex},
-                {"文号": keyword_regex},
-                {"被处罚当事人": keyword_regex},
-                {"主要违法违规事实": keyword_regex},
-                {"行政处罚依据": keyword_regex},
-                {"行政处罚决定": keyword_regex},
-                {"作出处罚决定的机关名称": keyword_regex}
-            ]
+        # Build query from query parameters, as the search endpoint does
+        search_request = CaseSearchRequest(
+            start_date=start_date,
+            end_date=end_date,
+            keyword=keyword,
+            title_text=title_text,
+            wenhao_text=wenhao_text,
+            people_text=people_text,
+            event_text=event_text,
+            law_text=law_text,
+            penalty_text=penalty_text,
+            org_text=org_text,
+            industry=industry,
+            province=province,
+            min_penalty=min_penalty,
+            search_mode=search_mode
+        )
+        query = build_online_query(search_request, text_mode=search_mode == "text")
         
-        # Get all matching documents
-        cursor = collection.find(query)
+        # Get all matching documents (best matches first in text mode)
+        if uses_text_index(query):
+            cursor = collection.find(query, {"score": {"$meta": "textScore"}}).sort(
+                [("score", {"$meta": "textScore"})] + ONLINE_SORT
+            )
+        else:
+            cursor = collection.find(query).sort(ONLINE_SORT)
         documents = await cursor.to_list(length=None)
         
         # Convert to DataFrame for CSV export
@@ -778,6 +780,8 @@ async def export_online_cases_csv(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error exporting online cases: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from app.models.case import CaseSearchRequest, CaseSearchResponse
+from fastapi import APIRouter, HTTPException, Query
+from app.models.case import (
+    CaseSearchRequest, CaseSearchResponse, SimilarSearchRequest, SimilarCasesResponse, EntityMatchesResponse
+)
 from app.services.case_service import case_service
+from app.services.query_language import QuerySyntaxError
 
 router = APIRouter()
 
@@ -10,6 +13,8 @@ async def search_cases(search_request: CaseSearchRequest):
     """Search cases based on criteria"""
     try:
         return await case_service.search_cases(search_request)
+    except QuerySyntaxError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid query: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -18,28 +23,75 @@ async def search_cases(search_request: CaseSearchRequest):
 async def get_search_suggestions():
     """Get search suggestions for autocomplete"""
     try:
-        # Get unique values for suggestions
-        detail_df = await case_service.get_case_detail("")
-        category_df = await case_service.get_case_categories()
-        
-        suggestions = {
-            "provinces": [],
-            "industries": [],
-            "organizations": [],
-            "laws": []
+        # Every known value per field, most frequent first
+        fields = {
+            "provinces": "province",
+            "industries": "industry",
+            "organizations": "org",
+            "laws": "law",
         }
-        
-        if not category_df.empty:
-            if "province" in category_df.columns:
-                suggestions["provinces"] = category_df["province"].dropna().unique().tolist()
-            if "industry" in category_df.columns:
-                suggestions["industries"] = category_df["industry"].dropna().unique().tolist()
-            if "org" in category_df.columns:
-                suggestions["organizations"] = category_df["org"].dropna().unique().tolist()
-            if "law" in category_df.columns:
-                suggestions["laws"] = category_df["law"].dropna().unique().tolist()
+        suggestions = {}
+        for key, field in fields.items():
+            values = await case_service.suggest_terms(field)
+            suggestions[key] = [item["value"] for item in values or []]
         
         return suggestions
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/suggest")
+async def suggest(
+    field: str,
+    prefix: str = "",
+    limit: int = Query(default=10, ge=1, le=100)
+):
+    """Autocomplete a field value by prefix, most frequent values first"""
+    try:
+        suggestions = await case_service.suggest_terms(field, prefix, limit)
+        if suggestions is None:
+            raise HTTPException(status_code=400, detail=f"Unsupported suggestion field: {field}")
+        return {"field": field, "prefix": prefix, "suggestions": suggestions}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/similar", response_model=SimilarCasesResponse)
+async def search_similar_cases(similar_request: SimilarSearchRequest):
+    """Find the cases most similar to a text (TF-IDF over facts and full text)"""
+    try:
+        cases = await case_service.similar_to_text(similar_request.text, similar_request.limit)
+        return SimilarCasesResponse(cases=cases)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/entities", response_model=EntityMatchesResponse)
+async def search_entities(
+    q: str = Query(..., min_length=1, description="Party name, partial or variant"),
+    limit: int = Query(default=10, ge=1, le=100),
+    min_score: float = Query(default=0.0, ge=0.0, le=1.0)
+):
+    """Find penalized parties by partial or variant name"""
+    try:
+        entities = await case_service.search_entities(q, limit, min_score)
+        return EntityMatchesResponse(query=q, entities=entities)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/entities/cases", response_model=CaseSearchResponse)
+async def get_entity_cases(
+    name: str = Query(..., min_length=1, description="Party name"),
+    variants: bool = Query(default=False, description="Include cases of name variants"),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100)
+):
+    """Get all cases of one penalized party, newest first"""
+    try:
+        return await case_service.get_entity_cases(name, variants, page, page_size)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
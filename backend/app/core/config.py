@@ -19,6 +19,8 @@ class Settings(BaseSettings):
     MONGODB_DB: str = os.getenv("MONGODB_DB", "pencbirc")
     MONGODB_COLLECTION: str = os.getenv("MONGODB_COLLECTION", "cbircanalysis")
     DISABLE_DATABASE: bool = os.getenv("DISABLE_DATABASE", "false").lower() in ("true", "1", "yes")
+    # Number of upserts sent per bulk_write round trip
+    DB_WRITE_BATCH_SIZE: int = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
     
     # External APIs
     DIFY_API_KEY: str = os.getenv("DIFY_API_KEY", "")
@@ -36,6 +38,10 @@ class Settings(BaseSettings):
     # File Storage
     DATA_FOLDER: str = "../cbirc"
     
+    # Search result cache
+    QUERY_CACHE_MAX_MB: int = int(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+    QUERY_CACHE_TTL_SECONDS: int = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+    
     class Config:
         env_file = ".env"
 
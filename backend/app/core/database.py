@@ -1,15 +1,72 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
 import pandas as pd
 from typing import Optional, List, Dict, Any
 from app.core.config import settings
 
 
+ORG_SUFFIXES = ["jiguan", "benji", "fenju"]
+
+
+def declared_indexes() -> Dict[str, List[Dict[str, Any]]]:
+    """Indexes the API relies on, per collection"""
+    online = [
+        {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        {"name": "publish_date_id", "keys": [("发布日期", DESCENDING), ("id", DESCENDING)]},
+        {"name": "province_publish_date", "keys": [("province", ASCENDING), ("发布日期", DESCENDING)]},
+        {"name": "industry_publish_date", "keys": [("industry", ASCENDING), ("发布日期", DESCENDING)]},
+        # Character bigrams of the searchable fields (online_query.search_tokens):
+        # $all per term on the multikey index, relevance through the text index
+        {"name": "search_tokens", "keys": [("search_tokens", ASCENDING)]},
+        {
+            "name": "text_search",
+            "keys": [("search_tokens", TEXT)],
+            # No stemming or stop words: the tokens are Chinese bigrams
+            "default_language": "none",
+        },
+    ]
+    indexes: Dict[str, List[Dict[str, Any]]] = {settings.MONGODB_COLLECTION: online}
+    for suffix in ORG_SUFFIXES + [""]:
+        indexes[f"cbircdtl{suffix}"] = [
+            {"name": "id", "keys": [("id", ASCENDING)]},
+            {"name": "date", "keys": [("date", ASCENDING)]},
+        ]
+        indexes[f"cbircsplit{suffix}"] = [
+            {"name": "id", "keys": [("id", ASCENDING)]},
+            {"name": "date_amount", "keys": [("date", ASCENDING), ("amount", ASCENDING)]},
+        ]
+        indexes[f"cbircsum{suffix}"] = [
+            {"name": "docId", "keys": [("docId", ASCENDING)]},
+        ]
+    for suffix in ORG_SUFFIXES:
+        # Scraped cases are upserted by id
+        indexes[f"cases_{suffix}"] = [
+            {"name": "id_unique", "keys": [("id", ASCENDING)], "unique": True},
+        ]
+    indexes["cbirccat"] = [{"name": "id", "keys": [("id", ASCENDING)]}]
+    return indexes
+
+
+def _same_index(info: Dict[str, Any], spec: Dict[str, Any]) -> bool:
+    """Whether an index_information() entry has the keys and options of a spec"""
+    if bool(info.get("unique", False)) != bool(spec.get("unique", False)):
+        return False
+    text_fields = [field for field, direction in spec["keys"] if direction == TEXT]
+    if text_fields:
+        # Text indexes are reported as (_fts, text), (_ftsx, 1) plus weights
+        return [tuple(k) for k in info.get("key", [])][:1] == [("_fts", "text")] and \
+            set(info.get("weights", {})) == set(text_fields)
+    return [tuple(k) for k in info.get("key", [])] == [tuple(k) for k in spec["keys"]]
+
+
 class DatabaseManager:
     def __init__(self):
         self.client: Optional[AsyncIOMotorClient] = None
         self.sync_client: Optional[MongoClient] = None
         self._connection_enabled = not settings.DISABLE_DATABASE  # Use config setting
+        self.index_status: Dict[str, Any] = {}
+        self._index_task: Optional[asyncio.Task] = None
         
     def disable_auto_connection(self):
         """Disable automatic database connection"""
@@ -41,6 +98,8 @@ class DatabaseManager:
             # Test the connection
             await self.client.admin.command('ping')
             print("Database connection established successfully")
+            # Index builds can take a while on large collections, so don't block startup
+            self._index_task = asyncio.create_task(self.ensure_indexes())
         except Exception as e:
             print(f"Failed to connect to database: {e}")
             print("Application will continue without database connection")
@@ -48,6 +107,71 @@ class DatabaseManager:
             self.client = None
             self.sync_client = None
         
+    async def ensure_indexes(self) -> Dict[str, Any]:
+        """Create declared indexes that are missing or differ on existing collections"""
+        status: Dict[str, Any] = {}
+        try:
+            db = self.client[settings.MONGODB_DB]
+            existing_collections = set(await db.list_collection_names())
+        except Exception as e:
+            print(f"Failed to list collections for index provisioning: {e}")
+            return status
+        for collection_name, specs in declared_indexes().items():
+            if collection_name not in existing_collections:
+                continue
+            collection = db[collection_name]
+            try:
+                existing = await collection.index_information()
+            except Exception as e:
+                status[collection_name] = {"error": str(e)}
+                continue
+            results = {}
+            for spec in specs:
+                name = spec["name"]
+                current = existing.get(name)
+                if current is not None and _same_index(current, spec):
+                    results[name] = "present"
+                    continue
+                # The same index under another name already serves the queries
+                if current is None and any(_same_index(info, spec) for info in existing.values()):
+                    results[name] = "present"
+                    continue
+                try:
+                    if current is not None:
+                        await collection.drop_index(name)
+                    options = {k: v for k, v in spec.items() if k != "keys"}
+                    await collection.create_index(spec["keys"], **options)
+                    results[name] = "replaced" if current is not None else "created"
+                except Exception as e:
+                    results[name] = f"error: {e}"
+                    print(f"Failed to create index {name} on {collection_name}: {e}")
+            status[collection_name] = results
+        self.index_status = status
+        return status
+
+    async def get_index_stats(self) -> Dict[str, Any]:
+        """Usage counters ($indexStats) for the indexes of the declared collections"""
+        db = self.client[settings.MONGODB_DB]
+        existing_collections = set(await db.list_collection_names())
+        stats: Dict[str, Any] = {}
+        for collection_name in declared_indexes():
+            if collection_name not in existing_collections:
+                continue
+            collection = db[collection_name]
+            usage = {}
+            async for doc in collection.aggregate([{"$indexStats": {}}]):
+                accesses = doc.get("accesses", {})
+                usage[doc["name"]] = {
+                    "key": dict(doc.get("key", {})),
+                    "ops": int(accesses.get("ops", 0)),
+                    "since": accesses.get("since").isoformat() if accesses.get("since") else None,
+                }
+            stats[collection_name] = {
+                "indexes": usage,
+                "reconcile": self.index_status.get(collection_name, {}),
+            }
+        return stats
+
     async def close_db(self):
         """Close database connection"""
         if self.client:
@@ -83,17 +207,37 @@ class DatabaseManager:
             batch = records[i:i + batch_size]
             await collection.insert_many(batch)
             
-    async def get_dataframe(self, collection_name: str, query: Dict[str, Any] = None) -> pd.DataFrame:
-        """Get data from MongoDB collection as pandas DataFrame"""
+    async def get_dataframe(
+        self,
+        collection_name: str,
+        query: Dict[str, Any] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 5000,
+        limit: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Get data from MongoDB collection as pandas DataFrame.
+
+        The cursor is streamed ``batch_size`` documents at a time and each batch
+        is turned into a column chunk right away, so the full list of documents
+        is never held in memory next to the DataFrame.
+        """
         collection = self.get_collection(collection_name)
-        query = query or {}
-        
-        cursor = collection.find(query)
-        documents = await cursor.to_list(length=None)
-        
-        if documents:
-            return pd.DataFrame(documents)
-        return pd.DataFrame()
+        cursor = collection.find(query or {}, projection, batch_size=batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        chunks = []
+        while True:
+            documents = await cursor.to_list(length=batch_size)
+            if not documents:
+                break
+            chunks.append(pd.DataFrame(documents))
+
+        if not chunks:
+            return pd.DataFrame()
+        if len(chunks) == 1:
+            return chunks[0]
+        return pd.concat(chunks, ignore_index=True)
         
     async def delete_collection_data(self, collection_name: str):
         """Delete all data from collection"""
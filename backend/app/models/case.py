@@ -4,7 +4,7 @@ try:
     from pydantic import ConfigDict  # type: ignore
 except Exception:  # pragma: no cover
     ConfigDict = dict  # Fallback for type checkers; v1 will ignore model_config
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import date, datetime
 from enum import Enum
 
@@ -79,6 +79,18 @@ class CaseSearchRequest(BaseModel):
     # Pagination
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=20, ge=1, le=100)
+    # Keyset pagination (online search): next_cursor of the previous page
+    cursor: Optional[str] = Field(default=None, description="上一页返回的next_cursor")
+    include_total: bool = Field(default=True, description="是否计算精确总数")
+    # Online search: "text" selects candidates through the search token index
+    # and ranks them by relevance; "regex" scans with the literal filters only
+    search_mode: Literal["regex", "text"] = Field(default="regex", description="在线搜索模式")
+    # Case counts per province/industry/category/month/amount bucket of the result
+    facets: bool = Field(default=False, description="是否返回分面统计")
+    # Query language: AND/OR/NOT, "phrases", field:value, amount:>100000,
+    # date:2023-01..2023-06 (combined with the filters above)
+    query: Optional[str] = Field(default="", description="高级查询表达式")
+    explain: bool = Field(default=False, description="是否返回查询计划和各阶段耗时")
 
     # Pydantic v2 style config (suppresses deprecation warning)
     model_config = ConfigDict(populate_by_name=True)
@@ -90,6 +102,56 @@ class CaseSearchResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+    explain: Optional[Dict[str, Any]] = None
+
+
+class CaseBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=500, description="案例ID列表")
+
+
+class CaseBatchResponse(BaseModel):
+    cases: List[CaseDetail]
+    missing: List[str] = []
+
+
+class SimilarSearchRequest(BaseModel):
+    text: str = Field(..., min_length=1, description="查询文本")
+    limit: int = Field(default=10, ge=1, le=100)
+
+
+class SimilarCase(BaseModel):
+    score: float = Field(..., description="相似度")
+    case: CaseDetail
+
+
+class SimilarCasesResponse(BaseModel):
+    cases: List[SimilarCase]
+
+
+class EntityMatch(BaseModel):
+    name: str = Field(..., description="当事人名称")
+    normalized: str = Field(..., description="规范化名称")
+    score: float = Field(..., description="相似度")
+    case_count: int = Field(..., description="案例数量")
+
+
+class EntityMatchesResponse(BaseModel):
+    query: str
+    entities: List[EntityMatch]
+
+
+class NearDuplicateCluster(BaseModel):
+    id: str = Field(..., description="代表案例ID（最早发布）")
+    title: str = Field("", description="代表案例标题")
+    duplicate_ids: List[str] = Field(..., description="近似重复的案例ID")
+
+
+class NearDuplicatesResponse(BaseModel):
+    total_clusters: int
+    duplicate_cases: int
+    clusters: List[NearDuplicateCluster]
 
 
 class CaseStats(BaseModel):
@@ -109,6 +171,9 @@ class CaseStats(BaseModel):
     cbirccat_date_range: Dict[str, str] = {}
     cbircsplit_total: int = 0
     cbircsplit_date_range: Dict[str, str] = {}
+    # Cases counted once per near-duplicate cluster
+    distinct_cases: int = 0
+    near_duplicate_clusters: int = 0
 
 
 class MonthlyTrend(BaseModel):
@@ -0,0 +1,169 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Dimensions of every cube cell: publication month ("YYYY-MM"), region,
+# industry, penalty category, organization level, and the sources of the case
+DIMENSIONS = ["month", "province", "industry", "category", "org_level", "has_detail", "has_category"]
+MEASURES = ["cases", "amounts", "amount_sum", "amount_max", "first_day", "last_day", "first_row"]
+
+_NO_ROW = np.iinfo(np.int64).max
+
+
+class AggregateCube:
+    """Case counts and penalty amounts per combination of DIMENSIONS.
+
+    Every view row falls in one cell. A cell keeps its number of cases (ids
+    are unique in the view, so this is also its number of distinct ids), the
+    count, sum and maximum of its known amounts, its first and last
+    publication day, and its first view row, so rollups can list groups in
+    order of first appearance as value_counts does. Dashboards read rollups,
+    the cells grouped by a few dimensions, which touch a few thousand cells
+    instead of every case.
+
+    Rows are filed by view position. When rows are added or change, only
+    the cells they leave or enter are recomputed from their rows.
+    """
+
+    def __init__(self):
+        # Values of every dimension, in order of first appearance; cells
+        # refer to them by position (-1 for a missing value)
+        self.labels: Dict[str, List[Any]] = {dim: [] for dim in DIMENSIONS}
+        self._codes: Dict[str, Dict[Any, int]] = {dim: {} for dim in DIMENSIONS}
+        self._cell_ids: Dict[tuple, int] = {}
+        self.cells = np.empty((0, len(DIMENSIONS)), dtype=np.int32)
+        self.measures: Dict[str, np.ndarray] = {
+            "cases": np.empty(0, dtype=np.int64),
+            "amounts": np.empty(0, dtype=np.int64),
+            "amount_sum": np.empty(0, dtype=np.float64),
+            "amount_max": np.empty(0, dtype=np.float64),
+            # Days since 1970-01-01, NaN when no row has a date
+            "first_day": np.empty(0, dtype=np.float64),
+            "last_day": np.empty(0, dtype=np.float64),
+            "first_row": np.empty(0, dtype=np.int64),
+        }
+        # Cell, amount and publication day of every view row
+        self.row_cells = np.empty(0, dtype=np.int64)
+        self.row_amounts = np.empty(0, dtype=np.float64)
+        self.row_days = np.empty(0, dtype=np.float64)
+
+    def update(self, rows: pd.DataFrame, positions: np.ndarray, total_rows: int):
+        """File the rows at the given view positions. rows holds a column per
+        dimension (None for missing values), plus "amount" and "day"
+        (datetime64[D], NaT when unknown).
+        """
+        if total_rows > len(self.row_cells):
+            grow = total_rows - len(self.row_cells)
+            self.row_cells = np.concatenate([self.row_cells, np.full(grow, -1, dtype=np.int64)])
+            self.row_amounts = np.concatenate([self.row_amounts, np.full(grow, np.nan)])
+            self.row_days = np.concatenate([self.row_days, np.full(grow, np.nan)])
+        if not len(positions):
+            return
+        cells = self._cell_ids_of(rows)
+        previous = self.row_cells[positions]
+        self.row_cells[positions] = cells
+        self.row_amounts[positions] = rows["amount"].to_numpy(dtype=np.float64)
+        days = rows["day"].to_numpy().astype("datetime64[D]")
+        self.row_days[positions] = np.where(np.isnat(days), np.nan, days.astype(np.int64))
+        self._recompute(np.union1d(previous[previous >= 0], cells))
+
+    def _encode(self, dim: str, values: np.ndarray) -> np.ndarray:
+        codes, uniques = pd.factorize(values)
+        known, labels = self._codes[dim], self.labels[dim]
+        mapping = np.empty(len(uniques) + 1, dtype=np.int32)
+        mapping[-1] = -1
+        for i, label in enumerate(uniques):
+            code = known.get(label)
+            if code is None:
+                code = known[label] = len(labels)
+                labels.append(label)
+            mapping[i] = code
+        return mapping[codes]
+
+    def _cell_ids_of(self, rows: pd.DataFrame) -> np.ndarray:
+        codes = np.column_stack([self._encode(dim, rows[dim].to_numpy(dtype=object)) for dim in DIMENSIONS])
+        combos, inverse = np.unique(codes, axis=0, return_inverse=True)
+        ids = np.empty(len(combos), dtype=np.int64)
+        new = []
+        for i, combo in enumerate(map(tuple, combos.tolist())):
+            cell = self._cell_ids.get(combo)
+            if cell is None:
+                cell = self._cell_ids[combo] = len(self._cell_ids)
+                new.append(combo)
+            ids[i] = cell
+        if new:
+            self.cells = np.vstack([self.cells, np.array(new, dtype=np.int32)])
+            grow = len(self.cells) - len(self.measures["cases"])
+            for name, values in self.measures.items():
+                self.measures[name] = np.concatenate([values, np.zeros(grow, dtype=values.dtype)])
+        return ids[inverse.reshape(-1)]
+
+    def _recompute(self, touched: np.ndarray):
+        """Recompute the measures of the touched cells from their rows"""
+        member = np.zeros(len(self.cells) + 1, dtype=bool)
+        member[touched] = True
+        # Unfiled rows (cell -1) hit the trailing False
+        rows = np.flatnonzero(member[self.row_cells])
+        cells = self.row_cells[rows]
+        amounts, days = self.row_amounts[rows], self.row_days[rows]
+        known, dated = ~np.isnan(amounts), ~np.isnan(days)
+        size = len(self.cells)
+        m = self.measures
+        m["cases"][touched] = np.bincount(cells, minlength=size)[touched]
+        m["amounts"][touched] = np.bincount(cells[known], minlength=size)[touched]
+        m["amount_sum"][touched] = np.bincount(cells[known], amounts[known], minlength=size)[touched]
+        for name in ("amount_max", "first_day", "last_day"):
+            m[name][touched] = np.nan
+        m["first_row"][touched] = _NO_ROW
+        np.fmax.at(m["amount_max"], cells[known], amounts[known])
+        np.fmin.at(m["first_day"], cells[dated], days[dated])
+        np.fmax.at(m["last_day"], cells[dated], days[dated])
+        np.minimum.at(m["first_row"], cells, rows)
+
+    def rollup(self, dimensions: List[str], **where: Any) -> pd.DataFrame:
+        """Measures of the cells grouped by the given dimensions, one row per
+        group with cases, in order of first appearance in the view. Keyword
+        arguments keep only the cells with that value of a dimension, e.g.
+        rollup(["province"], has_detail=True). Missing values are None.
+        """
+        live = self.measures["cases"] > 0
+        for dim, value in where.items():
+            live &= self.cells[:, DIMENSIONS.index(dim)] == self._codes[dim].get(value, -2)
+        cells = np.flatnonzero(live)
+        if dimensions and len(cells):
+            keys = self.cells[cells][:, [DIMENSIONS.index(dim) for dim in dimensions]]
+            groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+        else:
+            groups = np.empty((1 if len(cells) else 0, len(dimensions)), dtype=np.int32)
+            inverse = np.zeros(len(cells), dtype=np.int64)
+        size = len(groups)
+        m = {name: values[cells] for name, values in self.measures.items()}
+        result: Dict[str, Any] = {}
+        for i, dim in enumerate(dimensions):
+            # Object columns, so missing labels stay None rather than NaN
+            result[dim] = pd.Series(np.array(self.labels[dim] + [None], dtype=object)[groups[:, i]], dtype=object)
+        result["cases"] = np.bincount(inverse, m["cases"], minlength=size).astype(np.int64)
+        result["amounts"] = np.bincount(inverse, m["amounts"], minlength=size).astype(np.int64)
+        result["amount_sum"] = np.bincount(inverse, m["amount_sum"], minlength=size)
+        for name, combine in (("amount_max", np.fmax), ("first_day", np.fmin), ("last_day", np.fmax)):
+            values = np.full(size, np.nan)
+            combine.at(values, inverse, m[name])
+            result[name] = values
+        first_row = np.full(size, _NO_ROW, dtype=np.int64)
+        np.minimum.at(first_row, inverse, m["first_row"])
+        result["first_row"] = first_row
+        for name in ("first_day", "last_day"):
+            days = result[name]
+            result[name] = np.where(np.isnan(days), np.datetime64("NaT", "D"),
+                                    np.nan_to_num(days).astype(np.int64).astype("datetime64[D]"))
+        frame = pd.DataFrame(result, columns=list(dimensions) + MEASURES)
+        return frame.sort_values("first_row", kind="stable").reset_index(drop=True)
+
+    @property
+    def nbytes(self) -> int:
+        return int(
+            self.cells.nbytes + sum(values.nbytes for values in self.measures.values())
+            + self.row_cells.nbytes + self.row_amounts.nbytes + self.row_days.nbytes
+        )
@@ -5,14 +5,46 @@ from datetime import date, datetime
 import os
 import glob
 import re
+import time
+import asyncio
 from app.core.database import db_manager
 from app.core.config import settings
+from app.services.dataset_cache import dataset_cache
+from app.services.snapshot_store import snapshot_store
+from app.services.csv_reader import read_csv_files
+from app.services.case_store import case_store, DB_REFRESH_SECONDS, TEXT_COLUMN, INDEXED_COLUMNS
+from app.services.entity_index import CANDIDATES as ENTITY_CANDIDATES, VARIANT_SCORE
+from app.services.text_blob import TEXT_OFFSET_COLUMN
+from app.services.term_matcher import TermMatcher, split_terms
+from app.services.ngram_index import union_rows
+from app.services.query_cache import query_cache
+from app.services.query_language import QueryPlan, QuerySyntaxError, parse_query
 import logging
 from app.models.case import (
     CaseDetail, CaseSummary, CaseSearchRequest, CaseSearchResponse,
-    CaseStats, MonthlyTrend, RegionalStats, OrganizationType
+    CaseStats, MonthlyTrend, RegionalStats, OrganizationType, SimilarCase,
+    NearDuplicateCluster, NearDuplicatesResponse, EntityMatch
 )
 
+# Fields read from cbircdtl* collections (the columns _format_detail uses)
+DETAIL_PROJECTION = {"_id": 0, "title": 1, "subtitle": 1, "date": 1, "doc": 1, "id": 1}
+# Columns searched by the general keyword filter
+KEYWORD_COLUMNS = [
+    "标题", "文号", "内容", "wenhao", "people", "event",
+    "law", "penalty", "org", "province", "industry", "category"
+]
+
+# Source field names accepted for autocomplete, mapped to case view columns
+SUGGEST_ALIASES = {
+    "被处罚当事人": "people",
+    "行政处罚依据": "law",
+    "作出处罚决定的机关名称": "org",
+    "行业": "industry",
+    "省份": "province",
+}
+# Source datasets described in the case stats overview
+OVERVIEW_FAMILIES = ["cbircsum", "cbircdtl", "cbirccat", "cbircsplit"]
+
 
 class CaseService:
     def __init__(self):
@@ -26,62 +58,47 @@ class CaseService:
         # Use DB flag and local data folder from settings
         self.use_db: bool = not settings.DISABLE_DATABASE
         self.local_data_folder = settings.DATA_FOLDER or "cbirc"
+        # (source signature, dataset overview) of the last case stats
+        self._overview: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None
+
+    def _find_local_files(self, prefix: str) -> List[str]:
+        """Find local CSV files matching prefix across candidate data folders"""
+        # Support multiple candidate folders without changing settings
+        candidate_dirs = [
+            self.local_data_folder,
+            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), self.local_data_folder),
+            os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), self.local_data_folder),
+        ]
+        files: List[str] = []
+        for base in candidate_dirs:
+            pattern = os.path.join(base, f"{prefix}*.csv")
+            files.extend(glob.glob(pattern))
+        return sorted(list(dict.fromkeys(files)))  # de-duplicate and sort
+
+    def _read_csv_files(self, files: List[str]) -> pd.DataFrame:
+        """Read and concatenate data files, served from the Parquet snapshot
+        where it is current and from CSV for files newer than the snapshot.
+        """
+        combined = snapshot_store.load(files, read_csv_files)
+        if combined.empty:
+            return combined
+        # Drop fully empty columns
+        return combined.dropna(axis=1, how='all')
 
     def _load_local_csvs(self, prefix: str) -> pd.DataFrame:
         """Load and concatenate local CSV files matching prefix from data folder.
-        Be tolerant to BOM, encodings, and inconsistent headers.
+        Parsed frames are served from the dataset cache until a matching file
+        is added or changed; the returned frame is shared and must not be mutated.
         """
         try:
-            # Support multiple candidate folders without changing settings
-            candidate_dirs = [
-                self.local_data_folder,
-                os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), self.local_data_folder),
-                os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), self.local_data_folder),
-            ]
-            files: List[str] = []
-            for base in candidate_dirs:
-                pattern = os.path.join(base, f"{prefix}*.csv")
-                files.extend(glob.glob(pattern))
-            files = sorted(list(dict.fromkeys(files)))  # de-duplicate and sort
+            files = self._find_local_files(prefix)
             if not files:
                 return pd.DataFrame()
-
-            dataframes = []
-            for file_path in files:
-                try:
-                    # Try utf-8-sig first to strip BOM if present
-                    try:
-                        df = pd.read_csv(file_path, encoding="utf-8-sig", low_memory=False)
-                    except Exception:
-                        try:
-                            df = pd.read_csv(file_path, encoding="utf-8", low_memory=False)
-                        except Exception:
-                            df = pd.read_csv(file_path, encoding="latin1", low_memory=False)
-
-                    # Normalize column names (strip spaces and BOM)
-                    df.columns = [str(c).strip().lstrip('\ufeff') for c in df.columns]
-
-                    dataframes.append(df)
-                except Exception as read_err:
-                    print(f"Failed to read {file_path}: {read_err}")
-            if not dataframes:
-                return pd.DataFrame()
-            combined = pd.concat(dataframes, ignore_index=True)
-            # Drop fully empty columns
-            combined = combined.dropna(axis=1, how='all')
-            return combined
+            return dataset_cache.get(prefix, files, self._read_csv_files)
         except Exception as e:
             print(f"Local CSV load error for prefix {prefix}: {e}")
             return pd.DataFrame()
         
-    def _split_words(self, text: str) -> str:
-        """Split string by space into words, add regex patterns"""
-        if not text:
-            return ""
-        words = text.split()
-        words = ["(?=.*" + word + ")" for word in words]
-        return "".join(words)
-    
     async def get_case_summary(self, org_name: str = "") -> pd.DataFrame:
         """Get case summary data (DB or local CSV fallback)"""
         org_code = self.org_mapping.get(org_name, "")
@@ -111,6 +128,8 @@ class CaseService:
                 df = pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame()
         
         if not df.empty:
+            # Shallow copy so the cached frame is not mutated
+            df = df.copy(deep=False)
             # Normalize summary publish date
             if "publishDate" in df.columns:
                 df["发布日期"] = pd.to_datetime(df["publishDate"], errors='coerce').dt.date
@@ -127,7 +146,7 @@ class CaseService:
         df = pd.DataFrame()
         if self.use_db:
             try:
-                df = await db_manager.get_dataframe(collection_name)
+                df = await db_manager.get_dataframe(collection_name, projection=DETAIL_PROJECTION)
             except Exception as e:
                 print(f"Error getting case detail (db): {e}")
 
@@ -146,6 +165,10 @@ class CaseService:
                 non_empty = [d for d in candidates if not d.empty]
                 df = pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame()
         
+        return self._format_detail(df)
+
+    def _format_detail(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Select and rename raw detail columns (title/subtitle/date/doc/id)"""
         if df.empty:
             return pd.DataFrame()
         
@@ -207,76 +230,241 @@ class CaseService:
                 df = df.drop_duplicates(subset=["id"], keep="last").reset_index(drop=True)
         return df
     
+    async def get_case_view(self, require_detail: bool = True) -> pd.DataFrame:
+        """Get the materialized case view (detail + analysis + category joined on id).
+        With require_detail, only cases that have detail data are returned.
+        The frame is shared and must not be mutated.
+        """
+        view = await case_store.get_view(self)
+        if require_detail and not view.empty and not view["has_detail"].all():
+            view = view[view["has_detail"]]
+        return view
+
+    async def _scoped_view(self, search_request: CaseSearchRequest) -> pd.DataFrame:
+        view = await self.get_case_view()
+        # Scope by organization; fall back to the full dataset if the scope is empty
+        org_code = self.org_mapping.get(getattr(search_request, "org_name", "") or "", "")
+        if org_code and not view.empty and "org_level" in view.columns:
+            scoped = view[view["org_level"] == org_code]
+            if not scoped.empty:
+                view = scoped
+        return view
+
+    async def _ordered_matches(self, search_request: CaseSearchRequest,
+                               explain: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """View positions of the matching cases, newest first, served from the
+        query cache when the same search already ran on this view version.
+        An explain dict is filled with the stages of a fresh (uncached) run.
+        """
+        view = await self._scoped_view(search_request)
+        if view.empty:
+            return np.empty(0, dtype=np.int64)
+        key = query_cache.key(search_request, case_store.version)
+        order = None if explain is not None else query_cache.get(key)
+        if order is None:
+            started = time.perf_counter()
+            matched = self._filter_cases(view, search_request, use_index=True)
+            positions = matched.index.to_numpy()
+            filtered = time.perf_counter()
+            plan = None
+            if search_request.query:
+                plan = QueryPlan(parse_query(search_request.query), case_store, KEYWORD_COLUMNS)
+                positions = plan.execute(np.sort(positions))
+            queried = time.perf_counter()
+            order = case_store.recency_window(positions, 0, len(positions))
+            query_cache.put(key, order)
+            if explain is not None:
+                explain.update({
+                    "filters": {"output_rows": int(len(matched)), "ms": round((filtered - started) * 1000, 3)},
+                    "query": plan.root.describe() if plan else None,
+                    "plan": plan.explain if plan else None,
+                    "order": {"output_rows": int(len(order)), "ms": round((time.perf_counter() - queried) * 1000, 3)},
+                    "total_ms": round((time.perf_counter() - started) * 1000, 3),
+                })
+        return order
+
+    async def find_cases(self, search_request: CaseSearchRequest) -> pd.DataFrame:
+        """Get id-unique case rows matching the search criteria, newest first"""
+        order = await self._ordered_matches(search_request)
+        return case_store.rows(order).reset_index(drop=True)
+
+    async def get_cases_by_ids(self, ids: List[str]) -> Tuple[List[CaseDetail], List[str]]:
+        """Cases with detail data for the given ids, in request order, and the
+        ids that have none. Rows are found through the view's id hash index.
+        """
+        view = await case_store.get_view(self)
+        ids = list(dict.fromkeys(ids))
+        positions = case_store.positions_of(ids)
+        found = positions >= 0
+        if "has_detail" in view.columns:
+            found[found] = view["has_detail"].to_numpy()[positions[found]]
+        missing = [case_id for case_id, hit in zip(ids, found) if not hit]
+        if not found.any():
+            return [], missing
+        return self._case_details(case_store.with_text(case_store.rows(positions[found]))), missing
+
+    async def _similar_cases(self, search) -> List[SimilarCase]:
+        """Run a search on the similarity index (built off the event loop on
+        first use) and build the matched detail cases with their scores.
+        """
+        view = await case_store.get_view(self)
+        if view.empty:
+            return []
+        index = case_store.vector_index or await asyncio.to_thread(case_store.similarity_index)
+        allowed = view["has_detail"].to_numpy() if "has_detail" in view.columns else None
+        positions, scores = search(index, allowed)
+        if not len(positions):
+            return []
+        cases = self._case_details(case_store.with_text(case_store.rows(positions)))
+        return [SimilarCase(score=round(float(score), 4), case=case) for score, case in zip(scores, cases)]
+
+    async def similar_to_text(self, text: str, limit: int = 10) -> List[SimilarCase]:
+        """Cases whose facts and text are most similar to a free text"""
+        return await self._similar_cases(lambda index, allowed: index.search(text, limit, allowed))
+
+    async def similar_to_case(self, case_id: str, limit: int = 10) -> Optional[List[SimilarCase]]:
+        """Cases most similar to a case, or None when there is no such case"""
+        await case_store.get_view(self)
+        position = int(case_store.positions_of([case_id])[0])
+        if position < 0:
+            return None
+        return await self._similar_cases(lambda index, allowed: index.similar(position, limit, allowed))
+
+    async def search_entities(self, query: str, limit: int = 10, min_score: float = 0.0) -> List[EntityMatch]:
+        """Penalized parties whose names best match a (partial or variant) name"""
+        await case_store.get_view(self)
+        index = case_store.entity_index
+        return [
+            EntityMatch(
+                name=index.displays[name_id], normalized=index.names[name_id],
+                score=score, case_count=int(index.case_counts[name_id]),
+            )
+            for name_id, score in index.search(query, limit, min_score)
+        ]
+
+    async def get_entity_cases(self, name: str, variants: bool = False,
+                               page: int = 1, page_size: int = 20) -> CaseSearchResponse:
+        """Cases of one party (by normalized name), newest first. With variants,
+        also the cases of names matching it with at least VARIANT_SCORE.
+        """
+        await case_store.get_view(self)
+        index = case_store.entity_index
+        name_ids = [name_id for name_id, _ in index.search(name, ENTITY_CANDIDATES, VARIANT_SCORE)] if variants else []
+        exact = index.name_id(name)
+        if exact is not None:
+            name_ids.append(exact)
+        positions = index.rows_of(name_ids)
+        total = len(positions)
+        start = (page - 1) * page_size
+        page_positions = case_store.recency_window(positions, start, start + page_size)
+        cases = self._case_details(case_store.with_text(case_store.rows(page_positions))) if len(page_positions) else []
+        return CaseSearchResponse(
+            cases=cases, total=total, page=page, page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size,
+        )
+
+    async def get_near_duplicates(self, limit: int = 50) -> NearDuplicatesResponse:
+        """Near-duplicate clusters among the detail cases, largest first"""
+        view = await self.get_case_view()
+        if view.empty:
+            return NearDuplicatesResponse(total_clusters=0, duplicate_cases=0, clusters=[])
+        clusters = case_store.near_duplicates.clusters(view.index.to_numpy())
+        ids = case_store.view["id"].to_numpy()
+        titles = case_store.view["标题"].to_numpy() if "标题" in case_store.view.columns else None
+        return NearDuplicatesResponse(
+            total_clusters=len(clusters),
+            duplicate_cases=sum(len(cluster) - 1 for cluster in clusters),
+            clusters=[
+                NearDuplicateCluster(
+                    id=str(ids[cluster[0]]),
+                    title=str(titles[cluster[0]]) if titles is not None and pd.notna(titles[cluster[0]]) else "",
+                    duplicate_ids=[str(ids[position]) for position in cluster[1:]],
+                )
+                for cluster in clusters[:limit]
+            ],
+        )
+
+    @staticmethod
+    def near_duplicate_ids(frame: pd.DataFrame, kept_ids: Optional[List[str]] = None) -> pd.Series:
+        """Id of the case each row of a case view frame near-duplicates: a kept
+        case of its cluster when there is one, otherwise the earliest published
+        row of its cluster in the frame (None for rows that are distinct).
+        """
+        kept = case_store.positions_of(kept_ids or [])
+        targets = case_store.near_duplicates.duplicate_of(frame.index.to_numpy(), kept[kept >= 0])
+        ids = case_store.view["id"].to_numpy() if not case_store.view.empty else np.empty(0, dtype=object)
+        return pd.Series([ids[t] if t >= 0 else None for t in targets], index=frame.index, dtype=object)
+
+    async def get_case(self, case_id: str) -> Optional[CaseDetail]:
+        """One case by id, or None when there is no such case"""
+        cases, _ = await self.get_cases_by_ids([case_id])
+        return cases[0] if cases else None
+
+    async def suggest_terms(self, field: str, prefix: str = "", limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Values of a case field starting with prefix, most frequent first,
+        or None when the field has no term dictionary.
+        """
+        await case_store.get_view(self)
+        suggestions = case_store.suggest(SUGGEST_ALIASES.get(field, field), prefix, limit)
+        if suggestions is None:
+            return None
+        return [{"value": value, "count": count} for value, count in suggestions]
+
+    @staticmethod
+    def _case_details(frame: pd.DataFrame) -> List[CaseDetail]:
+        """Build response cases from a (page-sized) frame, column by column"""
+        size = len(frame)
+
+        def values(column: str, default: Any = "") -> list:
+            return frame[column].tolist() if column in frame.columns else [default] * size
+
+        text_fields = {
+            "id": "id", "title": "标题", "subtitle": "文号", "content": "内容",
+            "summary": "summary", "wenhao": "wenhao", "people": "people", "event": "event",
+            "law": "law", "penalty": "penalty", "org": "org", "category": "category",
+            "province": "province",
+        }
+        fields = {field: [str(v) for v in values(column)] for field, column in text_fields.items()}
+        fields["publish_date"] = values("发布日期", date.today())
+        fields["penalty_date"] = values("penalty_date", None)
+        fields["amount"] = [float(v) if pd.notna(v) else 0 for v in values("amount", 0)]
+        fields["industry"] = [v if isinstance(v, str) else None for v in values("industry", None)]
+        return [CaseDetail(**dict(zip(fields, row))) for row in zip(*fields.values())]
+
     async def search_cases(self, search_request: CaseSearchRequest) -> CaseSearchResponse:
         """Search cases based on criteria"""
         try:
-            # Determine org scope
-            org_name = getattr(search_request, "org_name", "") or ""
-
-            # Get combined data (optionally scoped by organization)
-            detail_df = await self.get_case_detail(org_name)
-            # Fallback: if scoped read is empty, try full dataset
-            if detail_df.empty and org_name:
-                detail_df = await self.get_case_detail("")
-            analysis_df = await self.get_case_analysis(org_name)
-            category_df = await self.get_case_categories()
+            explain = {} if search_request.explain else None
+            order = await self._ordered_matches(search_request, explain)
+            total = len(order)
+            # Facets count the same matched positions, no second search
+            facets = case_store.facet_counts(order) if search_request.facets else None
             
-            if detail_df.empty:
+            if total == 0:
                 return CaseSearchResponse(
                     cases=[], total=0, page=search_request.page,
-                    page_size=search_request.page_size, total_pages=0
+                    page_size=search_request.page_size, total_pages=0,
+                    facets=facets, explain=explain
                 )
             
-            # Merge dataframes
-            merged_df = detail_df.copy()
-            if not analysis_df.empty:
-                merged_df = pd.merge(merged_df, analysis_df, on="id", how="left")
-            if not category_df.empty:
-                merged_df = pd.merge(merged_df, category_df, on="id", how="left")
-            
-            # Apply search filters
-            filtered_df = self._apply_search_filters(merged_df, search_request)
-            
-            # Pagination - use unique IDs only
-            total = filtered_df["id"].nunique() if "id" in filtered_df.columns else len(filtered_df)
+            # Pagination - view rows are unique per id
             total_pages = (total + search_request.page_size - 1) // search_request.page_size
-            start_idx = (search_request.page - 1) * search_request.page_size
-            end_idx = start_idx + search_request.page_size
-            
-            paginated_df = filtered_df.iloc[start_idx:end_idx]
-            
-            # Convert to response format
-            cases = []
-            for _, row in paginated_df.iterrows():
-                case = CaseDetail(
-                    id=str(row.get("id", "")),
-                    title=str(row.get("标题", "")),
-                    subtitle=str(row.get("文号", "")),
-                    publish_date=row.get("发布日期", date.today()),
-                    content=str(row.get("内容", "")),
-                    summary=str(row.get("summary", "")),
-                    wenhao=str(row.get("wenhao", "")),
-                    people=str(row.get("people", "")),
-                    event=str(row.get("event", "")),
-                    law=str(row.get("law", "")),
-                    penalty=str(row.get("penalty", "")),
-                    org=str(row.get("org", "")),
-                    penalty_date=row.get("penalty_date"),
-                    category=str(row.get("category", "")),
-                    amount=float(row.get("amount", 0)) if pd.notna(row.get("amount")) else 0,
-                    province=str(row.get("province", "")),
-                    industry=row.get("industry")
-                )
-                cases.append(case)
+            start = (search_request.page - 1) * search_request.page_size
+            page_df = case_store.rows(order[start:start + search_request.page_size])
+            cases = self._case_details(case_store.with_text(page_df))
             
             return CaseSearchResponse(
                 cases=cases,
                 total=total,
                 page=search_request.page,
                 page_size=search_request.page_size,
-                total_pages=total_pages
+                total_pages=total_pages,
+                facets=facets,
+                explain=explain
             )
             
+        except QuerySyntaxError:
+            raise
         except Exception as e:
             print(f"Error searching cases: {e}")
             return CaseSearchResponse(
@@ -284,17 +472,120 @@ class CaseService:
                 page_size=search_request.page_size, total_pages=0
             )
     
-    def _apply_search_filters(self, df: pd.DataFrame, search_request: CaseSearchRequest) -> pd.DataFrame:
-        """Apply search filters to dataframe"""
-        filtered_df = df.copy()
-        
-        # Date range filter
-        if search_request.start_date:
-            filtered_df = filtered_df[filtered_df["发布日期"] >= search_request.start_date]
-        if search_request.end_date:
-            filtered_df = filtered_df[filtered_df["发布日期"] <= search_request.end_date]
+    @staticmethod
+    def _take_labels(df: pd.DataFrame, labels: np.ndarray) -> pd.DataFrame:
+        """Rows of df whose index labels are in the sorted labels array"""
+        index = df.index
+        if not index.is_monotonic_increasing:
+            return df[index.isin(labels)]
+        values = index.to_numpy()
+        positions = np.searchsorted(values, labels)
+        inside = positions < len(values)
+        positions = positions[inside]
+        return df.iloc[positions[values[positions] == labels[inside]]]
+
+    def _narrow_with_index(self, df: pd.DataFrame, search_request: CaseSearchRequest) -> Tuple[pd.DataFrame, Dict[str, int]]:
+        """Cut a case view frame down to the rows inside the date and amount
+        ranges (resolved exactly on the store's sorted columns) that the bigram
+        index says can pass the text filters.
+
+        Returns the narrowed frame and, per text filter the index could
+        narrow, the number of candidate rows as its selectivity estimate.
+        """
+        rows = None
+        estimates: Dict[str, int] = {}
+
+        def restrict(candidates: Optional[np.ndarray]):
+            nonlocal rows
+            if candidates is not None:
+                rows = candidates if rows is None else np.intersect1d(rows, candidates, assume_unique=True)
+
+        if search_request.start_date or search_request.end_date:
+            restrict(case_store.date_range(search_request.start_date, search_request.end_date))
+        if search_request.min_penalty:
+            restrict(case_store.amount_at_least(search_request.min_penalty))
+
+        text_filters = [
+            ("wenhao", search_request.wenhao_text),
+            ("people", search_request.people_text),
+            ("event", search_request.event_text),
+            ("law", search_request.law_text),
+            ("penalty", search_request.penalty_text),
+            ("标题", getattr(search_request, "title_text", "")),
+        ]
+        for column, text in text_filters:
+            if text and column in df.columns:
+                for term in split_terms(text):
+                    candidates = case_store.index_candidates([column], term)
+                    if candidates is not None:
+                        estimates[column] = min(estimates.get(column, len(candidates)), len(candidates))
+                    restrict(candidates)
+
+        keyword = TermMatcher(getattr(search_request, "keyword", ""))
+        if keyword:
+            columns = [c for c in KEYWORD_COLUMNS if c in df.columns]
+            categorical = [c for c in columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+            others = [c for c in columns if c not in categorical]
+            if TEXT_COLUMN not in columns and TEXT_OFFSET_COLUMN in df.columns:
+                others.append(TEXT_COLUMN)
+            if all(c in INDEXED_COLUMNS for c in others):
+                # Categorical columns are matched through their few categories
+                labels = df.index.to_numpy()
+                categorical_hits = [keyword.term_hits(df[col]) for col in categorical]
+                for i, term in enumerate(keyword.terms):
+                    candidates = case_store.index_candidates(others, term) if others else np.empty(0, dtype=np.int64)
+                    if candidates is None:
+                        continue
+                    candidates = union_rows(candidates, *(labels[hits[:, i]] for hits in categorical_hits))
+                    estimates["keyword"] = min(estimates.get("keyword", len(candidates)), len(candidates))
+                    restrict(candidates)
+
+        if rows is None:
+            return df, estimates
+        return self._take_labels(df, rows), estimates
+
+    @staticmethod
+    def _keyword_mask(df: pd.DataFrame, matcher: TermMatcher) -> np.ndarray:
+        """Rows where every keyword term is found, each in any keyword column"""
+        existing_columns = [c for c in KEYWORD_COLUMNS if c in df.columns]
+        # Full text lives in the case store's blob and is only read for
+        # rows still missing a term
+        search_text = TEXT_COLUMN not in df.columns and TEXT_OFFSET_COLUMN in df.columns
+        if not existing_columns and not search_text:
+            return np.ones(len(df), dtype=bool)
+        hits = np.zeros((len(df), len(matcher.terms)), dtype=bool)
+        for col in existing_columns:
+            hits |= matcher.term_hits(df[col])
+        pending = ~hits.all(axis=1)
+        if search_text and pending.any():
+            hits[pending] |= matcher.text_hits(case_store.texts(df[pending]).tolist())
+        return hits.all(axis=1)
+
+    def _filter_cases(self, df: pd.DataFrame, search_request: CaseSearchRequest,
+                      use_index: bool = False) -> pd.DataFrame:
+        """Rows of df matching the search filters, in no particular order.
+        With use_index, df must be the case view or a row subset of it: date and
+        amount ranges and index candidates are resolved first, and the text
+        filters then run on the surviving rows, most selective first.
+        """
+        estimates: Dict[str, int] = {}
+        if use_index:
+            filtered_df, estimates = self._narrow_with_index(df, search_request)
+        else:
+            filtered_df = df
+            # Date range filter
+            if search_request.start_date:
+                filtered_df = filtered_df[filtered_df["发布日期"] >= search_request.start_date]
+            if search_request.end_date:
+                filtered_df = filtered_df[filtered_df["发布日期"] <= search_request.end_date]
+            # Amount filter
+            if search_request.min_penalty and "amount" in filtered_df.columns:
+                filtered_df = filtered_df[
+                    filtered_df["amount"].fillna(0) >= search_request.min_penalty
+                ]
         
-        # Text filters
+        # Text filters, as (estimated rows kept, filter name, mask function).
+        # Categorical columns match through their categories and go first.
         text_filters = [
             ("wenhao", search_request.wenhao_text),
             ("people", search_request.people_text),
@@ -304,183 +595,174 @@ class CaseService:
             ("org", search_request.org_text),
             ("industry", search_request.industry),
             ("province", search_request.province),
+            # Title filter (from app.py 案情经过)
+            ("标题", getattr(search_request, "title_text", "")),
         ]
-        
+        unknown = len(df) + 1
+        predicates = []
         for column, text in text_filters:
-            if text and column in filtered_df.columns:
-                pattern = self._split_words(text)
-                if pattern:
-                    filtered_df = filtered_df[
-                        filtered_df[column].astype(str).str.contains(pattern, case=False, na=False, regex=True)
-                    ]
-
-        # Title filter (from app.py 案情经过)
-        if getattr(search_request, "title_text", "") and "标题" in filtered_df.columns:
-            title_pattern = self._split_words(search_request.title_text)
-            if title_pattern:
-                filtered_df = filtered_df[
-                    filtered_df["标题"].astype(str).str.contains(title_pattern, case=False, na=False, regex=True)
-                ]
-        
-        # Amount filter
-        if search_request.min_penalty and "amount" in filtered_df.columns:
-            filtered_df = filtered_df[
-                pd.to_numeric(filtered_df["amount"], errors='coerce').fillna(0) >= search_request.min_penalty
-            ]
-
-        # General keyword filter across multiple fields
-        if getattr(search_request, "keyword", ""):
-            keyword_pattern = self._split_words(search_request.keyword)
-            if keyword_pattern:
-                candidate_columns = [
-                    "标题", "文号", "内容", "wenhao", "people", "event",
-                    "law", "penalty", "org", "province", "industry", "category"
-                ]
-                existing_columns = [c for c in candidate_columns if c in filtered_df.columns]
-                if existing_columns:
-                    mask = pd.Series(False, index=filtered_df.index)
-                    for col in existing_columns:
-                        mask = mask | filtered_df[col].astype(str).str.contains(keyword_pattern, case=False, na=False, regex=True)
-                    filtered_df = filtered_df[mask]
-        
-        # Sort by date descending (fallback to id when date not available)
-        if "发布日期" in filtered_df.columns and filtered_df["发布日期"].notna().any():
-            filtered_df = filtered_df.sort_values(["发布日期", "id"], ascending=[False, False])
-        elif "id" in filtered_df.columns:
-            filtered_df = filtered_df.sort_values("id", ascending=False)
-        
-        # Remove duplicates
-        if "id" in filtered_df.columns:
-            filtered_df = filtered_df.drop_duplicates(subset=["id"])
-        
-        return filtered_df.reset_index(drop=True)
-    
+            matcher = TermMatcher(text)
+            if matcher and column in filtered_df.columns:
+                categorical = isinstance(filtered_df[column].dtype, pd.CategoricalDtype)
+                predicates.append((
+                    0 if categorical else estimates.get(column, unknown),
+                    column,
+                    lambda frame, matcher=matcher, column=column: matcher.matches(frame[column]).to_numpy(),
+                ))
+
+        # General keyword filter across multiple fields: every term must be
+        # found, each in any of the columns
+        keyword_matcher = TermMatcher(getattr(search_request, "keyword", ""))
+        if keyword_matcher:
+            predicates.append((
+                estimates.get("keyword", unknown),
+                "keyword",
+                lambda frame: self._keyword_mask(frame, keyword_matcher),
+            ))
+
+        for _, _, mask in sorted(predicates, key=lambda predicate: predicate[0]):
+            if filtered_df.empty:
+                break
+            filtered_df = filtered_df[mask(filtered_df)]
+        return filtered_df
+
+    async def _dataset_overview(self) -> Dict[str, Any]:
+        """Id count and date range of every source dataset, recomputed only
+        when its files change.
+        """
+        signature: Dict[str, Any] = {
+            family: dataset_cache.signature(self._find_local_files(family))
+            for family in OVERVIEW_FAMILIES
+        }
+        if self.use_db:
+            signature["db_epoch"] = int(time.time() // DB_REFRESH_SECONDS)
+        if self._overview is not None and self._overview[0] == signature:
+            return self._overview[1]
+
+        # Load all relevant datasets
+        summary_df = await self.get_case_summary("")
+        detail_df = await self.get_case_detail("")
+        analysis_df = await self.get_case_analysis("")
+        category_df = await self.get_case_categories()
+
+        def compute_total_and_range(df: pd.DataFrame, preferred_id: Optional[str] = None) -> Tuple[int, Dict[str, str]]:
+            if df is None or df.empty:
+                return 0, {}
+            # Count by unique id if present
+            identifier_col = None
+            candidates = []
+            if preferred_id:
+                candidates.append(preferred_id)
+            candidates.extend(["id", "docId"])  # generic fallbacks
+            # de-duplicate while preserving order
+            seen = set()
+            candidates = [c for c in candidates if not (c in seen or seen.add(c))]
+            for candidate in candidates:
+                if candidate in df.columns:
+                    identifier_col = candidate
+                    break
+            if identifier_col:
+                # Ensure consistent type for uniqueness
+                total = df[identifier_col].astype(str).nunique()
+            else:
+                total = len(df)
+            # Determine date column priority
+            date_col_name = None
+            for candidate in ["发布日期", "publishDate", "publish_date", "penalty_date", "date"]:
+                if candidate in df.columns:
+                    date_col_name = candidate
+                    break
+            if not date_col_name:
+                return total, {}
+            date_series = pd.to_datetime(df[date_col_name], errors='coerce')
+            date_series = date_series.dropna()
+            if date_series.empty:
+                return total, {}
+            return total, {"start": str(date_series.min().date()), "end": str(date_series.max().date())}
+
+        overview: Dict[str, Any] = {}
+        for family, df, preferred_id in (
+            ("cbircsum", summary_df, "docId"),
+            ("cbircdtl", detail_df, "id"),
+            ("cbirccat", category_df, "id"),
+            ("cbircsplit", analysis_df, "id"),
+        ):
+            total, date_range = compute_total_and_range(df, preferred_id=preferred_id)
+            overview[f"{family}_total"] = int(total)
+            overview[f"{family}_date_range"] = date_range
+
+        # Debug logs for verification
+        self.logger.info(
+            f"Datasets loaded: cbircsum={len(summary_df)}, cbircdtl={len(detail_df)}, "
+            f"cbirccat={len(category_df)}, cbircsplit={len(analysis_df)}"
+        )
+        self.logger.info(
+            f"Computed totals: cbircsum={overview['cbircsum_total']}, cbircdtl={overview['cbircdtl_total']}, "
+            f"cbirccat={overview['cbirccat_total']}, cbircsplit={overview['cbircsplit_total']}"
+        )
+        self._overview = (signature, overview)
+        return overview
+
+    @staticmethod
+    def _ranked_counts(rollup: pd.DataFrame, column: str) -> Dict[str, int]:
+        """Case counts of a rollup by one dimension, largest first, as
+        value_counts lists them (ties keep the rollup order)
+        """
+        counts = rollup[rollup[column].notna() & (rollup["cases"] > 0)]
+        counts = counts.sort_values("cases", ascending=False, kind="stable")
+        return {label: int(cases) for label, cases in zip(counts[column], counts["cases"])}
+
     async def get_case_stats(self) -> CaseStats:
         """Get overall case statistics"""
         try:
-            # Load all relevant datasets
-            summary_df = await self.get_case_summary("")
-            detail_df = await self.get_case_detail("")
-            analysis_df = await self.get_case_analysis("")
-            category_df = await self.get_case_categories()
-            
-            # Compute dataset overview first (regardless of detail availability)
-            def compute_total_and_range(df: pd.DataFrame, preferred_id: Optional[str] = None) -> Tuple[int, Dict[str, str]]:
-                if df is None or df.empty:
-                    return 0, {}
-                # Count by unique id if present
-                identifier_col = None
-                candidates = []
-                if preferred_id:
-                    candidates.append(preferred_id)
-                candidates.extend(["id", "docId"])  # generic fallbacks
-                # de-duplicate while preserving order
-                seen = set()
-                candidates = [c for c in candidates if not (c in seen or seen.add(c))]
-                for candidate in candidates:
-                    if candidate in df.columns:
-                        identifier_col = candidate
-                        break
-                if identifier_col:
-                    # Ensure consistent type for uniqueness
-                    total = df[identifier_col].astype(str).nunique()
-                else:
-                    total = len(df)
-                # Determine date column priority
-                date_col_name = None
-                for candidate in ["发布日期", "publishDate", "publish_date", "penalty_date", "date"]:
-                    if candidate in df.columns:
-                        date_col_name = candidate
-                        break
-                if not date_col_name:
-                    return total, {}
-                date_series = pd.to_datetime(df[date_col_name], errors='coerce')
-                date_series = date_series.dropna()
-                if date_series.empty:
-                    return total, {}
-                return total, {"start": str(date_series.min().date()), "end": str(date_series.max().date())}
-
-            cbircsum_total, cbircsum_range = compute_total_and_range(summary_df, preferred_id="docId")
-            cbircdtl_total, cbircdtl_range = compute_total_and_range(detail_df, preferred_id="id")
-            cbirccat_total, cbirccat_range = compute_total_and_range(category_df, preferred_id="id")
-            cbircsplit_total, cbircsplit_range = compute_total_and_range(analysis_df, preferred_id="id")
-
-            # Debug logs for verification
-            try:
-                self.logger.info(
-                    f"Datasets loaded: cbircsum={len(summary_df) if summary_df is not None else 0}, "
-                    f"cbircdtl={len(detail_df) if detail_df is not None else 0}, "
-                    f"cbirccat={len(category_df) if category_df is not None else 0}, "
-                    f"cbircsplit={len(analysis_df) if analysis_df is not None else 0}"
-                )
-                self.logger.info(
-                    f"Computed totals: cbircsum={cbircsum_total}, cbircdtl={cbircdtl_total}, "
-                    f"cbirccat={cbirccat_total}, cbircsplit={cbircsplit_total}"
-                )
-            except Exception:
-                pass
+            overview = await self._dataset_overview()
 
-            if detail_df.empty:
+            if overview["cbircdtl_total"] == 0:
                 # Return with dataset overviews even when detail data is missing
                 return CaseStats(
-                    total_cases=int(cbircdtl_total),
+                    total_cases=overview["cbircdtl_total"],
                     total_amount=0, avg_amount=0,
-                    date_range=cbircdtl_range,
+                    date_range=overview["cbircdtl_date_range"],
                     by_province={}, by_industry={}, by_month={},
-                    cbircsum_total=int(cbircsum_total),
-                    cbircsum_date_range=cbircsum_range,
-                    cbircdtl_total=int(cbircdtl_total),
-                    cbircdtl_date_range=cbircdtl_range,
-                    cbirccat_total=int(cbirccat_total),
-                    cbirccat_date_range=cbirccat_range,
-                    cbircsplit_total=int(cbircsplit_total),
-                    cbircsplit_date_range=cbircsplit_range,
+                    **overview,
                 )
             
-            # Merge with category data
-            if not category_df.empty:
-                merged_df = pd.merge(detail_df, category_df, on="id", how="left")
-            else:
-                merged_df = detail_df.copy()
+            # Joined case view (detail + category fields), aggregated in the cube
+            view = await self.get_case_view(require_detail=False)
+            detail_positions = np.flatnonzero(view["has_detail"].to_numpy()) if not view.empty else np.empty(0, dtype=np.int64)
+            cube = case_store.aggregates
             
-            # Calculate stats - use unique IDs only
-            total_cases = merged_df["id"].nunique() if "id" in merged_df.columns else len(merged_df)
+            # Calculate stats - ids are unique in the view
+            totals = cube.rollup([], has_detail=True)
+            total_cases = int(totals["cases"].sum())
+            clusters = case_store.near_duplicates.clusters(detail_positions)
+            distinct_cases = total_cases - sum(len(cluster) - 1 for cluster in clusters)
             
             # Amount statistics
-            amount_col = merged_df.get("amount", pd.Series(dtype=float))
-            valid_amounts = pd.to_numeric(amount_col, errors='coerce').dropna()
-            total_amount = valid_amounts.sum() if not valid_amounts.empty else 0
-            avg_amount = valid_amounts.mean() if not valid_amounts.empty else 0
+            amounts = int(totals["amounts"].sum())
+            total_amount = totals["amount_sum"].sum() if amounts else 0
+            avg_amount = total_amount / amounts if amounts else 0
             
-            # Date range (robust handling of mixed types)
+            # Date range
             date_range = {}
-            if "发布日期" in merged_df.columns and not merged_df["发布日期"].empty:
-                pub_series = pd.to_datetime(merged_df["发布日期"], errors='coerce')
-                pub_series = pub_series.dropna()
-                if not pub_series.empty:
-                    min_date = pub_series.min().date()
-                    max_date = pub_series.max().date()
-                    date_range = {"start": str(min_date), "end": str(max_date)}
-            
-            # Province statistics
-            by_province = {}
-            if "province" in merged_df.columns:
-                province_counts = merged_df["province"].value_counts()
-                by_province = province_counts.to_dict()
-            
-            # Industry statistics
-            by_industry = {}
-            if "industry" in merged_df.columns:
-                industry_counts = merged_df["industry"].value_counts()
-                by_industry = industry_counts.to_dict()
+            if totals["first_day"].notna().any():
+                date_range = {
+                    "start": str(totals["first_day"].min().date()),
+                    "end": str(totals["last_day"].max().date()),
+                }
+            
+            # Provinces and industries are categorical: ties in category order
+            by_province = self._ranked_counts(
+                cube.rollup(["province"], has_detail=True).sort_values("province", kind="stable"), "province"
+            )
+            by_industry = self._ranked_counts(
+                cube.rollup(["industry"], has_detail=True).sort_values("industry", kind="stable"), "industry"
+            )
             
-            # Monthly statistics
-            by_month = {}
-            if "发布日期" in merged_df.columns:
-                pub_series = pd.to_datetime(merged_df["发布日期"], errors='coerce')
-                month_series = pub_series.dt.strftime("%Y-%m").fillna("")
-                month_counts = month_series.value_counts()
-                by_month = month_counts.to_dict()
+            # Monthly statistics (cases without a date under "")
+            months = cube.rollup(["month"], has_detail=True)
+            months["month"] = months["month"].fillna("")
+            by_month = self._ranked_counts(months, "month")
             
             return CaseStats(
                 total_cases=total_cases,
@@ -490,14 +772,9 @@ class CaseService:
                 by_province=by_province,
                 by_industry=by_industry,
                 by_month=by_month,
-                cbircsum_total=int(cbircsum_total),
-                cbircsum_date_range=cbircsum_range,
-                cbircdtl_total=int(cbircdtl_total),
-                cbircdtl_date_range=cbircdtl_range,
-                cbirccat_total=int(cbirccat_total),
-                cbirccat_date_range=cbirccat_range,
-                cbircsplit_total=int(cbircsplit_total),
-                cbircsplit_date_range=cbircsplit_range,
+                distinct_cases=int(distinct_cases),
+                near_duplicate_clusters=len(clusters),
+                **overview,
             )
             
         except Exception as e:
@@ -510,36 +787,20 @@ class CaseService:
     async def get_monthly_trends(self) -> List[MonthlyTrend]:
         """Get monthly trend data"""
         try:
-            detail_df = await self.get_case_detail("")
-            category_df = await self.get_case_categories()
-            
-            if detail_df.empty:
-                return []
-            
-            # Merge with category data for amounts
-            if not category_df.empty:
-                merged_df = pd.merge(detail_df, category_df, on="id", how="left")
-            else:
-                merged_df = detail_df.copy()
+            await case_store.get_view(self)
             
-            # Group by month
-            merged_df["month"] = merged_df["发布日期"].apply(
-                lambda x: x.strftime("%Y-%m") if pd.notna(x) else ""
-            )
-            
-            monthly_stats = merged_df.groupby("month").agg({
-                "id": "count",
-                "amount": lambda x: pd.to_numeric(x, errors='coerce').sum()
-            }).reset_index()
+            # Month rollup of the cube
+            monthly_stats = case_store.aggregates.rollup(["month"], has_detail=True)
+            # Skip cases without a date
+            monthly_stats = monthly_stats[monthly_stats["month"].notna() & (monthly_stats["month"] != "")]
             
             trends = []
             for _, row in monthly_stats.iterrows():
-                if row["month"]:  # Skip empty months
-                    trends.append(MonthlyTrend(
-                        month=row["month"],
-                        count=int(row["id"]),
-                        amount=float(row["amount"]) if pd.notna(row["amount"]) else 0
-                    ))
+                trends.append(MonthlyTrend(
+                    month=row["month"],
+                    count=int(row["cases"]),
+                    amount=float(row["amount_sum"])
+                ))
             
             return sorted(trends, key=lambda x: x.month)
             
@@ -550,40 +811,22 @@ class CaseService:
     async def get_regional_stats(self) -> List[RegionalStats]:
         """Get regional statistics"""
         try:
-            detail_df = await self.get_case_detail("")
-            category_df = await self.get_case_categories()
-            
-            if detail_df.empty:
-                return []
-            
-            # Merge with category data
-            if not category_df.empty:
-                merged_df = pd.merge(detail_df, category_df, on="id", how="left")
-            else:
-                merged_df = detail_df.copy()
-            
-            if "province" not in merged_df.columns:
-                return []
+            await case_store.get_view(self)
             
-            # Group by province
-            regional_stats = merged_df.groupby("province").agg({
-                "id": "count",
-                "amount": [lambda x: pd.to_numeric(x, errors='coerce').sum(),
-                          lambda x: pd.to_numeric(x, errors='coerce').mean()]
-            }).reset_index()
-            
-            # Flatten column names
-            regional_stats.columns = ["province", "count", "total_amount", "avg_amount"]
+            # Province rollup of the cube, in category order
+            regional_stats = case_store.aggregates.rollup(["province"], has_detail=True)
+            # Skip cases without a province
+            regional_stats = regional_stats[regional_stats["province"].notna() & (regional_stats["province"] != "")]
+            regional_stats = regional_stats.sort_values("province", kind="stable")
             
             stats = []
             for _, row in regional_stats.iterrows():
-                if row["province"]:  # Skip empty provinces
-                    stats.append(RegionalStats(
-                        province=row["province"],
-                        count=int(row["count"]),
-                        amount=float(row["total_amount"]) if pd.notna(row["total_amount"]) else 0,
-                        avg_amount=float(row["avg_amount"]) if pd.notna(row["avg_amount"]) else 0
-                    ))
+                stats.append(RegionalStats(
+                    province=row["province"],
+                    count=int(row["cases"]),
+                    amount=float(row["amount_sum"]),
+                    avg_amount=float(row["amount_sum"] / row["amounts"]) if row["amounts"] else 0
+                ))
             
             return sorted(stats, key=lambda x: x.count, reverse=True)
             
@@ -591,6 +834,46 @@ class CaseService:
             print(f"Error getting regional stats: {e}")
             return []
 
+    async def get_classification_stats(self) -> Dict[str, Any]:
+        """Classified vs unclassified detail cases, overall and per month,
+        and categorized cases per industry, from the aggregate cube
+        """
+        view = await self.get_case_view(require_detail=False)
+        cube = case_store.aggregates
+        if view.empty or not view["has_detail"].any():
+            return {
+                "total_cases": 0,
+                "categorized_cases": 0,
+                "uncategorized_cases": 0,
+                "categories": {},
+                "monthly_stats": {}
+            }
+
+        # Cases are counted by unique id
+        total_cases = int(cube.rollup([], has_detail=True)["cases"].sum())
+        categorized_cases = int(cube.rollup([], has_category=True)["cases"].sum())
+
+        industries = cube.rollup(["industry"], has_category=True)
+        industries = industries[industries["industry"].notna() & (industries["industry"] != "")]
+        categories = {str(k): int(v) for k, v in self._ranked_counts(industries, "industry").items()}
+
+        months = cube.rollup(["month", "has_category"], has_detail=True)
+        months = months[months["month"].notna()]
+        totals = months.groupby("month")["cases"].sum()
+        categorized = months[months["has_category"].astype(bool)].groupby("month")["cases"].sum()
+        monthly_stats = {
+            month: {"total": int(total), "categorized": int(categorized.get(month, 0))}
+            for month, total in totals.items()
+        }
+
+        return {
+            "total_cases": total_cases,
+            "categorized_cases": categorized_cases,
+            "uncategorized_cases": total_cases - categorized_cases,
+            "categories": categories,
+            "monthly_stats": monthly_stats
+        }
+
 
 # Global service instance
 case_service = CaseService()
\ No newline at end of file
@@ -0,0 +1,683 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.aggregate_cube import AggregateCube, DIMENSIONS as CUBE_DIMENSIONS
+from app.services.dataset_cache import dataset_cache
+from app.services.entity_index import EntityIndex
+from app.services.near_duplicates import NearDuplicateIndex
+from app.services.ngram_index import NgramIndex
+from app.services.term_dictionary import TermDictionary
+from app.services.vector_index import VectorIndex
+from app.services.text_blob import TextBlob, TEXT_OFFSET_COLUMN, TEXT_LENGTH_COLUMN
+
+logger = logging.getLogger(__name__)
+
+# Source dataset families joined into the case view, with their presence flag
+SOURCE_FLAGS = {
+    "cbircdtl": "has_detail",
+    "cbircsplit": "has_analysis",
+    "cbirccat": "has_category",
+}
+FLAG_SUFFIXES = {
+    "has_detail": "_detail",
+    "has_analysis": "_analysis",
+    "has_category": "_cat",
+}
+# Fields owned by the category dataset when it provides them
+CATEGORY_FIELDS = ["amount", "industry", "category", "province"]
+ORG_CODES = {
+    "银保监会机关": "jiguan",
+    "银保监局本级": "benji",
+    "银保监分局本级": "fenju",
+}
+# Low-cardinality text columns stored as categoricals, so filters and group-bys
+# run on integer codes instead of repeated strings
+CATEGORICAL_COLUMNS = ["province", "industry", "category", "org", "org_level"]
+# Full-text column kept out of the view in a memory-mapped blob
+TEXT_COLUMN = "内容"
+# Free-text columns covered by the bigram index (categorical columns are
+# matched through their categories instead)
+INDEXED_COLUMNS = ["标题", "文号", TEXT_COLUMN, "wenhao", "people", "event", "law", "penalty"]
+# Text fields vectorized for similar-case search (full text after the facts)
+SIMILARITY_COLUMNS = ["event", TEXT_COLUMN]
+# Text fingerprinted for near-duplicate detection: the full text, or the
+# facts for rows without detail
+FINGERPRINT_COLUMNS = [TEXT_COLUMN, "event"]
+# Penalized parties, indexed by normalized name for fuzzy entity search
+ENTITY_COLUMN = "people"
+# Fields with a term dictionary for autocomplete
+SUGGEST_COLUMNS = ["province", "industry", "category", "org", "law", "people"]
+# Categorical columns counted per search result, plus the month and amount facets
+FACET_COLUMNS = ["province", "industry", "category"]
+# Amount buckets, as the penalty distribution analytics reports them
+AMOUNT_BUCKETS = [
+    (0, "0-1万"), (10000, "1-5万"), (50000, "5-10万"),
+    (100000, "10-50万"), (500000, "50-100万"), (1000000, "100万以上"),
+]
+DATE_COLUMN = "发布日期"
+AMOUNT_COLUMN = "amount"
+# Database-backed loaders have no file signature, so the view is rebuilt periodically
+DB_REFRESH_SECONDS = 300
+
+_ORG_FILE_PATTERN = re.compile(r"^cbircdtl(jiguan|benji|fenju)")
+_ID_FLOAT_SUFFIX = re.compile(r"\.0$")
+
+
+def normalize_ids(ids: pd.Series) -> pd.Series:
+    """Normalize case ids to stripped strings (e.g. 12345.0 -> "12345")"""
+    return ids.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def _normalize_id(value: Any) -> str:
+    """normalize_ids for a single id"""
+    return _ID_FLOAT_SUFFIX.sub("", str(value).strip())
+
+
+def decode_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """Return df with categorical columns turned back into plain object columns"""
+    categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    return df.astype({c: object for c in categorical})
+
+
+def _prepare_source(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize ids and keep the latest row per id"""
+    if df is None or df.empty or "id" not in df.columns:
+        return pd.DataFrame()
+    df = df[df["id"].notna()].copy()
+    df["id"] = normalize_ids(df["id"])
+    return df.drop_duplicates(subset=["id"], keep="last")
+
+
+class SortedColumn:
+    """View row positions ordered by one numeric column, for range lookups"""
+
+    def __init__(self, values: np.ndarray, valid: Optional[np.ndarray] = None):
+        positions = np.arange(len(values), dtype=np.int64) if valid is None else np.flatnonzero(valid)
+        order = np.argsort(values[positions], kind="stable")
+        self.positions = positions[order]
+        self.values = values[positions][order]
+
+    def between(self, low=None, high=None) -> np.ndarray:
+        """Sorted positions of rows with low <= value <= high (bounds optional)"""
+        start = 0 if low is None else int(np.searchsorted(self.values, low, side="left"))
+        end = len(self.values) if high is None else int(np.searchsorted(self.values, high, side="right"))
+        return np.sort(self.positions[start:end])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.positions.nbytes + self.values.nbytes)
+
+
+class Facet:
+    """Bucket code of every view row for one facet (-1 when the row has none)"""
+
+    def __init__(self, codes: np.ndarray, labels: List[str], ranked: bool = True):
+        self.codes = codes.astype(np.int32)
+        self.labels = labels
+        # Ranked facets list buckets by count, others in label order
+        self.ranked = ranked
+
+    def counts(self, positions: np.ndarray) -> Dict[str, int]:
+        counts = np.bincount(self.codes[positions] + 1, minlength=len(self.labels) + 1)[1:]
+        order = np.argsort(-counts, kind="stable") if self.ranked else np.arange(len(counts))
+        return {self.labels[i]: int(counts[i]) for i in order if counts[i]}
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+
+def _date_days(dates: pd.Series) -> np.ndarray:
+    """Dates as datetime64[D] values (NaT for missing values)"""
+    return pd.to_datetime(dates, errors="coerce").to_numpy().astype("datetime64[D]")
+
+
+class CaseStore:
+    """Materialized, id-unique join of case detail, analysis and category data.
+
+    The view is an outer join on ``id`` of the three datasets, with
+    ``has_detail``/``has_analysis``/``has_category`` flags telling which sources
+    contributed to each row. Column names are owned by the first source that
+    provides them (category owns amount/industry/category/province); clashing
+    columns from other sources get a ``_detail``/``_analysis``/``_cat`` suffix.
+
+    ``amount`` is parsed to float64 once here and the columns in
+    ``CATEGORICAL_COLUMNS`` are stored as pandas Categoricals. The full text
+    (``内容``) is not held in the view: it lives in a memory-mapped
+    ``TextBlob`` and each row keeps its ``_text_offset``/``_text_length``.
+    Use ``texts``/``with_text``/``texts_at`` to read it for the rows
+    that are actually needed, before the next ``await`` (a rebuild swaps the
+    view and blob together).
+
+    ``INDEXED_COLUMNS`` are covered by a bigram ``NgramIndex`` keyed on view
+    row positions; ``index_candidates`` narrows text searches to the rows
+    that can match. ``发布日期`` and ``amount`` are also kept as sorted
+    permutations so ``date_range``/``amount_at_least`` resolve by binary search,
+    and every row has a recency rank (newest ``发布日期`` first, then id) so
+    ``recency_window`` can cut a page of results without sorting them all.
+    ``SUGGEST_COLUMNS`` get a ``TermDictionary`` of their values and case
+    counts, answering ``suggest`` prefix lookups.
+    ``similarity_index`` lazily builds a TF-IDF ``VectorIndex`` over the facts
+    and full text for similar-case search. ``positions_of`` finds rows by id
+    through a hash index on ``id``, and ``facet_counts`` counts result rows
+    per province/industry/category, month and amount bucket from per-row
+    codes kept with the view. ``entity_index`` holds the normalized party
+    names of ``people`` with bigram blocking keys for fuzzy entity search.
+    Every row's text is SimHash-fingerprinted as it enters the view, and
+    ``near_duplicates`` clusters the fingerprints (the earliest published
+    case of a cluster represents it). ``aggregates`` is an ``AggregateCube``
+    of case counts and amounts per month, province, industry, category,
+    organization level and source, kept up to date as rows land, so the
+    dashboards read rollups instead of regrouping the view.
+
+    The view is rebuilt from scratch when source files are changed or removed
+    and updated incrementally when new files are only added. The returned
+    frame is shared and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self.view: pd.DataFrame = pd.DataFrame()
+        self.version = 0
+        self.full_builds = 0
+        self.incremental_updates = 0
+        self.built_at: Optional[float] = None
+        self.last_build_seconds = 0.0
+        self._signature: Optional[Dict[str, Any]] = None
+        self._owners: Dict[str, str] = {}
+        self._lock = asyncio.Lock()
+        self.text = TextBlob()
+        self.ngram_index: Optional[NgramIndex] = None
+        self.sorted_columns: Dict[str, SortedColumn] = {}
+        self.recency_order = np.empty(0, dtype=np.int64)
+        self.recency_rank = np.empty(0, dtype=np.int64)
+        self.term_dictionaries: Dict[str, TermDictionary] = {}
+        self.facets: Dict[str, Facet] = {}
+        self.id_index = pd.Index([], dtype=object)
+        self.entity_index = EntityIndex.build([], np.empty(0, dtype=np.int64))
+        # Built on first similarity search, see similarity_index
+        self.vector_index: Optional[VectorIndex] = None
+        self.near_duplicates = NearDuplicateIndex()
+        self.aggregates = AggregateCube()
+
+    def source_signature(self, service) -> Dict[str, Any]:
+        """Signature of every local file feeding the view"""
+        signature: Dict[str, Any] = {
+            family: dataset_cache.signature(service._find_local_files(family))
+            for family in SOURCE_FLAGS
+        }
+        if service.use_db:
+            signature["db_epoch"] = int(time.time() // DB_REFRESH_SECONDS)
+        return signature
+
+    async def get_view(self, service) -> pd.DataFrame:
+        """Return the case view, building or updating it when sources changed"""
+        signature = self.source_signature(service)
+        if self._signature is not None and signature == self._signature:
+            return self.view
+
+        async with self._lock:
+            if self._signature is not None and signature == self._signature:
+                return self.view
+            start = time.perf_counter()
+            added_files = self._added_files(signature)
+            if added_files is None:
+                await self._rebuild(service)
+                self.full_builds += 1
+            else:
+                self._apply_new_files(service, added_files)
+                self.incremental_updates += 1
+            self._signature = signature
+            self.version += 1
+            self.built_at = time.time()
+            self.last_build_seconds = time.perf_counter() - start
+            logger.info(
+                f"Case view {'rebuilt' if added_files is None else 'updated'}: "
+                f"{len(self.view)} rows in {self.last_build_seconds:.3f}s"
+            )
+        return self.view
+
+    def invalidate(self):
+        """Force a full rebuild on next access"""
+        self._signature = None
+
+    def stats(self) -> Dict[str, Any]:
+        view = self.view
+        return {
+            "version": self.version,
+            "rows": int(len(view)),
+            "columns": int(len(view.columns)),
+            "detail_rows": int(view["has_detail"].sum()) if "has_detail" in view.columns else 0,
+            "full_builds": self.full_builds,
+            "incremental_updates": self.incremental_updates,
+            "built_at": self.built_at,
+            "last_build_seconds": round(self.last_build_seconds, 4),
+        }
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Resident memory of the view per column"""
+        view = self.view
+        usage = view.memory_usage(deep=True, index=False) if not view.empty else pd.Series(dtype="int64")
+        return {
+            "rows": int(len(view)),
+            "total_bytes": int(usage.sum()),
+            "columns": {
+                col: {"dtype": str(view[col].dtype), "bytes": int(usage[col])}
+                for col in view.columns
+            },
+            # Memory-mapped, paged in only for the rows that are read
+            "text_blob_bytes": self.text.size,
+            "ngram_index_bytes": self.ngram_index.memory_bytes() if self.ngram_index else {},
+            "sorted_column_bytes": {col: index.nbytes for col, index in self.sorted_columns.items()},
+            "term_dictionary_bytes": {col: terms.nbytes for col, terms in self.term_dictionaries.items()},
+            "entity_index_bytes": self.entity_index.nbytes,
+            "facet_bytes": {name: facet.nbytes for name, facet in self.facets.items()},
+            "vector_index_bytes": self.vector_index.nbytes if self.vector_index else 0,
+            "near_duplicate_bytes": self.near_duplicates.nbytes,
+            "aggregate_cube_bytes": self.aggregates.nbytes,
+        }
+
+    def texts(self, frame: pd.DataFrame) -> pd.Series:
+        """Full text for the rows of a frame taken from the view"""
+        if TEXT_OFFSET_COLUMN not in frame.columns:
+            return pd.Series(None, index=frame.index, dtype=object)
+        values = self.text.take(frame[TEXT_OFFSET_COLUMN].to_numpy(), frame[TEXT_LENGTH_COLUMN].to_numpy())
+        return pd.Series(values, index=frame.index, dtype=object)
+
+    def texts_at(self, positions: np.ndarray) -> List[Optional[str]]:
+        """Full text of the view rows at the given positions"""
+        if TEXT_OFFSET_COLUMN not in self.view.columns:
+            return [None] * len(positions)
+        return self.text.take(
+            self.view[TEXT_OFFSET_COLUMN].to_numpy()[positions], self.view[TEXT_LENGTH_COLUMN].to_numpy()[positions]
+        )
+
+    def with_text(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Copy of a (small) view frame with the full-text column filled in"""
+        if TEXT_OFFSET_COLUMN not in frame.columns:
+            return frame
+        return frame.assign(**{TEXT_COLUMN: self.texts(frame)})
+
+    def index_candidates(self, columns: List[str], term: str) -> Optional[np.ndarray]:
+        """View positions of rows where any of the columns may contain the term,
+        or None when the bigram index cannot narrow the search.
+        """
+        if self.ngram_index is None:
+            return None
+        return self.ngram_index.candidates(columns, term)
+
+    def date_range(self, start=None, end=None) -> Optional[np.ndarray]:
+        """Sorted view positions of rows published between start and end
+        (inclusive dates), or None when the view has no date column.
+        """
+        index = self.sorted_columns.get(DATE_COLUMN)
+        if index is None:
+            return None
+        return index.between(
+            None if start is None else np.datetime64(start, "D"),
+            None if end is None else np.datetime64(end, "D"),
+        )
+
+    def amount_at_least(self, minimum: float) -> Optional[np.ndarray]:
+        """Sorted view positions of rows whose amount (missing as 0) is >= minimum"""
+        return self.amount_between(minimum)
+
+    def amount_between(self, low: Optional[float] = None, high: Optional[float] = None) -> Optional[np.ndarray]:
+        """Sorted view positions of rows whose amount (missing as 0) is between
+        low and high (inclusive, either optional), or None without amounts.
+        """
+        index = self.sorted_columns.get(AMOUNT_COLUMN)
+        if index is None:
+            return None
+        return index.between(low, high)
+
+    def suggest(self, column: str, prefix: str, limit: Optional[int] = None) -> Optional[List[Tuple[str, int]]]:
+        """Most frequent values of a column starting with prefix, with their
+        case counts, or None when the column has no term dictionary.
+        """
+        terms = self.term_dictionaries.get(column)
+        if terms is None:
+            return None
+        return terms.top(prefix, limit)
+
+    def positions_of(self, ids: List[str]) -> np.ndarray:
+        """View positions of the given ids through the id hash index (-1 for unknown ids)"""
+        if not len(ids) or self.id_index.empty:
+            return np.full(len(ids), -1, dtype=np.int64)
+        return self.id_index.get_indexer([_normalize_id(case_id) for case_id in ids]).astype(np.int64)
+
+    def similarity_index(self) -> Optional[VectorIndex]:
+        """TF-IDF index of the case facts and full text, built on first use for
+        the current view (slow for a large view: call it off the event loop).
+        """
+        view, text = self.view, self.text
+        if self.vector_index is None and not view.empty:
+            index = VectorIndex.build(self._similarity_texts(view, text), len(view))
+            # Keep it only if the view was not swapped meanwhile
+            if self.view is view:
+                self.vector_index = index
+            return index
+        return self.vector_index
+
+    @staticmethod
+    def _similarity_texts(view: pd.DataFrame, text: TextBlob) -> List[str]:
+        parts = []
+        for col in SIMILARITY_COLUMNS:
+            if col == TEXT_COLUMN and TEXT_OFFSET_COLUMN in view.columns:
+                parts.append(text.take(view[TEXT_OFFSET_COLUMN].to_numpy(), view[TEXT_LENGTH_COLUMN].to_numpy()))
+            elif col in view.columns:
+                parts.append(view[col].astype(object).tolist())
+        return ["\n".join(v for v in values if isinstance(v, str)) for values in zip(*parts)] if parts else [""] * len(view)
+
+    @staticmethod
+    def _fingerprint_texts(view: pd.DataFrame, text: TextBlob) -> List[Optional[str]]:
+        texts: List[Optional[str]] = [None] * len(view)
+        for col in FINGERPRINT_COLUMNS:
+            if col == TEXT_COLUMN and TEXT_OFFSET_COLUMN in view.columns:
+                values = text.take(view[TEXT_OFFSET_COLUMN].to_numpy(), view[TEXT_LENGTH_COLUMN].to_numpy())
+            elif col in view.columns:
+                values = view[col].astype(object).tolist()
+            else:
+                continue
+            texts = [current if current else (value if isinstance(value, str) else None)
+                     for current, value in zip(texts, values)]
+        return texts
+
+    @staticmethod
+    def _cube_rows(view: pd.DataFrame) -> pd.DataFrame:
+        """Cube dimensions, amount and publication day of view rows"""
+        if DATE_COLUMN in view.columns:
+            days = _date_days(view[DATE_COLUMN])
+        else:
+            days = np.full(len(view), np.datetime64("NaT"), dtype="datetime64[D]")
+        months = np.datetime_as_string(days.astype("datetime64[M]"))
+        rows = pd.DataFrame({"month": np.where(np.isnat(days), None, months)}, index=view.index)
+        for dim in CUBE_DIMENSIONS[1:]:
+            rows[dim] = view[dim].to_numpy(dtype=object) if dim in view.columns else None
+        rows["amount"] = view[AMOUNT_COLUMN].to_numpy(dtype="float64") if AMOUNT_COLUMN in view.columns else np.nan
+        rows["day"] = days
+        return rows
+
+    def facet_counts(self, positions: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Case counts per bucket of every facet, over the rows at the given positions"""
+        return {name: facet.counts(positions) for name, facet in self.facets.items()}
+
+    def rows(self, positions: np.ndarray) -> pd.DataFrame:
+        """View rows at the given positions, in that order"""
+        if self.view.empty:
+            return self.view
+        return self.view.take(positions)
+
+    def recency_window(self, positions: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """View positions ranked start..stop-1 by recency among the given positions"""
+        if len(positions) == len(self.recency_rank):
+            # Every row of the view: the presorted order is the answer
+            return self.recency_order[start:stop]
+        ranks = self.recency_rank[positions]
+        stop = min(stop, len(ranks))
+        if start >= stop:
+            return np.empty(0, dtype=np.int64)
+        if stop - start < len(ranks):
+            window = np.argpartition(ranks, sorted({start, stop - 1}))[start:stop]
+        else:
+            window = np.arange(len(ranks))
+        return positions[window[np.argsort(ranks[window])]]
+
+    def _build_orderings(self, view: pd.DataFrame):
+        self.sorted_columns = self._build_sorted_columns(view)
+        # Newest first with missing dates last, ties broken by id descending
+        if DATE_COLUMN in view.columns:
+            order = view.sort_values([DATE_COLUMN, "id"], ascending=[False, False]).index
+        elif "id" in view.columns:
+            order = view.sort_values("id", ascending=False).index
+        else:
+            order = view.index
+        self.recency_order = np.asarray(order, dtype=np.int64)
+        self.recency_rank = np.empty(len(order), dtype=np.int64)
+        self.recency_rank[self.recency_order] = np.arange(len(order))
+
+    def _build_lookups(self, view: pd.DataFrame):
+        self.term_dictionaries = self._build_term_dictionaries(view)
+        self.entity_index = self._build_entity_index(view)
+        self.facets = self._build_facets(view)
+        # Hash index from id to view position (ids are unique in the view)
+        self.id_index = pd.Index(view["id"]) if "id" in view.columns else pd.Index([], dtype=object)
+        # Clusters follow the current recency ranks (earliest published first)
+        self.near_duplicates.cluster(self.recency_rank)
+
+    @staticmethod
+    def _build_facets(view: pd.DataFrame) -> Dict[str, Facet]:
+        facets = {}
+        for col in FACET_COLUMNS:
+            if col in view.columns and isinstance(view[col].dtype, pd.CategoricalDtype):
+                facets[col] = Facet(view[col].cat.codes.to_numpy(), [str(c) for c in view[col].cat.categories])
+        if DATE_COLUMN in view.columns:
+            months = _date_days(view[DATE_COLUMN]).astype("datetime64[M]")
+            valid = ~np.isnat(months)
+            first = months[valid].min() if valid.any() else np.datetime64("1970-01", "M")
+            last = months[valid].max() if valid.any() else first
+            codes = np.where(valid, (months - first).astype(np.int64), -1)
+            labels = [str(month) for month in np.arange(first, last + 1)]
+            facets["month"] = Facet(codes, labels, ranked=False)
+        if AMOUNT_COLUMN in view.columns:
+            amounts = view[AMOUNT_COLUMN].to_numpy(dtype="float64")
+            bounds = np.array([low for low, _ in AMOUNT_BUCKETS], dtype="float64")
+            # Missing or negative amounts fall outside every bucket, as "其他"
+            codes = np.searchsorted(bounds, amounts, side="right") - 1
+            codes = np.where(np.isnan(amounts) | (codes < 0), len(bounds), codes)
+            facets["amount"] = Facet(codes, [label for _, label in AMOUNT_BUCKETS] + ["其他"], ranked=False)
+        return facets
+
+    @staticmethod
+    def _build_term_dictionaries(view: pd.DataFrame) -> Dict[str, TermDictionary]:
+        # Counts cover the searchable (detail) cases only
+        cases = view[view["has_detail"]] if "has_detail" in view.columns else view
+        return {col: TermDictionary.from_series(cases[col]) for col in SUGGEST_COLUMNS if col in cases.columns}
+
+    @staticmethod
+    def _build_entity_index(view: pd.DataFrame) -> EntityIndex:
+        # Like the term dictionaries, only searchable (detail) cases count
+        if ENTITY_COLUMN not in view.columns:
+            return EntityIndex.build([], np.empty(0, dtype=np.int64))
+        positions = np.flatnonzero(view["has_detail"].to_numpy()) if "has_detail" in view.columns else np.arange(len(view))
+        return EntityIndex.build(view[ENTITY_COLUMN].to_numpy(dtype=object)[positions], positions)
+
+    @staticmethod
+    def _build_sorted_columns(view: pd.DataFrame) -> Dict[str, SortedColumn]:
+        sorted_columns = {}
+        if DATE_COLUMN in view.columns:
+            days = _date_days(view[DATE_COLUMN])
+            sorted_columns[DATE_COLUMN] = SortedColumn(days, ~np.isnat(days))
+        if AMOUNT_COLUMN in view.columns:
+            sorted_columns[AMOUNT_COLUMN] = SortedColumn(view[AMOUNT_COLUMN].fillna(0).to_numpy(dtype="float64"))
+        return sorted_columns
+
+    @staticmethod
+    def _index_texts(view: pd.DataFrame, text: TextBlob) -> Dict[str, List[Optional[str]]]:
+        """Indexed column values as the searches see them (missing values as None)"""
+        columns = {}
+        for col in INDEXED_COLUMNS:
+            if col == TEXT_COLUMN and TEXT_OFFSET_COLUMN in view.columns:
+                columns[col] = text.take(view[TEXT_OFFSET_COLUMN].to_numpy(), view[TEXT_LENGTH_COLUMN].to_numpy())
+            elif col in view.columns:
+                columns[col] = [v if isinstance(v, str) else None for v in view[col].astype(str).tolist()]
+        return columns
+
+    def _build_index(self, view: pd.DataFrame, text: TextBlob) -> Optional[NgramIndex]:
+        try:
+            return NgramIndex.build(self._index_texts(view, text), len(view))
+        except Exception as e:
+            logger.warning(f"Bigram index not built, text search will scan: {e}")
+            return None
+
+    def _added_files(self, signature: Dict[str, Any]) -> Optional[List[str]]:
+        """Files added since the last build, or None if a full rebuild is needed"""
+        if self._signature is None or self.view.empty:
+            return None
+        if signature.get("db_epoch") != self._signature.get("db_epoch"):
+            return None
+        added: List[str] = []
+        for family in SOURCE_FLAGS:
+            old_entries = set(self._signature.get(family, ()))
+            new_entries = set(signature.get(family, ()))
+            if not old_entries <= new_entries:
+                return None
+            added.extend(path for path, _, _ in sorted(new_entries - old_entries))
+        return added
+
+    def _rename_for_view(self, df: pd.DataFrame, flag: str) -> pd.DataFrame:
+        """Rename source columns according to view column ownership"""
+        rename = {}
+        for col in df.columns:
+            if col == "id":
+                continue
+            owner = self._owners.setdefault(col, flag)
+            if owner != flag:
+                rename[col] = f"{col}{FLAG_SUFFIXES[flag]}"
+        df = df.rename(columns=rename)
+        df[flag] = True
+        return df
+
+    @staticmethod
+    def _store_text(df: pd.DataFrame, text: TextBlob) -> pd.DataFrame:
+        """Move the full-text column into the blob, keeping its location per row"""
+        if TEXT_COLUMN not in df.columns:
+            return df
+        offsets, lengths = text.append(df[TEXT_COLUMN])
+        df = df.drop(columns=[TEXT_COLUMN])
+        df[TEXT_OFFSET_COLUMN] = offsets
+        df[TEXT_LENGTH_COLUMN] = lengths
+        return df
+
+    async def _rebuild(self, service):
+        detail = _prepare_source(await service.get_case_detail(""))
+        analysis = _prepare_source(await service.get_case_analysis(""))
+        category = _prepare_source(await service.get_case_categories())
+
+        if not detail.empty:
+            detail = detail.assign(org_level=await self._org_levels(service, detail["id"]))
+
+        self._owners = {}
+        for col in CATEGORY_FIELDS:
+            if col in category.columns:
+                self._owners[col] = "has_category"
+
+        text = TextBlob()
+        view: Optional[pd.DataFrame] = None
+        for df, flag in ((detail, "has_detail"), (analysis, "has_analysis"), (category, "has_category")):
+            if df.empty:
+                continue
+            df = self._store_text(self._rename_for_view(df, flag), text)
+            view = df if view is None else view.merge(df, on="id", how="outer")
+        view = self._finalize(view)
+        self.view, self.text, self.ngram_index = view, text, self._build_index(view, text)
+        self.vector_index = None
+        self.near_duplicates = NearDuplicateIndex()
+        self.near_duplicates.update(self._fingerprint_texts(view, text), np.arange(len(view)), len(view))
+        self.aggregates = AggregateCube()
+        self.aggregates.update(self._cube_rows(view), np.arange(len(view)), len(view))
+        self._build_orderings(view)
+        self._build_lookups(view)
+
+    async def _org_levels(self, service, ids: pd.Series) -> pd.Series:
+        """Map detail ids to the organization level whose files contain them"""
+        levels = pd.Series("", index=ids.index, dtype=object)
+        for org_name, org_code in ORG_CODES.items():
+            org_df = await service.get_case_detail(org_name)
+            if org_df.empty:
+                continue
+            levels[ids.isin(set(normalize_ids(org_df["id"])))] = org_code
+        return levels
+
+    def _apply_new_files(self, service, files: List[str]):
+        """Upsert rows from newly added files into the existing view"""
+        # Categories are re-encoded in _finalize once the new rows are in
+        view = decode_categoricals(self.view).set_index("id")
+        changed_ids = set()
+        for family, flag in SOURCE_FLAGS.items():
+            family_files = [f for f in files if os.path.basename(f).startswith(family)]
+            if not family_files:
+                continue
+            frames = []
+            for file_path in family_files:
+                df = service._read_csv_files([file_path])
+                if family == "cbircdtl":
+                    df = service._format_detail(df)
+                    match = _ORG_FILE_PATTERN.match(os.path.basename(file_path))
+                    if not df.empty:
+                        df["org_level"] = match.group(1) if match else ""
+                frames.append(df)
+            rows = _prepare_source(pd.concat(frames, ignore_index=True))
+            if rows.empty:
+                continue
+            rows = self._store_text(self._rename_for_view(rows, flag), self.text).set_index("id")
+            changed_ids.update(rows.index)
+
+            for col in rows.columns:
+                if col not in view.columns:
+                    view[col] = False if col in FLAG_SUFFIXES else np.nan
+            existing = rows.index.intersection(view.index)
+            if len(existing):
+                view.loc[existing, rows.columns] = rows.loc[existing]
+            fresh = rows.loc[rows.index.difference(view.index)]
+            if not fresh.empty:
+                view = pd.concat([view, fresh])
+        view = self._finalize(view.reset_index())
+        # Existing rows keep their positions and new rows are appended, so
+        # only the upserted rows need indexing
+        if self.ngram_index is not None and changed_ids:
+            changed = view[view["id"].isin(changed_ids)]
+            try:
+                self.ngram_index.add(self._index_texts(changed, self.text), changed.index.to_numpy())
+            except Exception as e:
+                logger.warning(f"Bigram index dropped, text search will scan: {e}")
+                self.ngram_index = None
+        # New rows are vectorized incrementally; changed rows need a new build
+        if self.vector_index is not None and changed_ids:
+            changed = view[view["id"].isin(changed_ids)]
+            if changed.index.min() >= len(self.view):
+                try:
+                    self.vector_index.add(self._similarity_texts(changed, self.text), changed.index.to_numpy())
+                except Exception as e:
+                    logger.warning(f"Vector index dropped until next similarity search: {e}")
+                    self.vector_index = None
+            else:
+                self.vector_index = None
+        if changed_ids:
+            changed = view[view["id"].isin(changed_ids)]
+            self.near_duplicates.update(self._fingerprint_texts(changed, self.text), changed.index.to_numpy(), len(view))
+            self.aggregates.update(self._cube_rows(changed), changed.index.to_numpy(), len(view))
+        self.view = view
+        self._build_orderings(view)
+        self._build_lookups(view)
+
+    @staticmethod
+    def _finalize(view: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if view is None or view.empty:
+            return pd.DataFrame()
+        for flag in FLAG_SUFFIXES:
+            if flag in view.columns:
+                view[flag] = view[flag].fillna(False).astype(bool)
+            else:
+                view[flag] = False
+        if TEXT_OFFSET_COLUMN in view.columns:
+            view[TEXT_OFFSET_COLUMN] = view[TEXT_OFFSET_COLUMN].fillna(0).astype("int64")
+            view[TEXT_LENGTH_COLUMN] = view[TEXT_LENGTH_COLUMN].fillna(-1).astype("int64")
+        if "amount" in view.columns:
+            view["amount"] = pd.to_numeric(view["amount"], errors="coerce").astype("float64")
+        for col in CATEGORICAL_COLUMNS:
+            if col in view.columns and not isinstance(view[col].dtype, pd.CategoricalDtype):
+                view[col] = view[col].astype("category")
+        return view.reset_index(drop=True)
+
+
+# Global case store instance
+case_store = CaseStore()
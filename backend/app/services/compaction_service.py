@@ -0,0 +1,203 @@
+import glob
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.services.csv_reader import read_csv_file
+
+logger = logging.getLogger(__name__)
+
+# Timestamped fragments of these families are compacted per organization
+COMPACT_FAMILIES = ["cbircsum", "cbircdtl"]
+ORG_CODES = ["jiguan", "benji", "fenju"]
+# Segment files are named {prefix}-seg{YYYYMM}.csv. "-" sorts before digits and
+# "_", so segments always come before newer fragments in sorted file lists and
+# keep-last dedup in the readers still prefers fragment rows.
+SEGMENT_MARKER = "-seg"
+UNDATED_SEGMENT = "000000"
+ID_COLUMNS = ["id", "docId"]
+DATE_COLUMNS = ["date", "publishDate", "publish_date"]
+# Fragments modified more recently than this may still be being written
+MIN_FRAGMENT_AGE_SECONDS = 60
+
+
+def _first_column(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+def _read_raw(file_path: str, usecols=None) -> pd.DataFrame:
+    """Read a CSV keeping every value as text so segments round-trip exactly"""
+    df = read_csv_file(file_path, dtype=str, keep_default_na=False, na_values=[""], usecols=usecols)
+    # Index columns written by DataFrame.to_csv() without index=False
+    return df.drop(columns=[c for c in df.columns if c.startswith("Unnamed:")])
+
+
+def _row_ids(df: pd.DataFrame) -> pd.Series:
+    """Case id of each row, from ``id`` or the summary ``docId`` column"""
+    ids = pd.Series(None, index=df.index, dtype=object)
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            ids = ids.fillna(df[col].str.strip().str.replace(r"\.0$", "", regex=True))
+    return ids
+
+
+def _dedup_by_id(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the last row per id; rows without an id are kept as-is"""
+    if df.empty:
+        return df
+    ids = _row_ids(df)
+    keep = ids.isna() | ~ids.duplicated(keep="last")
+    return df[keep].reset_index(drop=True)
+
+
+def _month_keys(df: pd.DataFrame) -> pd.Series:
+    """Year-month partition key (YYYYMM) for each row"""
+    date_col = _first_column(df, DATE_COLUMNS)
+    if date_col is None:
+        return pd.Series(UNDATED_SEGMENT, index=df.index)
+    # Fragments mix formats (2024-01-05 10:00:00.0, 2024-01-05, 2024年1月5日),
+    # so every value is parsed on its own
+    values = df[date_col].str.strip().str.replace(r"[年月]", "-", regex=True).str.replace("日", "", regex=False)
+    dates = pd.to_datetime(values.str.slice(0, 19), format="mixed", errors="coerce")
+    return dates.dt.strftime("%Y%m").fillna(UNDATED_SEGMENT)
+
+
+def _write_atomic(df: pd.DataFrame, target: str):
+    """Write a CSV next to target and rename it into place"""
+    # The temporary name does not end in .csv, so readers never glob it
+    tmp_path = target + ".tmp"
+    df.to_csv(tmp_path, index=False, encoding="utf-8-sig")
+    os.replace(tmp_path, target)
+
+
+class CompactionService:
+    """Merge timestamped CSV fragments into per-org, per-month segments.
+
+    Every scrape writes a new ``cbircsum{org}_{timestamp}.csv`` /
+    ``cbircdtl{org}_{timestamp}.csv`` file. Compaction folds those fragments
+    into ``{prefix}-seg{YYYYMM}.csv`` segments, deduplicated by id with the
+    newest row winning, and then deletes the fragments. Only segments for
+    months touched by new fragments are rewritten. Segments are written to a
+    temporary file and renamed into place, so readers always see complete
+    files; during a run they may briefly see a row in both a segment and its
+    fragment, which the id-based dedup in the readers already handles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def is_segment(file_path: str) -> bool:
+        return SEGMENT_MARKER in os.path.basename(file_path)
+
+    def prefixes(self, org_code: Optional[str] = None) -> List[str]:
+        orgs = [org_code] if org_code else ORG_CODES
+        return [f"{family}{org}" for family in COMPACT_FAMILIES for org in orgs]
+
+    def list_files(self, folder: str, prefix: str) -> Tuple[List[str], List[str]]:
+        """Return (segments, fragments) for a prefix, both sorted by name"""
+        files = sorted(glob.glob(os.path.join(folder, f"{prefix}*.csv")))
+        segments = [f for f in files if self.is_segment(f)]
+        fragments = [f for f in files if not self.is_segment(f)]
+        return segments, fragments
+
+    def status(self, folder: str) -> Dict[str, Any]:
+        """Segment and fragment counts per prefix"""
+        prefixes = {}
+        for prefix in self.prefixes():
+            segments, fragments = self.list_files(folder, prefix)
+            prefixes[prefix] = {"segments": len(segments), "fragments": len(fragments)}
+        return {
+            "running": self._lock.locked(),
+            "prefixes": prefixes,
+            "last_run": self.last_run,
+        }
+
+    def compact(
+        self,
+        folder: str,
+        org_code: Optional[str] = None,
+        min_age_seconds: int = MIN_FRAGMENT_AGE_SECONDS,
+    ) -> Dict[str, Any]:
+        """Compact the fragments of every (or one) organization in folder"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Compaction is already running")
+        try:
+            start = time.perf_counter()
+            results = {}
+            for prefix in self.prefixes(org_code):
+                results[prefix] = self._compact_prefix(folder, prefix, min_age_seconds)
+            self.last_run = {
+                "finished_at": time.time(),
+                "seconds": round(time.perf_counter() - start, 3),
+                "prefixes": results,
+            }
+            return self.last_run
+        finally:
+            self._lock.release()
+
+    def _compact_prefix(self, folder: str, prefix: str, min_age_seconds: int) -> Dict[str, Any]:
+        segments, fragments = self.list_files(folder, prefix)
+        cutoff = time.time() - min_age_seconds
+        fragments = [f for f in fragments if os.path.getmtime(f) <= cutoff]
+        result = {"fragments": len(fragments), "rows": 0, "segments_written": []}
+        if not fragments:
+            return result
+
+        new_rows = _dedup_by_id(pd.concat([_read_raw(f) for f in fragments], ignore_index=True))
+        result["rows"] = int(len(new_rows))
+
+        segment_paths = {
+            os.path.basename(path)[len(prefix) + len(SEGMENT_MARKER):-len(".csv")]: path
+            for path in segments
+        }
+        months = _month_keys(new_rows)
+        touched = set(months)
+
+        # Ids that moved to a different month must leave their old segment
+        new_ids = set(_row_ids(new_rows).dropna())
+        if new_ids:
+            for month, path in segment_paths.items():
+                if month in touched:
+                    continue
+                if _row_ids(_read_raw(path, usecols=lambda c: c in ID_COLUMNS)).isin(new_ids).any():
+                    touched.add(month)
+
+        for month in sorted(touched):
+            target = segment_paths.get(month) or os.path.join(folder, f"{prefix}{SEGMENT_MARKER}{month}.csv")
+            parts = []
+            if os.path.exists(target):
+                existing = _read_raw(target)
+                parts.append(existing[~_row_ids(existing).isin(new_ids)])
+            parts.append(new_rows[months == month])
+            merged = _dedup_by_id(pd.concat(parts, ignore_index=True))
+            if merged.empty:
+                if os.path.exists(target):
+                    os.remove(target)
+            else:
+                _write_atomic(merged, target)
+            result["segments_written"].append(os.path.basename(target))
+
+        # Fragments are removed only once every segment holding their rows is in place
+        for file_path in fragments:
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logger.warning(f"Could not remove compacted fragment {file_path}: {e}")
+        logger.info(
+            f"Compacted {len(fragments)} {prefix} fragments ({len(new_rows)} rows) "
+            f"into {len(result['segments_written'])} segments"
+        )
+        return result
+
+
+# Global compaction service instance
+compaction_service = CompactionService()
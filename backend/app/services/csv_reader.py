@@ -0,0 +1,210 @@
+import codecs
+import csv
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pa_csv = None
+
+logger = logging.getLogger(__name__)
+
+# Column dtypes per dataset family. Ids are text so they compare equal across
+# datasets regardless of how a file was written; columns not listed here are
+# inferred (numeric when every value parses as a number, text otherwise).
+DATASET_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "cbircsum": {
+        "docId": "str", "docTitle": "str", "docSubtitle": "str", "publishDate": "str",
+        "id": "str", "title": "str", "subtitle": "str", "publish_date": "str", "content": "str",
+    },
+    "cbircdtl": {"id": "str", "title": "str", "subtitle": "str", "date": "str", "doc": "str"},
+    "cbircsplit": {
+        "id": "str", "wenhao": "str", "people": "str", "event": "str",
+        "law": "str", "penalty": "str", "org": "str", "date": "str",
+    },
+    "cbirccat": {"id": "str", "amount": "float64", "industry": "str", "category": "str", "province": "str"},
+    "cbirclabel": {"id": "str", "label": "str"},
+    "cbircloc": {"id": "str", "province": "str", "city": "str", "county": "str"},
+    "cbirclitigant": {"id": "str", "peoplels": "str", "orgls": "str", "org": "str"},
+}
+
+ENCODINGS = ["utf-8-sig", "utf-8", "latin1"]
+SNIFF_BYTES = 1 << 20
+MAX_READ_WORKERS = min(8, os.cpu_count() or 4)
+
+# (path, mtime_ns, size) -> encoding that decoded the file
+_encoding_cache: Dict[Tuple[str, int, int], str] = {}
+_encoding_lock = threading.Lock()
+
+
+def schema_family(file_path: str) -> Optional[str]:
+    """Dataset family of a file (e.g. cbircdtljiguan_2024.csv -> cbircdtl)"""
+    name = os.path.basename(file_path)
+    matches = [family for family in DATASET_SCHEMAS if name.startswith(family)]
+    return max(matches, key=len) if matches else None
+
+
+def sniff_encoding(file_path: str) -> str:
+    """Detect a file's encoding from its leading bytes, cached per file version"""
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_mtime_ns, stat.st_size)
+    with _encoding_lock:
+        cached = _encoding_cache.get(key)
+    if cached:
+        return cached
+
+    with open(file_path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            # final=False tolerates a multi-byte character cut at the sample end
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin1"
+
+    with _encoding_lock:
+        _encoding_cache[key] = encoding
+    return encoding
+
+
+def _header(file_path: str, encoding: str) -> List[str]:
+    """Column names with the same naming pandas gives blank and repeated headers"""
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        raw = next(csv.reader(f), [])
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, name in enumerate(raw):
+        name = name.strip().lstrip("\ufeff") or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def apply_schema(df: pd.DataFrame, family: Optional[str]) -> pd.DataFrame:
+    """Cast the columns listed in the family's schema to their dtypes"""
+    schema = DATASET_SCHEMAS.get(family or "", {})
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == "str":
+            if df[col].dtype != object and not pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+        elif df[col].dtype != dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df
+
+
+def _infer_untyped(df: pd.DataFrame, typed: set) -> pd.DataFrame:
+    """Give columns outside the schema numeric dtypes when every value is a number"""
+    for col in df.columns:
+        if col in typed or df[col].isna().all():
+            continue
+        try:
+            df[col] = pd.to_numeric(df[col])
+        except (ValueError, TypeError):
+            pass
+    return df
+
+
+def _read_arrow(file_path: str, encoding: str, family: Optional[str]) -> pd.DataFrame:
+    names = _header(file_path, encoding)
+    schema = DATASET_SCHEMAS.get(family or "", {})
+    # Every column is read as text so Arrow never guesses timestamps; schema
+    # numerics and untyped columns are converted afterwards
+    column_types = {name: pa.string() for name in names}
+    table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(
+            encoding="utf8" if encoding.startswith("utf-8") else encoding,
+            column_names=names,
+            skip_rows=1,
+        ),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    df = table.to_pandas()
+    df = _infer_untyped(df, set(schema))
+    return apply_schema(df, family)
+
+
+def _read_pandas(file_path: str, encodings: List[str], family: Optional[str]) -> pd.DataFrame:
+    schema = DATASET_SCHEMAS.get(family or "", {})
+    dtype = {col: str for col, kind in schema.items() if kind == "str"}
+    last_error: Optional[Exception] = None
+    for encoding in encodings:
+        try:
+            df = pd.read_csv(file_path, encoding=encoding, dtype=dtype, low_memory=False)
+            break
+        except Exception as e:
+            last_error = e
+    else:
+        raise last_error
+    df.columns = [str(c).strip().lstrip("\ufeff") for c in df.columns]
+    return apply_schema(df, family)
+
+
+def read_csv_file(file_path: str, **kwargs) -> pd.DataFrame:
+    """Read one CSV file, tolerant to BOM, encodings and padded headers.
+
+    Without extra keyword arguments the file is parsed with the dataset
+    schema for its family, using pyarrow when it is installed. Keyword
+    arguments are passed through to ``pandas.read_csv``.
+    """
+    if kwargs:
+        kwargs.setdefault("low_memory", False)
+        encoding = sniff_encoding(file_path)
+        for candidate in [encoding] + [e for e in ENCODINGS if e != encoding]:
+            try:
+                df = pd.read_csv(file_path, encoding=candidate, **kwargs)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError(f"Could not decode {file_path}")
+        df.columns = [str(c).strip().lstrip("\ufeff") for c in df.columns]
+        return df
+
+    family = schema_family(file_path)
+    encoding = sniff_encoding(file_path)
+    if pa_csv is not None:
+        try:
+            return _read_arrow(file_path, encoding, family)
+        except Exception as e:
+            logger.debug(f"pyarrow could not parse {file_path}, using pandas: {e}")
+    return _read_pandas(file_path, [encoding] + [e for e in ENCODINGS if e != encoding], family)
+
+
+def _read_or_none(file_path: str) -> Optional[pd.DataFrame]:
+    try:
+        return read_csv_file(file_path)
+    except Exception as e:
+        logger.warning(f"Failed to read {file_path}: {e}")
+        return None
+
+
+def read_csv_files(files: List[str]) -> pd.DataFrame:
+    """Read and concatenate CSV files in parallel, skipping the ones that fail"""
+    if len(files) > 1:
+        with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(files))) as pool:
+            results = list(pool.map(_read_or_none, files))
+    else:
+        results = [_read_or_none(f) for f in files]
+    dataframes = [df for df in results if df is not None]
+    if not dataframes:
+        return pd.DataFrame()
+    return pd.concat(dataframes, ignore_index=True)
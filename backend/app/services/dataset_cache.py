@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+# (path, mtime_ns, size) for every file that makes up a dataset
+FileSignature = Tuple[Tuple[str, int, int], ...]
+
+
+class _CacheEntry:
+    def __init__(self, signature: FileSignature, frame: pd.DataFrame, load_seconds: float):
+        self.signature = signature
+        self.frame = frame
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+
+
+class DatasetCache:
+    """In-process cache of parsed local datasets.
+
+    Entries are keyed by dataset name (usually a file prefix such as
+    ``cbircdtljiguan``) and validated against the signature of the files that
+    produced them. A dataset is only re-parsed when a file is added, removed or
+    changed on disk; otherwise the cached DataFrame is returned as-is.
+
+    Cached frames are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    @staticmethod
+    def signature(files: List[str]) -> FileSignature:
+        """Build the signature for a list of files (missing files are skipped)"""
+        entries = []
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((file_path, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(entries))
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter bumped whenever any cached dataset changes"""
+        return self._version
+
+    def get(
+        self,
+        key: str,
+        files: List[str],
+        loader: Callable[[List[str]], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Return the cached frame for ``key``, (re)loading it if ``files`` changed"""
+        signature = self.signature(files)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self.hits += 1
+                return entry.frame
+            if entry is None:
+                self.misses += 1
+            else:
+                self.rebuilds += 1
+
+        start = time.perf_counter()
+        frame = loader([path for path, _, _ in signature])
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(signature, frame, elapsed)
+            self._version += 1
+        return frame
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one cached dataset, or all of them when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._version += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/rebuild counters and per-dataset details"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.rebuilds
+            datasets = {
+                key: {
+                    "files": len(entry.signature),
+                    "rows": int(len(entry.frame)),
+                    "columns": int(len(entry.frame.columns)),
+                    "load_seconds": round(entry.load_seconds, 4),
+                    "loaded_at": entry.loaded_at,
+                }
+                for key, entry in self._entries.items()
+            }
+            return {
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "datasets": datasets,
+            }
+
+
+# Global cache instance
+dataset_cache = DatasetCache()
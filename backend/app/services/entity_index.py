@@ -0,0 +1,167 @@
+import heapq
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.ngram_index import _sorted_unique
+from app.services.vector_index import _bigram_counts
+
+# Several penalized parties in one field
+ENTITY_SEPARATORS = re.compile(r"[;；,，、\n]+")
+# Legal-form words that variants of one institution name add or drop
+LEGAL_FORMS = re.compile(r"股份有限公司|有限责任公司|股份有限|有限公司")
+# Names scored in full after bigram blocking, per query
+CANDIDATES = 200
+# Share of the query bigrams a name must contain to be a candidate
+MIN_CONTAINMENT = 0.5
+# Score from which a name counts as a variant of another
+VARIANT_SCORE = 0.8
+
+_NOISE = re.compile(r"[\W_]+")
+
+
+def split_entities(value: Optional[str]) -> List[str]:
+    """Party names listed in one 被处罚当事人 value"""
+    if not isinstance(value, str):
+        return []
+    return [name.strip() for name in ENTITY_SEPARATORS.split(value) if name.strip()]
+
+
+def normalize_entity(name: str) -> str:
+    """Comparable form of an entity name: lower-cased, without punctuation,
+    whitespace or legal-form words (XX银行股份有限公司YY支行 -> xx银行yy支行)
+    """
+    return LEGAL_FORMS.sub("", _NOISE.sub("", name.lower()))
+
+
+def edit_similarity(left: str, right: str) -> float:
+    """1 - Levenshtein distance / longer length"""
+    if not left or not right:
+        return 0.0
+    previous = list(range(len(right) + 1))
+    for i, char in enumerate(left, 1):
+        current = [i]
+        for j, other in enumerate(right, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        previous = current
+    return 1 - previous[-1] / max(len(left), len(right))
+
+
+class EntityIndex:
+    """Normalized names of penalized parties, for fuzzy entity search.
+
+    Each distinct normalized name keeps its most frequent written form and
+    the view rows that list it. Names are blocked by their character bigrams:
+    a query only scores the names sharing enough of its bigrams, first by
+    bigram Jaccard similarity (vectorized over the posting lists), then the
+    best CANDIDATES by the mean of Jaccard and edit-distance similarity.
+    """
+
+    def __init__(self, names: List[str], displays: List[str], offsets: np.ndarray, rows: np.ndarray):
+        self.names = names
+        self.displays = displays
+        # Rows of name i are rows[offsets[i]:offsets[i + 1]]
+        self.offsets = offsets
+        self.rows = rows
+        self.case_counts = np.diff(offsets)
+        self._ids: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        name_ids, grams, _ = _bigram_counts(names, np.arange(len(names), dtype=np.int64))
+        # Bigram posting lists: names of gram_keys[i] are gram_names[gram_offsets[i]:gram_offsets[i + 1]]
+        starts = np.flatnonzero(np.concatenate(([True], grams[1:] != grams[:-1]))) if len(grams) else np.empty(0, dtype=np.int64)
+        self.gram_keys = grams[starts]
+        self.gram_offsets = np.append(starts, len(grams)).astype(np.int64)
+        self.gram_names = name_ids.astype(np.int32)
+        self.gram_counts = np.bincount(self.gram_names, minlength=len(names))
+
+    @classmethod
+    def build(cls, values: Sequence[Optional[str]], positions: np.ndarray) -> "EntityIndex":
+        """Index the party names of the values found at the given view positions"""
+        forms: Dict[str, Counter] = {}
+        name_rows: Dict[str, List[int]] = {}
+        normalized: Dict[str, str] = {}
+        for position, value in zip(positions.tolist(), values):
+            for raw in split_entities(value):
+                name = normalized.get(raw)
+                if name is None:
+                    name = normalized[raw] = normalize_entity(raw)
+                if not name:
+                    continue
+                forms.setdefault(name, Counter())[raw] += 1
+                rows = name_rows.setdefault(name, [])
+                if not rows or rows[-1] != position:
+                    rows.append(position)
+        names = sorted(name_rows)
+        displays = [forms[name].most_common(1)[0][0] for name in names]
+        lengths = np.fromiter((len(name_rows[name]) for name in names), dtype=np.int64, count=len(names))
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        rows = np.fromiter((row for name in names for row in name_rows[name]), dtype=np.int64, count=int(lengths.sum()))
+        return cls(names, displays, offsets, rows)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _candidates(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Names sharing enough bigrams with a normalized query, and their
+        bigram Jaccard similarity, best first.
+        """
+        _, grams, _ = _bigram_counts([query], np.zeros(1, dtype=np.int64))
+        found = np.searchsorted(self.gram_keys, grams)
+        known = found < len(self.gram_keys)
+        known[known] = self.gram_keys[found[known]] == grams[known]
+        found = found[known]
+        if not len(found):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        postings = [self.gram_names[self.gram_offsets[i]:self.gram_offsets[i + 1]] for i in found.tolist()]
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.names))
+        candidates = np.flatnonzero(shared >= max(1, MIN_CONTAINMENT * len(grams)))
+        jaccard = shared[candidates] / (len(grams) + self.gram_counts[candidates] - shared[candidates])
+        order = np.lexsort((candidates, -jaccard))[:CANDIDATES]
+        return candidates[order], jaccard[order]
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """(name id, score) of the names most similar to a query name"""
+        normalized = normalize_entity(query)
+        if not normalized:
+            return []
+        if len(normalized) < 2:
+            # Too short for bigrams: names containing the character
+            matches = [(i, len(normalized) / len(name)) for i, name in enumerate(self.names) if normalized in name]
+        else:
+            matches, best = [], []
+            candidates, jaccard = self._candidates(normalized)
+            for name_id, similarity in zip(candidates.tolist(), jaccard.tolist()):
+                # Candidates come by Jaccard, so once even a perfect edit
+                # similarity cannot reach the current top limit, none can
+                if (similarity + 1) / 2 < max(min_score, best[0] if len(best) >= limit else 0):
+                    break
+                score = (similarity + edit_similarity(normalized, self.names[name_id])) / 2
+                matches.append((name_id, score))
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                else:
+                    heapq.heappushpop(best, score)
+        matches = [(name_id, round(score, 4)) for name_id, score in matches if score >= min_score]
+        matches.sort(key=lambda match: (-match[1], -self.case_counts[match[0]], self.names[match[0]]))
+        return matches[:limit]
+
+    def name_id(self, name: str) -> Optional[int]:
+        """Id of the exact (normalized) name, or None"""
+        return self._ids.get(normalize_entity(name))
+
+    def rows_of(self, name_ids: List[int]) -> np.ndarray:
+        """Sorted view positions of the cases listing any of the names"""
+        parts = [self.rows[self.offsets[i]:self.offsets[i + 1]] for i in name_ids]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return _sorted_unique(np.concatenate(parts))
+
+    @property
+    def nbytes(self) -> int:
+        strings = sum(len(name.encode("utf-8")) + len(display.encode("utf-8"))
+                      for name, display in zip(self.names, self.displays))
+        return int(
+            strings + self.offsets.nbytes + self.rows.nbytes + self.gram_keys.nbytes
+            + self.gram_offsets.nbytes + self.gram_names.nbytes + self.gram_counts.nbytes
+        )
@@ -0,0 +1,331 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Signatures within this many differing bits are candidate near-duplicates
+MAX_DISTANCE = 3
+# 64-bit signatures split into MAX_DISTANCE + 1 bands: two signatures within
+# MAX_DISTANCE bits agree on at least one whole band
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = 64 // BANDS
+# Neighbours compared inside one band bucket, after sorting it by signature
+BUCKET_WINDOW = 32
+# Texts with fewer shingles are too short to fingerprint reliably
+MIN_SHINGLES = 16
+# MinHash sketch bins; each keeps one byte of the smallest hash in its bin
+SKETCH_BINS = 256
+EMPTY_BIN = 255
+# Candidates are near-duplicates when their sketches estimate at least this
+# Jaccard similarity of their shingles. Decisions of different cases share
+# long boilerplate and stay close in both, so candidates must also have the
+# same digit runs (document numbers, dates, amounts).
+MIN_SIMILARITY = 0.9
+# Candidate pairs whose sketches are compared at once
+PAIR_BLOCK = 65536
+# Characters and texts fingerprinted per chunk
+CHUNK_CHARS = 4_000_000
+CHUNK_TEXTS = 4096
+
+# Punctuation and symbol blocks above ASCII, as [start, end) bounds
+_NOISE_BOUNDS = np.array([
+    0x80, 0xC0, 0x2000, 0x2070, 0x2E00, 0x2E80, 0x3000, 0x3040, 0xFE30, 0xFE50,
+    0xFF00, 0xFF10, 0xFF1A, 0xFF21, 0xFF3B, 0xFF41, 0xFF5B, 0xFF66,
+], dtype=np.uint64)
+# Bits of every value of a hash digit of the given width, lowest bit first
+_DIGIT_BITS = {
+    width: ((np.arange(1 << width)[:, None] >> np.arange(width)) & 1).astype(np.float64)
+    for width in (4, 8)
+}
+
+
+def _mix(keys: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads shingle keys over all 64 bits"""
+    keys = keys ^ (keys >> np.uint64(30))
+    keys = keys * np.uint64(0xBF58476D1CE4E5B9)
+    keys = keys ^ (keys >> np.uint64(27))
+    keys = keys * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits of every uint64 value (SWAR bit counting)"""
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (values * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def _is_content(points: np.ndarray) -> np.ndarray:
+    """Digits, letters and CJK characters of lower-cased text (punctuation,
+    symbols, whitespace and layout differences do not make a new case)
+    """
+    ascii_content = ((points >= ord("0")) & (points <= ord("9"))) | ((points >= ord("a")) & (points <= ord("z")))
+    noise = np.searchsorted(_NOISE_BOUNDS, points, side="right") % 2 == 1
+    return ascii_content | ((points >= 0x80) & ~noise)
+
+
+def _digit_runs(points: np.ndarray, owners: np.ndarray, rows: int) -> np.ndarray:
+    """Hash of the digit runs of every cleaned text, in order"""
+    fullwidth = (points >= 0xFF10) & (points <= 0xFF19)
+    values = np.where(fullwidth, points - np.uint64(0xFF10 - ord("0")), points)
+    digit = (values >= ord("0")) & (values <= ord("9"))
+    first = np.concatenate(([True], owners[1:] != owners[:-1])) if len(owners) else np.empty(0, dtype=bool)
+    run_start = digit & (first | ~np.concatenate(([False], digit[:-1])))
+    # Slot of every digit in its text's digit string, one empty slot between runs
+    steps = digit.astype(np.int64) + run_start
+    slots = np.cumsum(steps)
+    base = np.zeros(rows, dtype=np.int64)
+    base[owners[first]] = (slots - steps)[first]
+    slots = (slots - base[owners])[digit].astype(np.uint64)
+    runs = np.zeros(rows, dtype=np.uint64)
+    np.bitwise_xor.at(runs, owners[digit], _mix((slots << np.uint64(8)) | values[digit]))
+    return runs
+
+
+def _fingerprint_chunk(texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(signatures, sketches, digit run hashes, shingle counts) of texts"""
+    signatures = np.zeros(len(texts), dtype=np.uint64)
+    sketches = np.full((len(texts), SKETCH_BINS), EMPTY_BIN, dtype=np.uint8)
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    if not lengths.sum():
+        return signatures, sketches, np.zeros(len(texts), dtype=np.uint64), np.zeros(len(texts), dtype=np.int64)
+    points = np.frombuffer("\x00".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    # ASCII lower-casing keeps one code point per character
+    upper = (points >= ord("A")) & (points <= ord("Z"))
+    points[upper] += np.uint64(32)
+    owners = np.repeat(np.arange(len(texts), dtype=np.int64), lengths + 1)[:len(points)]
+    content = _is_content(points)
+    points, owners = points[content], owners[content]
+    runs = _digit_runs(points, owners, len(texts))
+    # Character trigrams of the cleaned texts (none spans two texts)
+    inside = owners[:-2] == owners[2:]
+    keys = (points[:-2] << np.uint64(42)) | (points[1:-1] << np.uint64(21)) | points[2:]
+    hashes = _mix(keys[inside])
+    owners = owners[:-2][inside]
+    shingles = np.bincount(owners, minlength=len(texts))
+    # One-permutation MinHash: the top hash byte picks the bin, which keeps
+    # the smallest of the next 32 hash bits; the sketch stores its low byte
+    minima = np.full(len(texts) * SKETCH_BINS, 0xFFFFFFFF, dtype=np.uint32)
+    np.minimum.at(
+        minima,
+        owners * SKETCH_BINS + (hashes >> np.uint64(56)).astype(np.int64),
+        ((hashes >> np.uint64(8)) & np.uint64(0xFFFFFFFF)).astype(np.uint32),
+    )
+    filled = minima != 0xFFFFFFFF
+    sketches.reshape(-1)[filled] = np.minimum(minima[filled] & 0xFF, EMPTY_BIN - 1)
+    # Per text, count each value of every digit of the hashes, then expand the
+    # counts to the bits of each value. Short texts use narrower digits so the
+    # count table stays small.
+    width = 8 if len(hashes) >= len(texts) * 256 else 4
+    table = _DIGIT_BITS[width]
+    hash_bytes = hashes.astype("<u8").view(np.uint8).reshape(-1, 8)
+    if width == 8:
+        digits = [hash_bytes[:, byte] for byte in range(8)]
+    else:
+        digits = [part for byte in range(8) for part in (hash_bytes[:, byte] & 15, hash_bytes[:, byte] >> 4)]
+    owners = owners * len(table)
+    votes = np.hstack([
+        np.bincount(owners + digit, minlength=len(texts) * len(table)).reshape(-1, len(table)).astype(np.float64) @ table
+        for digit in digits
+    ])
+    # Signature bit k is set when most shingles have hash bit k set
+    packed = np.packbits(votes * 2 > shingles[:, None], axis=1, bitorder="little")
+    signatures[:] = np.ascontiguousarray(packed).view(np.uint64).ravel()
+    signatures[shingles == 0] = 0
+    return signatures, sketches, runs, shingles
+
+
+def fingerprint(texts: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """64-bit SimHash signatures and MinHash sketches of texts over character
+    trigrams of their cleaned form, hashes of their digit runs, and whether
+    each text was long enough to fingerprint.
+    """
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    signatures, sketches, runs, shingles = [], [], [], []
+    start = 0
+    while start < len(texts):
+        end, chars = start, 0
+        while end < len(texts) and chars < CHUNK_CHARS and end - start < CHUNK_TEXTS:
+            chars += len(texts[end]) + 1
+            end += 1
+        part = _fingerprint_chunk(texts[start:end])
+        signatures.append(part[0])
+        sketches.append(part[1])
+        runs.append(part[2])
+        shingles.append(part[3])
+        start = end
+    if not signatures:
+        return (np.empty(0, dtype=np.uint64), np.empty((0, SKETCH_BINS), dtype=np.uint8),
+                np.empty(0, dtype=np.uint64), np.empty(0, dtype=bool))
+    return (np.concatenate(signatures), np.concatenate(sketches), np.concatenate(runs),
+            np.concatenate(shingles) >= MIN_SHINGLES)
+
+
+def _candidate_pairs(signatures: np.ndarray, digit_runs: np.ndarray,
+                     positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs of positions with the same digit runs whose signatures are
+    within MAX_DISTANCE bits
+    """
+    signatures, digit_runs = signatures[positions], digit_runs[positions]
+    order = np.lexsort((digit_runs, signatures))
+    signatures, digit_runs, positions = signatures[order], digit_runs[order], positions[order]
+    # Rows with equal signatures and digit runs are paired directly; the
+    # bands only see one of each
+    left, right = [], []
+    for offset in range(1, BUCKET_WINDOW + 1):
+        same = (signatures[offset:] == signatures[:-offset]) & (digit_runs[offset:] == digit_runs[:-offset])
+        if not same.any():
+            break
+        left.append(positions[:-offset][same])
+        right.append(positions[offset:][same])
+    equal = (signatures[1:] == signatures[:-1]) & (digit_runs[1:] == digit_runs[:-1])
+    distinct = np.concatenate(([True], ~equal)) if len(signatures) else np.empty(0, dtype=bool)
+    signatures, digit_runs, positions = signatures[distinct], digit_runs[distinct], positions[distinct]
+    mask = np.uint64((1 << BAND_BITS) - 1)
+    for band in range(BANDS):
+        keys = (signatures >> np.uint64(band * BAND_BITS)) & mask
+        order = np.lexsort((signatures, digit_runs, keys))
+        keys, sorted_runs = keys[order], digit_runs[order]
+        sorted_signatures, sorted_positions = signatures[order], positions[order]
+        for offset in range(1, BUCKET_WINDOW + 1):
+            same = (keys[offset:] == keys[:-offset]) & (sorted_runs[offset:] == sorted_runs[:-offset])
+            if not same.any():
+                break
+            same[same] = _popcount(sorted_signatures[offset:][same] ^ sorted_signatures[:-offset][same]) <= MAX_DISTANCE
+            left.append(sorted_positions[:-offset][same])
+            right.append(sorted_positions[offset:][same])
+    if not left:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def _similarity(sketches: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Jaccard similarity of the shingles of each pair, estimated from the
+    sketch bins that are filled in either text
+    """
+    scores = np.empty(len(left), dtype=np.float64)
+    for start in range(0, len(left), PAIR_BLOCK):
+        a, b = sketches[left[start:start + PAIR_BLOCK]], sketches[right[start:start + PAIR_BLOCK]]
+        filled = (a != EMPTY_BIN) | (b != EMPTY_BIN)
+        scores[start:start + PAIR_BLOCK] = ((a == b) & filled).sum(axis=1) / np.maximum(filled.sum(axis=1), 1)
+    return scores
+
+
+def _components(rows: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Smallest row of the connected component of every row"""
+    labels = np.arange(rows, dtype=np.int64)
+    while len(left):
+        low = np.minimum(labels[left], labels[right])
+        np.minimum.at(labels, labels[left], low)
+        np.minimum.at(labels, labels[right], low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        apart = labels[left] != labels[right]
+        left, right = left[apart], right[apart]
+    return labels
+
+
+class NearDuplicateIndex:
+    """SimHash fingerprints of case texts, clustered through banded LSH.
+
+    Every row keeps a 64-bit SimHash, a MinHash sketch and a hash of the
+    digit runs of its cleaned text. Rows sharing one of the BANDS signature
+    bands fall in the same bucket; only neighbours inside a bucket are
+    compared, and pairs with the same digit runs within MAX_DISTANCE bits are
+    candidates, so clustering takes a few sorts instead of comparing all
+    pairs. Candidates whose sketches estimate a Jaccard similarity of at
+    least MIN_SIMILARITY are joined into clusters. Each cluster is
+    represented by its preferred row (the first published).
+    """
+
+    def __init__(self):
+        self.signatures = np.empty(0, dtype=np.uint64)
+        self.sketches = np.empty((0, SKETCH_BINS), dtype=np.uint8)
+        self.digit_runs = np.empty(0, dtype=np.uint64)
+        self.valid = np.empty(0, dtype=bool)
+        # Representative row of the cluster of every row (itself when unique)
+        self.labels = np.empty(0, dtype=np.int64)
+        self.preference = np.empty(0, dtype=np.int64)
+
+    def update(self, texts: Sequence[Optional[str]], positions: np.ndarray, rows: int):
+        """Fingerprint the texts of the rows at the given positions; call
+        cluster afterwards.
+        """
+        if rows > len(self.signatures):
+            grow = rows - len(self.signatures)
+            self.signatures = np.concatenate([self.signatures, np.zeros(grow, dtype=np.uint64)])
+            self.sketches = np.concatenate([self.sketches, np.full((grow, SKETCH_BINS), EMPTY_BIN, dtype=np.uint8)])
+            self.digit_runs = np.concatenate([self.digit_runs, np.zeros(grow, dtype=np.uint64)])
+            self.valid = np.concatenate([self.valid, np.zeros(grow, dtype=bool)])
+        signatures, sketches, digit_runs, valid = fingerprint(texts)
+        self.signatures[positions] = signatures
+        self.sketches[positions] = sketches
+        self.digit_runs[positions] = digit_runs
+        self.valid[positions] = valid
+
+    def cluster(self, preference: np.ndarray):
+        """Recompute the clusters; within one the row with the highest
+        preference becomes the representative.
+        """
+        rows = len(self.signatures)
+        self.preference = np.asarray(preference, dtype=np.int64)
+        if not rows:
+            self.labels = np.empty(0, dtype=np.int64)
+            return
+        left, right = _candidate_pairs(self.signatures, self.digit_runs, np.flatnonzero(self.valid))
+        confirmed = _similarity(self.sketches, left, right) >= MIN_SIMILARITY
+        components = _components(rows, left[confirmed], right[confirmed])
+        order = np.lexsort((-preference, components))
+        first = np.concatenate(([True], components[order][1:] != components[order][:-1]))
+        representative = np.empty(rows, dtype=np.int64)
+        representative[components[order][first]] = order[first]
+        self.labels = representative[components]
+
+    @property
+    def duplicate_mask(self) -> np.ndarray:
+        """Rows that near-duplicate the representative of their cluster"""
+        return self.labels != np.arange(len(self.labels))
+
+    def clusters(self, positions: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """Clusters of two or more rows (among positions, when given), largest
+        first, each with its representative first.
+        """
+        positions = np.flatnonzero(self.valid) if positions is None else positions[self.valid[positions]]
+        labels = self.labels[positions]
+        order = np.lexsort((-self.preference[positions], labels))
+        labels, positions = labels[order], positions[order]
+        starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+        sizes = np.diff(np.append(starts, len(labels)))
+        groups = [positions[start:start + size] for start, size in zip(starts, sizes) if size > 1]
+        groups.sort(key=len, reverse=True)
+        return groups
+
+    def duplicate_of(self, positions: np.ndarray, kept: Optional[np.ndarray] = None) -> np.ndarray:
+        """For each row at positions, the row it is a near-duplicate of, or -1.
+
+        A row duplicates a kept row of its cluster when there is one, and
+        otherwise the preferred row of its cluster among positions.
+        """
+        labels = self.labels[positions]
+        target = np.full(len(positions), -1, dtype=np.int64)
+        if kept is not None and len(kept):
+            order = np.argsort(self.labels[kept], kind="stable")
+            kept_labels, kept = self.labels[kept][order], kept[order]
+            found = np.searchsorted(kept_labels, labels)
+            hit = found < len(kept_labels)
+            hit[hit] = kept_labels[found[hit]] == labels[hit]
+            target[hit] = kept[found[hit]]
+            target[target == positions] = -1
+        rest = np.flatnonzero(target < 0)
+        order = rest[np.lexsort((-self.preference[positions[rest]], labels[rest]))]
+        first = np.concatenate(([True], labels[order][1:] != labels[order][:-1])) if len(order) else np.empty(0, dtype=bool)
+        keeper = positions[order][np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))]
+        target[order[~first]] = keeper[~first]
+        return target
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.signatures.nbytes + self.sketches.nbytes + self.digit_runs.nbytes + self.valid.nbytes + self.labels.nbytes + self.preference.nbytes)
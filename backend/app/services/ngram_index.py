@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Row positions are packed into the low bits of each (bigram, row) key, code
+# points take 21 bits each, so a bigram key fills the remaining 42 bits
+ROW_BITS = 22
+MAX_ROWS = 1 << ROW_BITS
+_ROW_MASK = np.uint64(MAX_ROWS - 1)
+# Texts are joined with NUL before encoding; bigrams touching it are dropped
+_SEPARATOR = "\x00"
+# Characters encoded per vectorized build step, bounding peak memory
+BUILD_CHUNK_CHARS = 16_000_000
+# Incremental updates add segments; past this many they are merged into one
+MAX_SEGMENTS = 8
+
+_EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+def _sorted_unique(keys: np.ndarray) -> np.ndarray:
+    """np.unique for large arrays (a plain sort beats hashing here)"""
+    keys = np.sort(keys)
+    if len(keys) < 2:
+        return keys
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+
+
+def union_rows(*parts: np.ndarray) -> np.ndarray:
+    """Sorted union of row position arrays"""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return _EMPTY_ROWS
+    if len(parts) == 1:
+        return parts[0].astype(np.int64)
+    return _sorted_unique(np.concatenate(parts).astype(np.int64))
+
+
+def _chunk_keys(texts: Sequence[Optional[str]], rows: np.ndarray) -> np.ndarray:
+    """Sorted unique (bigram << ROW_BITS | row) keys for one chunk of texts"""
+    lowered = [text.lower() if text else "" for text in texts]
+    lengths = np.fromiter((len(text) for text in lowered), dtype=np.int64, count=len(lowered))
+    if not lengths.sum():
+        return np.empty(0, dtype=np.uint64)
+    joined = _SEPARATOR.join(lowered) + _SEPARATOR
+    points = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    owners = np.repeat(rows.astype(np.uint64), lengths + 1)
+    first, second = points[:-1], points[1:]
+    valid = (first != 0) & (second != 0)
+    keys = (((first << np.uint64(21)) | second) << np.uint64(ROW_BITS)) | owners[:-1]
+    return _sorted_unique(keys[valid])
+
+
+def _bigram_keys(texts: Sequence[Optional[str]], rows: np.ndarray) -> np.ndarray:
+    parts = []
+    start = 0
+    while start < len(texts):
+        end, chars = start, 0
+        while end < len(texts) and chars < BUILD_CHUNK_CHARS:
+            chars += len(texts[end] or "") + 1
+            end += 1
+        parts.append(_chunk_keys(texts[start:end], rows[start:end]))
+        start = end
+    if not parts:
+        return np.empty(0, dtype=np.uint64)
+    return parts[0] if len(parts) == 1 else _sorted_unique(np.concatenate(parts))
+
+
+def _term_bigrams(term: str) -> Optional[np.ndarray]:
+    """Bigram codes of a query term, or None if it is too short to look up"""
+    term = term.lower()
+    if len(term) < 2 or _SEPARATOR in term:
+        return None
+    points = np.frombuffer(term.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    return np.unique((points[:-1] << np.uint64(21)) | points[1:])
+
+
+class _Segment:
+    """Posting lists of one build: sorted bigrams, their offsets into rows"""
+
+    def __init__(self, keys: np.ndarray):
+        bigrams = keys >> np.uint64(ROW_BITS)
+        starts = np.flatnonzero(np.diff(bigrams)) + 1 if len(bigrams) else _EMPTY_ROWS
+        self.bigrams = bigrams[np.concatenate(([0], starts))] if len(bigrams) else bigrams
+        self.offsets = np.concatenate(([0], starts, [len(keys)])).astype(np.int64)
+        self.rows = (keys & _ROW_MASK).astype(np.uint32)
+
+    def postings(self, bigram: np.uint64) -> np.ndarray:
+        i = int(np.searchsorted(self.bigrams, bigram))
+        if i == len(self.bigrams) or self.bigrams[i] != bigram:
+            return _EMPTY_ROWS
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def keys(self) -> np.ndarray:
+        counts = np.diff(self.offsets)
+        return (np.repeat(self.bigrams, counts) << np.uint64(ROW_BITS)) | self.rows.astype(np.uint64)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.bigrams.nbytes + self.offsets.nbytes + self.rows.nbytes)
+
+
+class NgramIndex:
+    """Character bigram inverted index over text columns of the case view.
+
+    For every indexed column it maps each lower-cased character bigram to the
+    sorted view positions of the rows containing it. A literal query term of
+    two or more characters can only match rows holding all of its bigrams,
+    so intersecting those posting lists yields a candidate set that the
+    caller still verifies; single-character terms do not narrow the
+    candidates.
+
+    Rows added or changed after the build are indexed into extra segments.
+    Postings of a changed row's previous text are kept, which only adds
+    candidates that fail verification.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._segments: Dict[str, List[_Segment]] = {}
+
+    @classmethod
+    def build(cls, columns: Dict[str, Sequence[Optional[str]]], rows: int) -> "NgramIndex":
+        """Index the texts of each column, given in view row order"""
+        index = cls()
+        index.add(columns, np.arange(rows, dtype=np.int64))
+        return index
+
+    def add(self, columns: Dict[str, Sequence[Optional[str]]], positions: np.ndarray):
+        """Index the texts of added or changed rows at the given view positions"""
+        if len(positions) and int(positions.max()) >= MAX_ROWS:
+            raise ValueError(f"Bigram index supports at most {MAX_ROWS} rows")
+        for column, texts in columns.items():
+            keys = _bigram_keys(texts, positions)
+            if not len(keys):
+                continue
+            segments = self._segments.setdefault(column, [])
+            segments.append(_Segment(keys))
+            if len(segments) > MAX_SEGMENTS:
+                merged = _sorted_unique(np.concatenate([segment.keys() for segment in segments]))
+                self._segments[column] = [_Segment(merged)]
+        if len(positions):
+            self.rows = max(self.rows, int(positions.max()) + 1)
+
+    def covers(self, column: str) -> bool:
+        return column in self._segments
+
+    def _postings(self, column: str, bigram: np.uint64) -> np.ndarray:
+        return union_rows(*(segment.postings(bigram) for segment in self._segments.get(column, [])))
+
+    def _column_candidates(self, column: str, bigrams: np.ndarray) -> np.ndarray:
+        postings = sorted((self._postings(column, bigram) for bigram in bigrams), key=len)
+        result = postings[0]
+        for rows in postings[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+    def candidates(self, columns: Sequence[str], term: str) -> Optional[np.ndarray]:
+        """Sorted view positions of rows where any of the columns may contain
+        the term. None when the index cannot narrow the search.
+        """
+        bigrams = _term_bigrams(term)
+        if bigrams is None or not columns or any(not self.covers(column) for column in columns):
+            return None
+        return union_rows(*(self._column_candidates(column, bigrams) for column in columns))
+
+    def memory_bytes(self) -> Dict[str, int]:
+        return {
+            column: sum(segment.nbytes for segment in segments)
+            for column, segments in self._segments.items()
+        }
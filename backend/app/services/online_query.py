@@ -0,0 +1,126 @@
+import re
+from datetime import date, datetime, time
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+
+from app.models.case import CaseSearchRequest
+from app.services.term_matcher import split_terms
+
+# Array of lower-cased character bigrams of the searchable fields, covered by
+# a multikey index and the collection's text index
+SEARCH_TOKEN_FIELD = "search_tokens"
+# Request filters and the document fields they search (any field may match)
+FIELD_FILTERS = {
+    "title_text": ["标题"],
+    "wenhao_text": ["文号", "行政处罚决定书文号"],
+    "people_text": ["被处罚当事人"],
+    "event_text": ["主要违法违规事实"],
+    "law_text": ["行政处罚依据"],
+    "penalty_text": ["行政处罚决定"],
+    "org_text": ["作出处罚决定的机关名称"],
+    "industry": ["industry"],
+    "province": ["province"],
+}
+KEYWORD_FIELDS = [
+    "标题", "文号", "被处罚当事人", "主要违法违规事实",
+    "行政处罚依据", "行政处罚决定", "作出处罚决定的机关名称",
+]
+TOKEN_SOURCE_FIELDS = list(dict.fromkeys(
+    [field for fields in FIELD_FILTERS.values() for field in fields] + KEYWORD_FIELDS
+))
+
+
+def term_tokens(term: str) -> List[str]:
+    """Character bigrams of a lower-cased term (none for single characters)"""
+    term = term.lower()
+    return list(dict.fromkeys(term[i:i + 2] for i in range(len(term) - 1)))
+
+
+def search_tokens(doc: Dict[str, Any]) -> List[str]:
+    """Bigram tokens of every searchable field of a document"""
+    tokens: Dict[str, None] = {}
+    for field in TOKEN_SOURCE_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, str) and value:
+            tokens.update(dict.fromkeys(term_tokens(value)))
+    return list(tokens)
+
+
+def _as_datetime(value: Any) -> Any:
+    """Dates are stored as BSON datetimes; request dates are plain dates"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time.min)
+    return value
+
+
+def _matches_term(fields: List[str], term: str) -> Dict[str, Any]:
+    regex = {"$regex": re.escape(term), "$options": "i"}
+    if len(fields) == 1:
+        return {fields[0]: regex}
+    return {"$or": [{field: regex} for field in fields]}
+
+
+def build_online_query(search_request: CaseSearchRequest, text_mode: bool = False) -> Dict[str, Any]:
+    """MongoDB filter for an online search.
+
+    Every space-separated term of a field filter must appear in that field
+    and every keyword term in one of the keyword fields, matched as escaped,
+    case-insensitive literals. In text mode the same terms first select
+    candidates through the bigram token field (text index for relevance,
+    ``$all`` on the multikey index for the AND), so the regexes only verify
+    the narrowed documents.
+    """
+    conditions: List[Dict[str, Any]] = []
+    if search_request.start_date or search_request.end_date:
+        date_filter = {}
+        if search_request.start_date:
+            date_filter["$gte"] = _as_datetime(search_request.start_date)
+        if search_request.end_date:
+            date_filter["$lte"] = _as_datetime(search_request.end_date)
+        conditions.append({"发布日期": date_filter})
+
+    term_conditions: List[Dict[str, Any]] = []
+    tokens: Dict[str, None] = {}
+    searches = [(fields, getattr(search_request, name, "")) for name, fields in FIELD_FILTERS.items()]
+    searches.append((KEYWORD_FIELDS, search_request.keyword))
+    for fields, text in searches:
+        for term in split_terms(text):
+            term_conditions.append(_matches_term(fields, term))
+            term_bigrams = term_tokens(term)
+            if text_mode and term_bigrams:
+                conditions.append({SEARCH_TOKEN_FIELD: {"$all": term_bigrams}})
+                tokens.update(dict.fromkeys(term_bigrams))
+
+    # "-" and quotes are operators in $search strings
+    search_string = " ".join(t for t in tokens if not t.startswith("-") and '"' not in t)
+    if search_string:
+        conditions.insert(0, {"$text": {"$search": search_string}})
+    conditions.extend(term_conditions)
+
+    if not conditions:
+        return {}
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def uses_text_index(query: Dict[str, Any]) -> bool:
+    """Whether a query built by build_online_query selects through $text"""
+    return "$text" in query or any("$text" in c for c in query.get("$and", []))
+
+
+async def backfill_search_tokens(collection, batch_size: int = 1000) -> int:
+    """Compute the token field for documents that do not have it yet"""
+    projection = {field: 1 for field in TOKEN_SOURCE_FIELDS}
+    cursor = collection.find({SEARCH_TOKEN_FIELD: {"$exists": False}}, projection)
+    updated = 0
+    while True:
+        docs = await cursor.to_list(length=batch_size)
+        if not docs:
+            break
+        operations = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {SEARCH_TOKEN_FIELD: search_tokens(doc)}})
+            for doc in docs
+        ]
+        result = await collection.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+    return updated
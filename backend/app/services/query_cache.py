@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.case import CaseSearchRequest
+from app.services.term_matcher import split_terms
+
+# Request fields that do not change which local cases match (paging, online
+# search mode, facets, explain)
+NON_FILTER_FIELDS = {"page", "page_size", "cursor", "include_total", "search_mode", "facets", "explain"}
+# Text fields whose term order and operators matter, kept as written
+RAW_TEXT_FIELDS = {"query"}
+
+QueryKey = Tuple[int, str]
+
+
+class _QueryEntry:
+    def __init__(self, positions: np.ndarray):
+        self.positions = positions
+        self.created_at = time.time()
+
+
+class QueryCache:
+    """LRU/TTL cache of search results.
+
+    Entries map a canonical search request (without its page) and the case
+    view version to the matching view row positions in result order, so every
+    page of a query is a slice of one entry. Entries are evicted least
+    recently used first once their total size passes ``max_bytes``, expire
+    after ``ttl_seconds``, and stop matching as soon as the view is rebuilt.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[QueryKey, _QueryEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(search_request: CaseSearchRequest, version: int) -> QueryKey:
+        """Canonical key: text filters as sorted lower-case terms, pages ignored"""
+        canonical = {}
+        for field, value in search_request.model_dump(exclude=NON_FILTER_FIELDS).items():
+            if isinstance(value, str) and field in RAW_TEXT_FIELDS:
+                value = " ".join(value.split())
+            elif isinstance(value, str):
+                value = " ".join(sorted(split_terms(value)))
+            elif field == "min_penalty":
+                value = float(value or 0)
+            elif value is not None:
+                value = str(value)
+            canonical[field] = value
+        return version, json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+
+    def _drop(self, key: QueryKey):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.positions.nbytes
+
+    def get(self, key: QueryKey) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry.created_at > self.ttl_seconds:
+                self._drop(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.positions
+
+    def put(self, key: QueryKey, positions: np.ndarray):
+        if positions.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            # Results of older view versions can never be hit again
+            for stale in [k for k in self._entries if k[0] != key[0]]:
+                self._drop(stale)
+            self._entries[key] = _QueryEntry(positions)
+            self._bytes += positions.nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Global query cache instance
+query_cache = QueryCache(
+    max_bytes=settings.QUERY_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS,
+)
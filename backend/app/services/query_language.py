@@ -0,0 +1,414 @@
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.case_store import AMOUNT_COLUMN, DATE_COLUMN, TEXT_COLUMN
+from app.services.ngram_index import union_rows
+from app.services.term_matcher import TermMatcher
+from app.services.text_blob import TEXT_OFFSET_COLUMN
+
+# Query fields and the case view columns they search (any column may match)
+FIELD_COLUMNS = {
+    "title": ["标题"],
+    "wenhao": ["文号", "wenhao"],
+    "people": ["people"],
+    "event": ["event"],
+    "law": ["law"],
+    "penalty": ["penalty"],
+    "org": ["org"],
+    "province": ["province"],
+    "industry": ["industry"],
+    "category": ["category"],
+    "content": [TEXT_COLUMN],
+}
+RANGE_FIELDS = {"amount": AMOUNT_COLUMN, "date": DATE_COLUMN}
+OPERATORS = {"AND", "OR", "NOT"}
+
+_AMOUNT = re.compile(r"^(\d+(?:\.\d+)?)(万|亿)?$")
+_AMOUNT_UNITS = {None: 1, "万": 10_000, "亿": 100_000_000}
+_DATE = re.compile(r"^(\d{4})(?:[-/.](\d{1,2})(?:[-/.](\d{1,2}))?)?$")
+_COMPARISON = re.compile(r"^(>=|<=|>|<)(.+)$")
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for search queries that cannot be parsed"""
+
+
+class Term:
+    """Literal text (a word or a quoted phrase) searched in a field's columns"""
+
+    op = "term"
+
+    def __init__(self, text: str, field: Optional[str] = None, phrase: bool = False):
+        self.text = text
+        self.field = field
+        self.phrase = phrase
+
+    def describe(self) -> str:
+        text = f'"{self.text}"' if self.phrase else self.text
+        return f"{self.field}:{text}" if self.field else text
+
+
+class Range:
+    """Inclusive amount or date bounds (None leaves a side open)"""
+
+    op = "range"
+
+    def __init__(self, field: str, low: Any = None, high: Any = None, source: str = ""):
+        self.field = field
+        self.low = low
+        self.high = high
+        self.source = source
+
+    def bounds(self) -> Dict[str, Optional[str]]:
+        return {side: None if bound is None else str(bound) for side, bound in (("low", self.low), ("high", self.high))}
+
+    def describe(self) -> str:
+        return f"{self.field}:{self.source}"
+
+
+class Not:
+    op = "not"
+
+    def __init__(self, child):
+        self.child = child
+
+    def describe(self) -> str:
+        return f"NOT {self.child.describe()}"
+
+
+class And:
+    op = "and"
+
+    def __init__(self, children: List[Any]):
+        self.children = children
+
+    def describe(self) -> str:
+        return "(" + " AND ".join(child.describe() for child in self.children) + ")"
+
+
+class Or:
+    op = "or"
+
+    def __init__(self, children: List[Any]):
+        self.children = children
+
+    def describe(self) -> str:
+        return "(" + " OR ".join(child.describe() for child in self.children) + ")"
+
+
+def _parse_amount(text: str) -> float:
+    match = _AMOUNT.match(text)
+    if not match:
+        raise QuerySyntaxError(f"Invalid amount: {text}")
+    return float(match.group(1)) * _AMOUNT_UNITS[match.group(2)]
+
+
+def _parse_period(text: str) -> Tuple[np.datetime64, np.datetime64]:
+    """First and last day of a year, month or day written as 2023, 2023-01 or 2023-01-05"""
+    match = _DATE.match(text)
+    if not match:
+        raise QuerySyntaxError(f"Invalid date: {text}")
+    year, month, day = match.groups()
+    try:
+        if day:
+            first = np.datetime64(f"{year}-{int(month):02d}-{int(day):02d}", "D")
+            return first, first
+        if month:
+            first_month = np.datetime64(f"{year}-{int(month):02d}", "M")
+            return first_month.astype("datetime64[D]"), (first_month + 1).astype("datetime64[D]") - 1
+    except ValueError:
+        raise QuerySyntaxError(f"Invalid date: {text}")
+    return np.datetime64(f"{year}-01-01", "D"), np.datetime64(f"{year}-12-31", "D")
+
+
+def _parse_range(field: str, value: str) -> Range:
+    """amount:>100000, amount:1万..5万, amount:50000, date:2023-01..2023-06, date:>=2023"""
+    if field == "amount":
+        step = lambda bound, up: np.nextafter(bound, np.inf if up else -np.inf)
+        period = lambda text: (_parse_amount(text),) * 2
+    else:
+        step = lambda bound, up: bound + (1 if up else -1)
+        period = _parse_period
+    comparison = _COMPARISON.match(value)
+    if comparison:
+        operator, bound = comparison.groups()
+        first, last = period(bound)
+        if operator == ">":
+            return Range(field, low=step(last, True), source=value)
+        if operator == ">=":
+            return Range(field, low=first, source=value)
+        if operator == "<":
+            return Range(field, high=step(first, False), source=value)
+        return Range(field, high=last, source=value)
+    if ".." in value:
+        low, high = value.split("..", 1)
+        if not low and not high:
+            raise QuerySyntaxError(f"Empty range: {field}:{value}")
+        return Range(field, period(low)[0] if low else None, period(high)[1] if high else None, source=value)
+    first, last = period(value)
+    return Range(field, first, last, source=value)
+
+
+def _field_term(field: str, value: str, phrase: bool = False):
+    if not value:
+        raise QuerySyntaxError(f"Missing value for field {field}")
+    if field in RANGE_FIELDS:
+        if phrase:
+            raise QuerySyntaxError(f"Field {field} takes a range, not a phrase")
+        return _parse_range(field, value)
+    return Term(value, field, phrase)
+
+
+def _read_phrase(text: str, start: int) -> Tuple[str, int]:
+    """Phrase from the opening quote at start, and the position after its closing quote"""
+    end = text.find('"', start + 1)
+    if end < 0:
+        raise QuerySyntaxError("Unterminated quoted phrase")
+    return text[start + 1:end], end + 1
+
+
+def tokenize(text: str) -> List[Tuple[str, Any]]:
+    """Tokens of a query: ("(", None), (")", None), ("op", name) and ("term", node)"""
+    tokens: List[Tuple[str, Any]] = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char.isspace():
+            i += 1
+        elif char in "()":
+            tokens.append((char, None))
+            i += 1
+        elif char == '"':
+            phrase, i = _read_phrase(text, i)
+            if phrase.strip():
+                tokens.append(("term", Term(phrase, phrase=True)))
+        else:
+            start = i
+            while i < len(text) and not text[i].isspace() and text[i] not in '()"':
+                i += 1
+            word = text[start:i]
+            field, colon, value = word.partition(":")
+            field = field.lower()
+            if word in OPERATORS:
+                tokens.append(("op", word))
+            elif colon and (field in FIELD_COLUMNS or field in RANGE_FIELDS):
+                if not value and i < len(text) and text[i] == '"':
+                    phrase, i = _read_phrase(text, i)
+                    tokens.append(("term", _field_term(field, phrase, phrase=True)))
+                else:
+                    tokens.append(("term", _field_term(field, value)))
+            else:
+                # Unknown prefixes (e.g. times like 10:30) are plain text
+                tokens.append(("term", Term(word)))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over tokens: NOT binds tighter than AND (also implied
+    between adjacent terms), which binds tighter than OR.
+    """
+
+    def __init__(self, tokens: List[Tuple[str, Any]]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self) -> Tuple[Optional[str], Any]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def take(self) -> Tuple[Optional[str], Any]:
+        token = self.peek()
+        self.i += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.i < len(self.tokens):
+            raise QuerySyntaxError("Unexpected ')'")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ("op", "OR"):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_unary()]
+        while True:
+            kind, value = self.peek()
+            if kind == "op" and value == "AND":
+                self.take()
+            elif kind is None or kind == ")" or (kind == "op" and value == "OR"):
+                break
+            children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_unary(self):
+        kind, value = self.take()
+        if kind == "op" and value == "NOT":
+            return Not(self.parse_unary())
+        if kind == "(":
+            node = self.parse_or()
+            if self.take()[0] != ")":
+                raise QuerySyntaxError("Missing ')'")
+            return node
+        if kind == "term":
+            return value
+        if kind is None:
+            raise QuerySyntaxError("Query ends where a term is expected")
+        raise QuerySyntaxError(f"Unexpected {value or kind}")
+
+
+def parse_query(text: str):
+    """Syntax tree of a search query, e.g.
+    ``people:某银行 (law:保险法 OR "违规 发放") NOT 撤销 amount:>100000 date:2023-01..2023-06``
+    """
+    tokens = tokenize(text or "")
+    if not tokens:
+        raise QuerySyntaxError("Empty query")
+    return _Parser(tokens).parse()
+
+
+class QueryPlan:
+    """Evaluates a parsed query over view positions of the case store.
+
+    Each node narrows the positions it is given: ranges are cut from the
+    store's sorted date/amount columns, terms are looked up in the bigram
+    index (or scan when it cannot narrow) and verified as literals on the
+    surviving rows only, with categorical columns matched through their
+    categories. AND runs its children cheapest first, each on the previous
+    child's output, and negations last. After ``execute``, ``explain`` holds
+    the plan tree with each node's access path, row counts and timing.
+    """
+
+    def __init__(self, root, store, default_columns: Sequence[str]):
+        self.root = root
+        self.store = store
+        self.default_columns = list(default_columns)
+        self.explain: Dict[str, Any] = {}
+        self._estimates: Dict[int, int] = {}
+        self._candidate_cache: Dict[Tuple[int, str], Optional[np.ndarray]] = {}
+
+    def execute(self, within: np.ndarray) -> np.ndarray:
+        """Sorted positions, out of the sorted positions given, that match the query"""
+        self._estimates, self._candidate_cache = {}, {}
+        rows, self.explain = self._run(self.root, within)
+        return rows
+
+    def _columns(self, term: Term) -> List[str]:
+        view = self.store.view
+        columns = FIELD_COLUMNS[term.field] if term.field else self.default_columns
+        # Full text is read from the store's blob, not a view column
+        return [
+            col for col in columns
+            if col in view.columns or (col == TEXT_COLUMN and TEXT_OFFSET_COLUMN in view.columns)
+        ]
+
+    def _is_categorical(self, column: str) -> bool:
+        view = self.store.view
+        return column in view.columns and isinstance(view[column].dtype, pd.CategoricalDtype)
+
+    def _candidates(self, term: Term, column: str) -> Optional[np.ndarray]:
+        """Bigram index candidates of a term in one column (None: scan the column)"""
+        if self._is_categorical(column):
+            return None
+        key = (id(term), column)
+        if key not in self._candidate_cache:
+            self._candidate_cache[key] = self.store.index_candidates([column], term.text)
+        return self._candidate_cache[key]
+
+    def _range_rows(self, node: Range) -> np.ndarray:
+        if node.field == "date":
+            rows = self.store.date_range(node.low, node.high)
+        else:
+            rows = self.store.amount_between(node.low, node.high)
+        return _EMPTY if rows is None else rows
+
+    def estimate(self, node) -> int:
+        """Expected matching rows (exact for ranges, an upper bound for indexed terms)"""
+        key = id(node)
+        if key not in self._estimates:
+            total = len(self.store.view)
+            if isinstance(node, Range):
+                estimate = len(self._range_rows(node))
+            elif isinstance(node, Term):
+                estimate = 0
+                for column in self._columns(node):
+                    candidates = self._candidates(node, column)
+                    estimate += total if candidates is None else len(candidates)
+            elif isinstance(node, And):
+                estimate = min(self.estimate(child) for child in node.children)
+            elif isinstance(node, Or):
+                estimate = sum(self.estimate(child) for child in node.children)
+            else:
+                estimate = total
+            self._estimates[key] = min(estimate, total)
+        return self._estimates[key]
+
+    def _run(self, node, within: np.ndarray) -> Tuple[np.ndarray, Dict[str, Any]]:
+        start = time.perf_counter()
+        info: Dict[str, Any] = {"node": node.describe(), "op": node.op, "input_rows": int(len(within))}
+        if isinstance(node, Range):
+            info["access"] = "sorted_index"
+            info.update(node.bounds())
+            rows = np.intersect1d(within, self._range_rows(node), assume_unique=True)
+        elif isinstance(node, Term):
+            rows = self._run_term(node, within, info)
+        elif isinstance(node, Not):
+            child_rows, child = self._run(node.child, within)
+            info["children"] = [child]
+            rows = np.setdiff1d(within, child_rows, assume_unique=True)
+        elif isinstance(node, Or):
+            parts, info["children"] = [], []
+            for child in node.children:
+                child_rows, child_info = self._run(child, within)
+                parts.append(child_rows)
+                info["children"].append(child_info)
+            rows = union_rows(*parts)
+        else:
+            # Cheapest first; negations only remove rows, so they go last
+            children = sorted(node.children, key=lambda c: (isinstance(c, Not), self.estimate(c)))
+            rows, info["children"] = within, []
+            for child in children:
+                if not len(rows):
+                    info["children"].append({"node": child.describe(), "op": child.op, "skipped": True})
+                    continue
+                rows, child_info = self._run(child, rows)
+                info["children"].append(child_info)
+        info["output_rows"] = int(len(rows))
+        info["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return rows, info
+
+    def _run_term(self, term: Term, within: np.ndarray, info: Dict[str, Any]) -> np.ndarray:
+        view = self.store.view
+        matcher = TermMatcher(terms=[term.text])
+        found = np.zeros(len(within), dtype=bool)
+        access = []
+        # Cheap categorical columns first, the full text last; each column
+        # only verifies rows no earlier column has matched
+        columns = sorted(self._columns(term), key=lambda c: (not self._is_categorical(c), c == TEXT_COLUMN))
+        for column in columns:
+            pending = within[~found]
+            if not len(pending):
+                break
+            candidates = self._candidates(term, column)
+            rows = pending if candidates is None else np.intersect1d(pending, candidates, assume_unique=True)
+            if self._is_categorical(column):
+                access.append(f"{column}:categorical_codes")
+                hits = matcher.term_hits(view[column].iloc[rows])
+            else:
+                access.append(f"{column}:{'scan' if candidates is None else 'ngram_index'}")
+                if column == TEXT_COLUMN:
+                    hits = matcher.text_hits(self.store.texts_at(rows))
+                else:
+                    hits = matcher.term_hits(view[column].iloc[rows])
+            found[np.searchsorted(within, rows[hits[:, 0]])] = True
+        info["access"] = ", ".join(access)
+        info["estimate"] = self.estimate(term)
+        return within[found]
@@ -13,7 +13,10 @@ import traceback
 import re
 from datetime import datetime, date
 from typing import List, Dict, Any, Optional
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
 from app.core.database import db_manager
+from app.core.config import settings
 from app.models.case import OrganizationType, CaseDetail, CaseSummary
 
 
@@ -163,6 +166,33 @@ class ScraperService:
         df_final = df_final.reset_index(drop=True)
         return df_final.to_dict('records')
     
+    def _take_new_cases(self, cases: List[Dict[str, Any]], existing_ids: set,
+                        seen_ids: set, seen_keys: set) -> List[Dict[str, Any]]:
+        """逐页去重，与 _deduplicate_cases 的结果一致（保留首次出现的记录）"""
+        new_cases = []
+        for case in cases:
+            if not case.get('id'):
+                case['id'] = self._generate_case_id(
+                    case.get('title', ''),
+                    case.get('subtitle', ''),
+                    case.get('publish_date', '')
+                )
+            else:
+                case['id'] = str(case['id'])
+            
+            if case['id'] in seen_ids:
+                continue
+            seen_ids.add(case['id'])
+            if case['id'] in existing_ids:
+                continue
+            
+            content_key = (case.get('title'), case.get('subtitle'), case.get('publish_date'))
+            if content_key in seen_keys:
+                continue
+            seen_keys.add(content_key)
+            new_cases.append(case)
+        return new_cases
+    
     def _get_existing_cases_from_files(self, org_name: OrganizationType) -> set:
         """从文件中获取已有案例ID，用于去重"""
         try:
@@ -202,21 +232,32 @@ class ScraperService:
             print(f"从文件获取已有案例ID时出错: {e}")
             return set()
     
-    async def _save_to_database(self, cases: List[Dict[str, Any]], org_name: OrganizationType) -> int:
-        """Save cases to MongoDB database"""
+    def _empty_save_stats(self) -> Dict[str, Any]:
+        return {"upserted": 0, "modified": 0, "matched": 0, "errors": 0, "batches": []}
+
+    def _merge_save_stats(self, stats: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+        for key in ("upserted", "modified", "matched", "errors"):
+            stats[key] += other[key]
+        stats["batches"].extend(other["batches"])
+        return stats
+
+    async def _save_to_database(self, cases: List[Dict[str, Any]], org_name: OrganizationType,
+                                batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Upsert cases into MongoDB by id with batched, unordered bulk writes"""
+        stats = self._empty_save_stats()
         try:
             if not cases:
-                return 0
+                return stats
             
             # Check if database connection is enabled
             if not db_manager._connection_enabled:
                 print("Database connection is disabled - skipping database save")
-                return 0
+                return stats
             
             # Check if database is connected
             if not db_manager.client:
                 print("Database not connected - skipping database save")
-                return 0
+                return stats
             
             # Convert to CaseDetail objects
             case_details = []
@@ -254,30 +295,48 @@ class ScraperService:
                     continue
             
             if not case_details:
-                return 0
+                return stats
             
             # Save to database
             collection_name = f"cases_{self.org_name_mapping[org_name]}"
             collection = db_manager.get_collection(collection_name)
+            batch_size = batch_size or settings.DB_WRITE_BATCH_SIZE
             
-            # Use upsert to avoid duplicates
-            new_cases = 0
-            for case in case_details:
-                result = await collection.replace_one(
-                    {"id": case["id"]}, 
-                    case, 
-                    upsert=True
-                )
-                if result.upserted_id:
-                    new_cases += 1
+            # Upsert by id (backed by the unique id index), one round trip per batch.
+            # Unordered so one bad document does not stop the rest of the batch.
+            for start in range(0, len(case_details), batch_size):
+                batch = case_details[start:start + batch_size]
+                operations = [ReplaceOne({"id": case["id"]}, case, upsert=True) for case in batch]
+                try:
+                    result = await collection.bulk_write(operations, ordered=False)
+                    batch_stats = {
+                        "size": len(batch),
+                        "upserted": result.upserted_count,
+                        "modified": result.modified_count,
+                        "matched": result.matched_count,
+                        "errors": 0,
+                    }
+                except BulkWriteError as e:
+                    details = e.details
+                    batch_stats = {
+                        "size": len(batch),
+                        "upserted": details.get("nUpserted", 0),
+                        "modified": details.get("nModified", 0),
+                        "matched": details.get("nMatched", 0),
+                        "errors": len(details.get("writeErrors", [])),
+                    }
+                    print(f"Bulk write to {collection_name} had {batch_stats['errors']} errors: "
+                          f"{details.get('writeErrors', [])[:3]}")
+                self._merge_save_stats(stats, {**batch_stats, "batches": [batch_stats]})
+                print(f"Saved batch to {collection_name}: {batch_stats}")
             
-            print(f"Saved {new_cases} new cases to database collection {collection_name}")
-            return new_cases
+            print(f"Saved {stats['upserted']} new cases to database collection {collection_name}")
+            return stats
             
         except Exception as e:
             print(f"Error saving to database: {e}")
             print("Continuing without database save...")
-            return 0
+            return stats
     
     def _save_to_csv(self, df: pd.DataFrame, filename: str) -> str:
         """Save DataFrame to CSV file"""
@@ -423,6 +482,12 @@ class ScraperService:
             errors = []
             total_pages = end_page - start_page + 1
             
+            # New cases are written to the database in batches while later pages are fetched
+            batch_size = settings.DB_WRITE_BATCH_SIZE
+            seen_ids, seen_keys = set(), set()
+            pending_cases = []
+            save_tasks = []
+            
             async with aiohttp.ClientSession(
                 timeout=aiohttp.ClientTimeout(total=30),
                 connector=aiohttp.TCPConnector(ssl=False)
@@ -438,6 +503,12 @@ class ScraperService:
                         
                         if cases_on_page:
                             all_cases.extend(cases_on_page)
+                            pending_cases.extend(self._take_new_cases(
+                                cases_on_page, all_existing_cases, seen_ids, seen_keys
+                            ))
+                            while len(pending_cases) >= batch_size:
+                                batch, pending_cases = pending_cases[:batch_size], pending_cases[batch_size:]
+                                save_tasks.append(asyncio.create_task(self._save_to_database(batch, org_name)))
                         
                         # Update progress if task_id is provided
                         if task_id:
@@ -466,6 +537,9 @@ class ScraperService:
                 task_service.update_task_progress(task_id, 75)
                 print("Updated task progress: 75% (starting deduplication)")
             
+            if pending_cases:
+                save_tasks.append(asyncio.create_task(self._save_to_database(pending_cases, org_name)))
+            
             if not all_cases:
                 return {
                     "status": "completed",
@@ -499,8 +573,11 @@ class ScraperService:
                 task_service.update_task_progress(task_id, 95)
                 print("Updated task progress: 95% (saving to database)")
             
-            # Save to database - only new cases
-            new_cases_saved = await self._save_to_database(deduplicated_cases, org_name)
+            # Wait for the database batches started during fetching - only new cases
+            save_stats = self._empty_save_stats()
+            for batch_stats in await asyncio.gather(*save_tasks):
+                self._merge_save_stats(save_stats, batch_stats)
+            new_cases_saved = save_stats["upserted"]
             
             result = {
                 "status": "completed",
@@ -508,6 +585,9 @@ class ScraperService:
                 "total_scraped": len(all_cases),
                 "new_cases": len(deduplicated_cases),
                 "new_cases_saved_to_db": new_cases_saved,
+                "db_cases_modified": save_stats["modified"],
+                "db_write_errors": save_stats["errors"],
+                "db_batches": save_stats["batches"],
                 "errors": len(errors),
                 "error_details": errors
             }
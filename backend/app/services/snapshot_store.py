@@ -0,0 +1,254 @@
+import json
+import os
+import glob
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from app.services.csv_reader import apply_schema, read_csv_files, schema_family
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Dataset families compacted into the snapshot, one Parquet file each
+DATASET_FAMILIES = ["cbircsum", "cbircdtl", "cbircsplit", "cbirccat"]
+SNAPSHOT_DIRNAME = "snapshot"
+MANIFEST_FILENAME = "manifest.json"
+SOURCE_COLUMN = "_source"
+
+
+def family_for_prefix(prefix: str) -> Optional[str]:
+    """Map a file prefix (e.g. cbircdtljiguan) to its dataset family"""
+    matches = [family for family in DATASET_FAMILIES if prefix.startswith(family)]
+    return max(matches, key=len) if matches else None
+
+
+def _coerce_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """Give every column a single Arrow-compatible type"""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+        if inferred in ("string", "empty"):
+            continue
+        if inferred in ("integer", "floating", "mixed-integer-float", "decimal"):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        else:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def _csv_dtypes(file_path: str) -> Optional[Dict[str, str]]:
+    """Dtypes a plain pd.read_csv of the file gives, or None if it cannot be read"""
+    try:
+        return {name: str(dtype) for name, dtype in pd.read_csv(file_path).dtypes.items()}
+    except Exception as e:
+        logger.warning(f"Plain CSV read of {file_path} failed, not recording its dtypes: {e}")
+        return None
+
+
+class SnapshotStore:
+    """Columnar Parquet snapshot of the timestamped CSV files in a data folder.
+
+    ``build`` compacts each dataset family into ``snapshot/{family}.parquet``
+    (one row group per source CSV) and records the source files, their mtimes
+    and sizes in ``snapshot/manifest.json``, along with the dtypes a plain
+    ``pd.read_csv`` gives each file so readers without the dataset schemas
+    (the Streamlit app) can restore them. ``load`` serves files that are
+    still covered by the manifest from Parquet and falls back to CSV for files
+    that are newer than the snapshot.
+    """
+
+    @property
+    def available(self) -> bool:
+        return pq is not None
+
+    def snapshot_dir(self, folder: str) -> str:
+        return os.path.join(folder, SNAPSHOT_DIRNAME)
+
+    def read_manifest(self, folder: str) -> Dict[str, Any]:
+        """Read the snapshot manifest for a data folder (empty if none)"""
+        manifest_path = os.path.join(self.snapshot_dir(folder), MANIFEST_FILENAME)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot manifest {manifest_path}: {e}")
+            return {}
+
+    def _covered_sources(self, manifest: Dict[str, Any], family: str, files: List[str]) -> List[str]:
+        """Return basenames of files whose snapshot copy is still current"""
+        sources = manifest.get("families", {}).get(family, {}).get("sources", {})
+        covered = []
+        for file_path in files:
+            meta = sources.get(os.path.basename(file_path))
+            if not meta:
+                continue
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if stat.st_mtime_ns == meta.get("mtime_ns") and stat.st_size == meta.get("size"):
+                covered.append(os.path.basename(file_path))
+        return covered
+
+    def _read_snapshot(self, folder: str, family: str, sources: List[str],
+                       columns: Optional[List[str]] = None) -> pd.DataFrame:
+        path = os.path.join(self.snapshot_dir(folder), f"{family}.parquet")
+        read_columns = None
+        if columns is not None:
+            schema_names = pq.read_schema(path).names
+            read_columns = [c for c in columns if c in schema_names] + [SOURCE_COLUMN]
+        table = pq.read_table(
+            path,
+            columns=read_columns,
+            filters=[(SOURCE_COLUMN, "in", sources)],
+        )
+        return table.to_pandas()
+
+    def load(
+        self,
+        files: List[str],
+        csv_reader: Callable[[List[str]], pd.DataFrame] = read_csv_files,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Load files, preferring the snapshot copy when it is still current.
+        Rows keep the order of ``files`` regardless of where they are read from.
+        """
+        if not files:
+            return pd.DataFrame()
+        if not self.available:
+            return csv_reader(files)
+
+        by_group: Dict[tuple, List[str]] = {}
+        for file_path in files:
+            family = family_for_prefix(os.path.basename(file_path))
+            by_group.setdefault((os.path.dirname(file_path), family), []).append(file_path)
+
+        snapshot_parts: Dict[str, pd.DataFrame] = {}
+        for (folder, family), group_files in by_group.items():
+            if family is None:
+                continue
+            covered = self._covered_sources(self.read_manifest(folder), family, group_files)
+            if not covered:
+                continue
+            try:
+                snap_df = self._read_snapshot(folder, family, covered, columns)
+            except Exception as e:
+                logger.warning(f"Snapshot read failed for {family} in {folder}, using CSV: {e}")
+                continue
+            for name, part in snap_df.groupby(SOURCE_COLUMN, sort=False):
+                part = apply_schema(part.drop(columns=[SOURCE_COLUMN]), schema_family(name))
+                snapshot_parts[os.path.join(folder, name)] = part
+            for name in covered:
+                snapshot_parts.setdefault(os.path.join(folder, name), pd.DataFrame())
+
+        frames = []
+        pending_csv: List[str] = []
+
+        def flush_csv():
+            if pending_csv:
+                csv_df = csv_reader(list(pending_csv))
+                if columns is not None and not csv_df.empty:
+                    csv_df = csv_df[[c for c in columns if c in csv_df.columns]]
+                frames.append(csv_df)
+                pending_csv.clear()
+
+        # Consecutive CSV fallbacks are read together to keep batched reads
+        for file_path in files:
+            if file_path in snapshot_parts:
+                flush_csv()
+                frames.append(snapshot_parts[file_path])
+            else:
+                pending_csv.append(file_path)
+        flush_csv()
+
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def build(self, folder: str, families: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Compact each dataset family in folder into a Parquet snapshot"""
+        if not self.available:
+            raise RuntimeError("pyarrow is required to build Parquet snapshots")
+
+        snapshot_dir = self.snapshot_dir(folder)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        manifest = self.read_manifest(folder)
+        manifest.setdefault("families", {})
+
+        for family in families or DATASET_FAMILIES:
+            files = sorted(glob.glob(os.path.join(folder, f"{family}*.csv")))
+            if not files:
+                manifest["families"].pop(family, None)
+                continue
+
+            frames = []
+            previous = manifest["families"].get(family, {}).get("sources", {})
+            sources: Dict[str, Dict[str, Any]] = {}
+            for file_path in files:
+                # Reuse the existing snapshot copy for unchanged files
+                df = self.load([file_path])
+                name = os.path.basename(file_path)
+                stat = os.stat(file_path)
+                sources[name] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "rows": int(len(df))}
+                old = previous.get(name, {})
+                if old.get("mtime_ns") == stat.st_mtime_ns and old.get("size") == stat.st_size and "dtypes" in old:
+                    sources[name]["dtypes"] = old["dtypes"]
+                else:
+                    dtypes = _csv_dtypes(file_path)
+                    if dtypes is not None:
+                        sources[name]["dtypes"] = dtypes
+                if not df.empty:
+                    df[SOURCE_COLUMN] = name
+                    frames.append(df)
+            if not frames:
+                manifest["families"].pop(family, None)
+                continue
+
+            combined = _coerce_for_parquet(pd.concat(frames, ignore_index=True))
+            table = pa.Table.from_pandas(combined, preserve_index=False)
+
+            target = os.path.join(snapshot_dir, f"{family}.parquet")
+            tmp_path = target + ".tmp"
+            with pq.ParquetWriter(tmp_path, table.schema, compression="zstd") as writer:
+                # One row group per source file so filtered reads can skip the rest
+                offset = 0
+                for name in sources:
+                    rows = sources[name]["rows"]
+                    if rows:
+                        writer.write_table(table.slice(offset, rows))
+                        offset += rows
+            os.replace(tmp_path, target)
+
+            manifest["families"][family] = {
+                "path": f"{family}.parquet",
+                "rows": int(len(combined)),
+                "columns": {name: str(dtype) for name, dtype in combined.dtypes.items() if name != SOURCE_COLUMN},
+                "sources": sources,
+            }
+            logger.info(f"Snapshot built for {family}: {len(files)} files, {len(combined)} rows")
+
+        manifest["built_at"] = datetime.now().isoformat()
+        manifest_path = os.path.join(snapshot_dir, MANIFEST_FILENAME)
+        tmp_manifest = manifest_path + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_manifest, manifest_path)
+        return manifest
+
+
+# Global snapshot store instance
+snapshot_store = SnapshotStore()
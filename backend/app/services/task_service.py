@@ -185,3 +185,12 @@ def create_export_task(format_type: str = "csv") -> Task:
         description,
         format_type=format_type
     )
+
+def create_compaction_task(org_name: str = "") -> Task:
+    """Create a task for compacting data file fragments"""
+    description = f"合并{org_name or '全部'}数据文件"
+    return task_service.create_task(
+        TaskType.OTHER,
+        description,
+        org_name
+    )
@@ -0,0 +1,79 @@
+import sys
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Above this many prefix matches, top-k walks the frequency order instead of
+# sorting the matches
+SCAN_THRESHOLD = 4096
+_SCAN_CHUNK = 1024
+# Sorts after every character a key can continue with
+_KEY_END = "\U0010ffff"
+
+
+class TermDictionary:
+    """Distinct values of one field with their case counts, for autocomplete.
+
+    Values are kept sorted by their lower-cased form, so the values starting
+    with a prefix are one contiguous slice found by binary search. Top-k by
+    frequency sorts that slice when it is small, and otherwise walks a
+    precomputed most-frequent-first order until k values fall inside it.
+    Ties are broken alphabetically.
+    """
+
+    def __init__(self, values: List[str], counts: np.ndarray):
+        keys = [value.lower() for value in values]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[i] for i in order]
+        self.values = [values[i] for i in order]
+        self.counts = np.asarray(counts, dtype=np.int64)[order]
+        # Key positions, most frequent first (stable, so ties stay alphabetical)
+        self.by_count = np.argsort(-self.counts, kind="stable")
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "TermDictionary":
+        counts = series.value_counts(dropna=True)
+        counts = counts[counts > 0]
+        values = [str(value).strip() for value in counts.index]
+        keep = [i for i, value in enumerate(values) if value and value.lower() != "nan"]
+        merged = pd.Series(counts.to_numpy()[keep], index=[values[i] for i in keep]).groupby(level=0).sum()
+        return cls(merged.index.tolist(), merged.to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        prefix = prefix.lower()
+        if not prefix:
+            return 0, len(self.keys)
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + _KEY_END)
+
+    def top(self, prefix: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """The most frequent values starting with prefix (case-insensitive), with
+        counts; all of them without a limit.
+        """
+        low, high = self._prefix_range(prefix)
+        if limit is None:
+            limit = high - low
+        if high <= low or limit <= 0:
+            return []
+        if high - low == len(self.keys):
+            positions = self.by_count[:limit]
+        elif high - low > SCAN_THRESHOLD:
+            picked: List[int] = []
+            for start in range(0, len(self.by_count), _SCAN_CHUNK):
+                chunk = self.by_count[start:start + _SCAN_CHUNK]
+                picked.extend(chunk[(chunk >= low) & (chunk < high)][:limit - len(picked)].tolist())
+                if len(picked) >= limit:
+                    break
+            positions = np.asarray(picked, dtype=np.int64)
+        else:
+            positions = low + np.argsort(-self.counts[low:high], kind="stable")[:limit]
+        return [(self.values[i], int(self.counts[i])) for i in positions]
+
+    @property
+    def nbytes(self) -> int:
+        strings = sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in zip(self.keys, self.values))
+        return int(self.counts.nbytes + self.by_count.nbytes + strings)
@@ -0,0 +1,74 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+
+def split_terms(text: Optional[str]) -> List[str]:
+    """Space-separated query terms, lower-cased, without repeats"""
+    if not text:
+        return []
+    return list(dict.fromkeys(term.lower() for term in text.split()))
+
+
+class TermMatcher:
+    """Case-insensitive literal matcher for the terms of one query.
+
+    Terms are plain substrings, never regular expressions, so user input
+    needs no escaping. With pyahocorasick installed every value is scanned
+    once for all terms through an Aho-Corasick automaton; otherwise each term
+    is looked up with a vectorized substring search. Results are per-term
+    hit matrices (rows x terms) that callers can OR across columns before
+    requiring every term. Explicit terms (e.g. phrases with spaces) can be
+    given instead of a text to split.
+    """
+
+    def __init__(self, text: Optional[str] = None, terms: Optional[List[str]] = None):
+        self.terms = split_terms(text) if terms is None else list(dict.fromkeys(t.lower() for t in terms))
+        self._automaton = None
+        if ahocorasick is not None and len(self.terms) > 1:
+            automaton = ahocorasick.Automaton()
+            for i, term in enumerate(self.terms):
+                automaton.add_word(term, i)
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def _scan(self, values: pd.Series) -> np.ndarray:
+        """Hit matrix for a series of lower-cased strings (missing values never hit)"""
+        hits = np.zeros((len(values), len(self.terms)), dtype=bool)
+        if self._automaton is not None:
+            for row, value in enumerate(values.tolist()):
+                if isinstance(value, str):
+                    for _, term in self._automaton.iter(value):
+                        hits[row, term] = True
+        else:
+            for i, term in enumerate(self.terms):
+                hits[:, i] = values.str.contains(term, regex=False, na=False).to_numpy(dtype=bool)
+        return hits
+
+    def term_hits(self, series: pd.Series) -> np.ndarray:
+        """Which terms each value contains; categorical series scan their categories once"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            category_hits = self._scan(pd.Series(series.cat.categories.astype(str)).str.lower())
+            # Code -1 (missing) picks the trailing all-False row
+            category_hits = np.vstack([category_hits, np.zeros((1, len(self.terms)), dtype=bool)])
+            return category_hits[series.cat.codes.to_numpy()]
+        if not pd.api.types.is_string_dtype(series.dtype):
+            series = series.astype(str)
+        return self._scan(series.str.lower())
+
+    def text_hits(self, texts: List[Optional[str]]) -> np.ndarray:
+        """Hit matrix for a list of raw texts"""
+        return self._scan(pd.Series(texts, dtype=object).str.lower())
+
+    def matches(self, series: pd.Series) -> pd.Series:
+        """Rows whose value contains every term"""
+        return pd.Series(self.term_hits(series).all(axis=1), index=series.index)
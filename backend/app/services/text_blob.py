@@ -0,0 +1,84 @@
+import mmap
+import tempfile
+import threading
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Per-row location of a text value in the blob; length -1 marks a missing value
+TEXT_OFFSET_COLUMN = "_text_offset"
+TEXT_LENGTH_COLUMN = "_text_length"
+# Smallest size of the backing file; it doubles whenever an append outgrows it
+MIN_CAPACITY = 1 << 20
+
+
+class TextBlob:
+    """Append-only store of long text values in a memory-mapped file.
+
+    Values are written as UTF-8 into an anonymous temporary file and read
+    back through ``mmap``, so only the pages of the rows actually read are
+    brought into memory. Callers keep the (offset, length) pair returned by
+    ``append`` for each row; updated rows simply get a new pair. The file is
+    grown in doubling steps and mapped whole, so appends that fit write
+    through the current map and only the others replace (and close) it.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(prefix="cbirc_text_")
+        self._size = 0
+        self._capacity = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def append(self, values: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+        """Append values and return their offsets and lengths"""
+        offsets, lengths, chunks = [], [], []
+        position = self._size
+        for value in values:
+            if value is None or (not isinstance(value, str) and pd.isna(value)):
+                offsets.append(0)
+                lengths.append(-1)
+                continue
+            data = str(value).encode("utf-8")
+            offsets.append(position)
+            lengths.append(len(data))
+            chunks.append(data)
+            position += len(data)
+
+        with self._lock:
+            if chunks:
+                self._file.seek(self._size)
+                self._file.write(b"".join(chunks))
+                if position > self._capacity:
+                    self._capacity = max(MIN_CAPACITY, 2 * position)
+                    self._file.truncate(self._capacity)
+                self._file.flush()
+                self._size = position
+                if self._mm is None or len(self._mm) < self._capacity:
+                    previous = self._mm
+                    self._mm = mmap.mmap(self._file.fileno(), self._capacity, access=mmap.ACCESS_READ)
+                    if previous is not None:
+                        previous.close()
+        return np.asarray(offsets, dtype="int64"), np.asarray(lengths, dtype="int64")
+
+    def get(self, offset: int, length: int) -> Optional[str]:
+        if length < 0:
+            return None
+        mm = self._mm
+        if mm is None:
+            return ""
+        try:
+            return mm[offset:offset + length].decode("utf-8")
+        except ValueError:
+            # The map was replaced and closed by a concurrent append
+            return self._mm[offset:offset + length].decode("utf-8")
+
+    def take(self, offsets: np.ndarray, lengths: np.ndarray) -> list:
+        """Decode the values at the given locations"""
+        return [self.get(int(o), int(n)) for o, n in zip(offsets, lengths)]
+
@@ -0,0 +1,204 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.ngram_index import BUILD_CHUNK_CHARS, MAX_ROWS, ROW_BITS, _sorted_unique
+
+_ROW_MASK = np.uint64(MAX_ROWS - 1)
+# Posting lists keep only their highest-weight rows (impact ordering), which
+# bounds both memory and the work per query bigram
+MAX_POSTINGS = 2000
+# Bigrams kept per document for more-like-this, and used per query
+DOC_FEATURES = 48
+QUERY_FEATURES = 48
+
+
+def _bigram_counts(texts: Sequence[Optional[str]], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(rows, bigram codes, occurrence counts) of texts, sorted by bigram then row"""
+    lowered = [text.lower() if text else "" for text in texts]
+    lengths = np.fromiter((len(text) for text in lowered), dtype=np.int64, count=len(lowered))
+    empty = np.empty(0, dtype=np.uint64)
+    if not lengths.sum():
+        return empty, empty, np.empty(0, dtype=np.int64)
+    joined = "\x00".join(lowered) + "\x00"
+    points = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    owners = np.repeat(rows.astype(np.uint64), lengths + 1)
+    first, second = points[:-1], points[1:]
+    # Bigrams touching the separator or whitespace carry no meaning
+    valid = (first > 32) & (second > 32)
+    keys = np.sort((((first << np.uint64(21)) | second) << np.uint64(ROW_BITS) | owners[:-1])[valid])
+    if not len(keys):
+        return empty, empty, np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(starts, len(keys)))
+    keys = keys[starts]
+    return keys & _ROW_MASK, keys >> np.uint64(ROW_BITS), counts
+
+
+def _chunked_counts(texts: Sequence[Optional[str]], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    parts = []
+    start = 0
+    while start < len(texts):
+        end, chars = start, 0
+        while end < len(texts) and chars < BUILD_CHUNK_CHARS:
+            chars += len(texts[end] or "") + 1
+            end += 1
+        parts.append(_bigram_counts(texts[start:end], rows[start:end]))
+        start = end
+    if not parts:
+        empty = np.empty(0, dtype=np.uint64)
+        return empty, empty, np.empty(0, dtype=np.int64)
+    return tuple(np.concatenate(part) for part in zip(*parts))
+
+
+def _group_ranks(groups: np.ndarray) -> np.ndarray:
+    """Position of each element inside its run of equal (sorted) group values"""
+    if not len(groups):
+        return np.empty(0, dtype=np.int64)
+    starts = np.concatenate(([True], groups[1:] != groups[:-1]))
+    run_start = np.maximum.accumulate(np.where(starts, np.arange(len(groups)), 0))
+    return np.arange(len(groups)) - run_start
+
+
+class _Postings:
+    """Impact-ordered posting lists of one build or incremental update"""
+
+    def __init__(self, features: np.ndarray, rows: np.ndarray, weights: np.ndarray, vocabulary: int):
+        order = np.lexsort((-weights, features))
+        features, rows, weights = features[order], rows[order], weights[order]
+        keep = _group_ranks(features) < MAX_POSTINGS
+        features = features[keep]
+        self.offsets = np.searchsorted(features, np.arange(vocabulary + 1)).astype(np.int64)
+        self.rows = rows[keep].astype(np.int32)
+        self.weights = weights[keep].astype(np.float32)
+
+    def get(self, feature: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.offsets[feature], self.offsets[feature + 1]
+        return self.rows[start:end], self.weights[start:end]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.rows.nbytes + self.weights.nbytes)
+
+
+class VectorIndex:
+    """TF-IDF vectors of character bigrams for "similar cases" search.
+
+    Each document is a sublinear-tf x idf weighted, L2-normalized vector over
+    the bigram vocabulary of the build. Instead of the full sparse matrix the
+    index keeps, per bigram, the MAX_POSTINGS documents where it weighs most,
+    and per document its DOC_FEATURES heaviest bigrams. A query scores
+    documents through the postings of its own heaviest bigrams, an
+    approximate cosine similarity that favors the distinctive terms.
+
+    Rows added later are vectorized with the build's vocabulary and idf into
+    extra postings; bigrams unseen at build time are ignored until the next
+    full build.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.vocabulary = np.empty(0, dtype=np.uint64)
+        self.idf = np.empty(0, dtype=np.float32)
+        self.doc_features = np.empty((0, DOC_FEATURES), dtype=np.int32)
+        self.doc_weights = np.empty((0, DOC_FEATURES), dtype=np.float32)
+        self._postings: List[_Postings] = []
+
+    @classmethod
+    def build(cls, texts: Sequence[Optional[str]], rows: int) -> "VectorIndex":
+        """Index texts given in view row order"""
+        if rows >= MAX_ROWS:
+            raise ValueError(f"Vector index supports at most {MAX_ROWS} rows")
+        index = cls()
+        positions = np.arange(rows, dtype=np.int64)
+        doc_rows, bigrams, counts = _chunked_counts(texts, positions)
+        index.vocabulary = _sorted_unique(bigrams)
+        features = np.searchsorted(index.vocabulary, bigrams)
+        df = np.bincount(features, minlength=len(index.vocabulary))
+        index.idf = (np.log((rows + 1) / (df + 1)) + 1).astype(np.float32)
+        index._add_vectors(doc_rows.astype(np.int64), features, counts, rows)
+        return index
+
+    def add(self, texts: Sequence[Optional[str]], positions: np.ndarray):
+        """Vectorize texts of rows appended to the view at the given positions"""
+        if not len(positions):
+            return
+        if int(positions.max()) >= MAX_ROWS:
+            raise ValueError(f"Vector index supports at most {MAX_ROWS} rows")
+        doc_rows, bigrams, counts = _chunked_counts(texts, positions)
+        features = np.searchsorted(self.vocabulary, bigrams)
+        known = features < len(self.vocabulary)
+        known[known] = self.vocabulary[features[known]] == bigrams[known]
+        self._add_vectors(doc_rows[known].astype(np.int64), features[known], counts[known],
+                          max(self.rows, int(positions.max()) + 1))
+
+    def _add_vectors(self, doc_rows: np.ndarray, features: np.ndarray, counts: np.ndarray, rows: int):
+        weights = (1 + np.log(counts)) * self.idf[features]
+        norms = np.sqrt(np.bincount(doc_rows, weights ** 2, minlength=rows))
+        weights = weights / norms[doc_rows]
+        self._postings.append(_Postings(features, doc_rows, weights, len(self.vocabulary)))
+
+        if rows > len(self.doc_features):
+            grow = rows - len(self.doc_features)
+            self.doc_features = np.vstack([self.doc_features, np.full((grow, DOC_FEATURES), -1, dtype=np.int32)])
+            self.doc_weights = np.vstack([self.doc_weights, np.zeros((grow, DOC_FEATURES), dtype=np.float32)])
+        order = np.lexsort((-weights, doc_rows))
+        doc_rows, features, weights = doc_rows[order], features[order], weights[order]
+        ranks = _group_ranks(doc_rows)
+        keep = ranks < DOC_FEATURES
+        self.doc_features[doc_rows[keep], ranks[keep]] = features[keep]
+        self.doc_weights[doc_rows[keep], ranks[keep]] = weights[keep]
+        self.rows = rows
+
+    def _query_vector(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        doc_rows, bigrams, counts = _bigram_counts([text], np.zeros(1, dtype=np.int64))
+        features = np.searchsorted(self.vocabulary, bigrams)
+        known = features < len(self.vocabulary)
+        known[known] = self.vocabulary[features[known]] == bigrams[known]
+        features, counts = features[known], counts[known]
+        weights = (1 + np.log(counts)) * self.idf[features]
+        top = np.argsort(-weights, kind="stable")[:QUERY_FEATURES]
+        return features[top], weights[top] / (np.sqrt((weights ** 2).sum()) or 1)
+
+    def _top(self, features: np.ndarray, weights: np.ndarray, k: int,
+             allowed: Optional[np.ndarray], exclude: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        rows, scores = [], []
+        for feature, weight in zip(features.tolist(), weights.tolist()):
+            for postings in self._postings:
+                posting_rows, posting_weights = postings.get(feature)
+                rows.append(posting_rows)
+                scores.append(posting_weights * weight)
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        totals = np.bincount(np.concatenate(rows), np.concatenate(scores), minlength=self.rows)
+        if allowed is not None:
+            totals[~allowed[:len(totals)]] = 0
+        if exclude is not None and exclude < len(totals):
+            totals[exclude] = 0
+        hits = np.flatnonzero(totals > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-totals[hits], k - 1)[:k]]
+        hits = hits[np.lexsort((hits, -totals[hits]))]
+        return hits, totals[hits]
+
+    def search(self, text: str, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """View positions of the k rows most similar to a text, and their scores.
+        allowed is an optional boolean mask over view positions.
+        """
+        features, weights = self._query_vector(text)
+        return self._top(features, weights, k, allowed, None)
+
+    def similar(self, position: int, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """The k rows most similar to the row at a view position (excluding it)"""
+        if position >= len(self.doc_features):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        features, weights = self.doc_features[position], self.doc_weights[position]
+        present = features >= 0
+        return self._top(features[present][:QUERY_FEATURES], weights[present][:QUERY_FEATURES], k, allowed, position)
+
+    @property
+    def nbytes(self) -> int:
+        return int(
+            self.vocabulary.nbytes + self.idf.nbytes + self.doc_features.nbytes + self.doc_weights.nbytes
+            + sum(postings.nbytes for postings in self._postings)
+        )
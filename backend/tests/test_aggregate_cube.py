@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DISABLE_DATABASE", "true")
+
+import pandas as pd
+import pytest
+
+from app.services.case_service import case_service
+from app.services.case_store import case_store
+
+
+@pytest.fixture
+def data_folder(tmp_path, monkeypatch):
+    pd.DataFrame([
+        dict(title="t1", subtitle="s1", date="2024-01-05 10:00:00.0", doc="d1", id=1),
+        dict(title="t2", subtitle="s2", date="2024-01-20 10:00:00.0", doc="d2", id=2),
+        # No category row: no province, industry or category
+        dict(title="t3", subtitle="s3", date="2024-02-03 10:00:00.0", doc="d3", id=3),
+        # No publication date
+        dict(title="t4", subtitle="s4", date="", doc="d4", id=4),
+    ]).to_csv(tmp_path / "cbircdtlbenji_20240101000000.csv", index=False)
+    pd.DataFrame([
+        dict(id=1, amount=100.0, industry="银行", category="贷款", province="北京"),
+        dict(id=2, amount=300.0, industry="保险", category="内控", province="上海"),
+        dict(id=4, amount=None, industry="银行", category="贷款", province="北京"),
+    ]).to_csv(tmp_path / "cbirccat20240101.csv", index=False)
+    monkeypatch.setattr(case_service, "local_data_folder", str(tmp_path))
+    monkeypatch.setattr(case_service, "_overview", None)
+    case_store.invalidate()
+    yield tmp_path
+    case_store.invalidate()
+
+
+def test_stats_skip_cases_without_province_or_date(data_folder):
+    regional = asyncio.run(case_service.get_regional_stats())
+    assert [(r.province, r.count, r.amount, r.avg_amount) for r in regional] == [
+        ("北京", 2, 100.0, 100.0),
+        ("上海", 1, 300.0, 300.0),
+    ]
+
+    trends = asyncio.run(case_service.get_monthly_trends())
+    assert [(t.month, t.count, t.amount) for t in trends] == [("2024-01", 2, 400.0), ("2024-02", 1, 0.0)]
+
+    stats = asyncio.run(case_service.get_case_stats())
+    assert stats.total_cases == 4
+    assert stats.by_province == {"北京": 2, "上海": 1}
+    assert stats.by_month == {"2024-01": 2, "2024-02": 1, "": 1}
+    assert stats.date_range == {"start": "2024-01-05", "end": "2024-02-03"}
+
+    classification = asyncio.run(case_service.get_classification_stats())
+    assert classification["categorized_cases"] == 3
+    assert classification["uncategorized_cases"] == 1
+    assert classification["monthly_stats"] == {
+        "2024-01": {"total": 2, "categorized": 2},
+        "2024-02": {"total": 1, "categorized": 0},
+    }
+
+
+def test_incremental_update_matches_rebuild(data_folder):
+    asyncio.run(case_service.get_case_view())
+    pd.DataFrame([
+        dict(title="t5", subtitle="s5", date="2024-03-01 10:00:00.0", doc="d5", id=5),
+    ]).to_csv(data_folder / "cbircdtlbenji_20240301000000.csv", index=False)
+    pd.DataFrame([
+        dict(id=3, amount=50.0, industry="银行", category="贷款", province="上海"),
+    ]).to_csv(data_folder / "cbirccat20240301.csv", index=False)
+
+    updated = asyncio.run(case_service.get_regional_stats())
+    assert case_store.incremental_updates
+    case_store.invalidate()
+    rebuilt = asyncio.run(case_service.get_regional_stats())
+    assert updated == rebuilt
+    assert [(r.province, r.count) for r in rebuilt] == [("上海", 2), ("北京", 2)]
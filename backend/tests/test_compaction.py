@@ -0,0 +1,96 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.compaction_service import CompactionService, _month_keys
+
+
+def write_fragment(folder, stamp, rows):
+    path = folder / f"cbircdtlbenji_{stamp}.csv"
+    pd.DataFrame(rows, columns=["title", "subtitle", "date", "doc", "id"]).to_csv(path, index=False)
+    return path
+
+
+def read_segments(folder):
+    segments = {}
+    for path in sorted(glob.glob(os.path.join(folder, "cbircdtlbenji-seg*.csv"))):
+        month = os.path.basename(path)[len("cbircdtlbenji-seg"):-len(".csv")]
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        segments[month] = list(zip(df["id"], df["title"]))
+    return segments
+
+
+@pytest.fixture
+def service():
+    return CompactionService()
+
+
+def test_month_keys_parse_each_date_format():
+    df = pd.DataFrame({"date": ["2024-01-05 10:00:00.0", "2024-02-03", "2024年3月1日", "2024/04/07", None, "无"]})
+    assert _month_keys(df).tolist() == ["202401", "202402", "202403", "202404", "000000", "000000"]
+    assert _month_keys(pd.DataFrame({"title": ["t"]})).tolist() == ["000000"]
+
+
+def test_compaction_splits_fragments_by_month(tmp_path, service):
+    write_fragment(tmp_path, "20240301000000", [
+        ("t1", "s1", "2024-01-05 10:00:00.0", "d1", "1"),
+        ("t2", "s2", "2024-02-03", "d2", "2"),
+        ("t3", "s3", "2024年3月1日", "d3", "3"),
+        ("t4", "s4", "", "d4", "4"),
+    ])
+    result = service.compact(str(tmp_path), "benji", min_age_seconds=0)
+    assert result["prefixes"]["cbircdtlbenji"]["rows"] == 4
+    assert read_segments(tmp_path) == {
+        "000000": [("4", "t4")],
+        "202401": [("1", "t1")],
+        "202402": [("2", "t2")],
+        "202403": [("3", "t3")],
+    }
+    assert not glob.glob(os.path.join(tmp_path, "cbircdtlbenji_*.csv"))
+
+
+def test_compaction_is_idempotent(tmp_path, service):
+    write_fragment(tmp_path, "20240201000000", [
+        ("t1", "s1", "2024-01-05 10:00:00.0", "d1", "1"),
+        ("t2", "s2", "2024-02-03 10:00:00.0", "d2", "2"),
+    ])
+    service.compact(str(tmp_path), "benji", min_age_seconds=0)
+    before = read_segments(tmp_path)
+    mtimes = {path: os.path.getmtime(path) for path in glob.glob(os.path.join(tmp_path, "*.csv"))}
+
+    result = service.compact(str(tmp_path), "benji", min_age_seconds=0)
+    assert result["prefixes"]["cbircdtlbenji"] == {"fragments": 0, "rows": 0, "segments_written": []}
+    assert read_segments(tmp_path) == before
+    assert {path: os.path.getmtime(path) for path in glob.glob(os.path.join(tmp_path, "*.csv"))} == mtimes
+
+    # Compacting a fragment that repeats existing rows changes nothing
+    write_fragment(tmp_path, "20240202000000", [("t1", "s1", "2024-01-05 10:00:00.0", "d1", "1")])
+    service.compact(str(tmp_path), "benji", min_age_seconds=0)
+    assert read_segments(tmp_path) == before
+
+
+def test_newest_row_wins(tmp_path, service):
+    write_fragment(tmp_path, "20240201000000", [
+        ("t1", "s1", "2024-01-05 10:00:00.0", "d1", "1"),
+        ("t2", "s2", "2024-01-20 10:00:00.0", "d2", "2"),
+    ])
+    write_fragment(tmp_path, "20240202000000", [("t1 v2", "s1", "2024-01-05 10:00:00.0", "d1", "1.0")])
+    service.compact(str(tmp_path), "benji", min_age_seconds=0)
+    assert read_segments(tmp_path) == {"202401": [("2", "t2"), ("1.0", "t1 v2")]}
+
+    # A later fragment updates a compacted row and moves another to a new month
+    write_fragment(tmp_path, "20240301000000", [
+        ("t2 v2", "s2", "2024-01-20 10:00:00.0", "d2", "2"),
+        ("t1 v3", "s1", "2024-02-01 10:00:00.0", "d1", "1"),
+    ])
+    service.compact(str(tmp_path), "benji", min_age_seconds=0)
+    assert read_segments(tmp_path) == {"202401": [("2", "t2 v2")], "202402": [("1", "t1 v3")]}
+
+
+def test_recent_fragments_are_left_alone(tmp_path, service):
+    write_fragment(tmp_path, "20240201000000", [("t1", "s1", "2024-01-05 10:00:00.0", "d1", "1")])
+    result = service.compact(str(tmp_path), "benji")
+    assert result["prefixes"]["cbircdtlbenji"]["fragments"] == 0
+    assert read_segments(tmp_path) == {}
@@ -0,0 +1,62 @@
+import numpy as np
+
+from app.services.near_duplicates import MAX_DISTANCE, NearDuplicateIndex, _popcount, fingerprint
+
+TAIL = (
+    "当事人如不服本行政处罚决定，可在收到本处罚决定书之日起60日内向中国银行保险监督管理委员会申请行政复议，"
+    "也可在收到本处罚决定书之日起6个月内直接向有管辖权的人民法院提起行政诉讼。复议和诉讼期间，上述决定不停止执行。"
+)
+
+
+def decision(number, person, amount):
+    branch = "中国银行股份有限公司北京西城支行"
+    law = "《中华人民共和国银行业监督管理法》"
+    return (
+        f"中国银保监会北京监管分局行政处罚决定书 京银保监罚决字〔2023〕{number}号 "
+        f"当事人：{branch} 主要负责人：{person} "
+        f"经查，{branch}存在以下违法违规行为：贷款管理不审慎，贷后管理不到位。"
+        f"上述行为违反了{law}第二十一条、第四十六条的规定。"
+        f"根据{law}第四十六条，我分局决定对{branch}处以罚款人民币{amount}万元。" + TAIL
+    )
+
+
+def clustered(texts):
+    index = NearDuplicateIndex()
+    index.update(texts, np.arange(len(texts)), len(texts))
+    # Earlier rows are preferred
+    index.cluster(np.arange(len(texts))[::-1].copy())
+    return index
+
+
+def test_templated_decisions_of_different_cases_are_not_flagged():
+    texts = [decision(12, "张强", 50), decision(10, "李芳", 50)]
+    signatures, _, _, valid = fingerprint(texts)
+    assert valid.all()
+    # Close enough in SimHash to be candidates
+    assert _popcount(signatures[:1] ^ signatures[1:])[0] <= MAX_DISTANCE
+
+    index = clustered(texts)
+    assert not index.duplicate_mask.any()
+    assert index.clusters() == []
+
+
+def test_republished_decision_is_flagged():
+    original = decision(12, "张强", 50)
+    republished = original.replace("，", ",").replace(" ", "\n") + "。"
+    texts = [original, decision(10, "李芳", 50), republished, None]
+    index = clustered(texts)
+    assert index.duplicate_mask.tolist() == [False, False, True, False]
+    assert [cluster.tolist() for cluster in index.clusters()] == [[0, 2]]
+    assert index.duplicate_of(np.array([1, 2])).tolist() == [-1, -1]
+    assert index.duplicate_of(np.array([1, 2]), kept=np.array([0])).tolist() == [-1, 0]
+
+
+def test_incremental_update_matches_rebuild():
+    texts = [decision(number, "张强", 30) for number in range(1, 6)]
+    index = clustered(texts)
+    texts.append(texts[3] + " ")
+    index.update(texts[5:], np.array([5]), len(texts))
+    index.cluster(np.arange(len(texts))[::-1].copy())
+    rebuilt = clustered(texts)
+    assert index.labels.tolist() == rebuilt.labels.tolist()
+    assert [cluster.tolist() for cluster in index.clusters()] == [[3, 5]]
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DISABLE_DATABASE", "true")
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.online import _cursor_filter, _encode_cursor
+
+
+def matches(doc, query):
+    """MongoDB matching for the operators _cursor_filter uses: $or, equality
+    (None also matches a missing field) and $lt, which never matches null"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = doc.get(key)
+            if value is None or not value < condition["$lt"]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+def sort_key(doc):
+    # ONLINE_SORT: 发布日期 then id, both descending; null dates sort lowest
+    date = doc.get("发布日期")
+    return (date is not None, date or datetime.min, doc["id"])
+
+
+DOCS = [
+    {"id": 1, "发布日期": datetime(2024, 1, 5)},
+    {"id": 2, "发布日期": datetime(2024, 1, 5)},
+    {"id": 3, "发布日期": datetime(2024, 1, 5)},
+    {"id": 4, "发布日期": datetime(2024, 2, 1)},
+    {"id": 5, "发布日期": None},
+    {"id": 6},
+    {"id": 7, "发布日期": datetime(2023, 12, 31)},
+    {"id": 8, "发布日期": None},
+    {"id": 9, "发布日期": datetime(2024, 1, 5)},
+]
+
+
+def pages(docs, page_size):
+    ordered = sorted(docs, key=sort_key, reverse=True)
+    cursor = None
+    while True:
+        selected = [d for d in ordered if cursor is None or matches(d, _cursor_filter(cursor))]
+        page = selected[:page_size]
+        if not page:
+            return
+        yield page
+        cursor = _encode_cursor(page[-1])
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 4, 10])
+def test_cursor_pages_cover_every_document_once(page_size):
+    ids = [doc["id"] for page in pages(DOCS, page_size) for doc in page]
+    assert ids == [doc["id"] for doc in sorted(DOCS, key=sort_key, reverse=True)]
+    assert ids == [4, 9, 3, 2, 1, 7, 8, 6, 5]
+
+
+def test_cursor_after_equal_dates_continues_by_id():
+    query = _cursor_filter(_encode_cursor({"id": 3, "发布日期": datetime(2024, 1, 5)}))
+    assert sorted(d["id"] for d in DOCS if matches(d, query)) == [1, 2, 5, 6, 7, 8]
+
+
+def test_cursor_inside_missing_dates_stays_there():
+    query = _cursor_filter(_encode_cursor({"id": 6}))
+    assert sorted(d["id"] for d in DOCS if matches(d, query)) == [5]
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "", "W10="])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        _cursor_filter(cursor)
+    assert error.value.status_code == 400
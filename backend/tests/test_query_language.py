@@ -0,0 +1,86 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DISABLE_DATABASE", "true")
+
+import numpy as np
+import pytest
+
+from app.services.query_language import And, Not, Or, QuerySyntaxError, Range, Term, parse_query
+
+
+@pytest.mark.parametrize("query, tree", [
+    # NOT binds tighter than AND (also implied between terms), AND tighter than OR
+    ("a b OR c", "((a AND b) OR c)"),
+    ("a OR b c", "(a OR (b AND c))"),
+    ("a OR b AND c OR d", "(a OR (b AND c) OR d)"),
+    ("NOT a b", "(NOT a AND b)"),
+    ("NOT a OR b", "(NOT a OR b)"),
+    ("NOT NOT a", "NOT NOT a"),
+    ("(a OR b) c", "((a OR b) AND c)"),
+    ("NOT (a OR b) AND c", "(NOT (a OR b) AND c)"),
+    ("a (b OR (c d))", "(a AND (b OR (c AND d)))"),
+    ('people:某银行 "违规 发放" NOT 撤销', '(people:某银行 AND "违规 发放" AND NOT 撤销)'),
+    # Unknown prefixes and lower-case operators are plain words
+    ("10:30 and 会议", "(10:30 AND and AND 会议)"),
+])
+def test_precedence(query, tree):
+    assert parse_query(query).describe() == tree
+
+
+def test_node_types():
+    node = parse_query('TITLE:"行政 处罚" OR law:保险法 NOT amount:>100000')
+    assert isinstance(node, Or)
+    title, rest = node.children
+    assert isinstance(title, Term) and (title.field, title.text, title.phrase) == ("title", "行政 处罚", True)
+    assert isinstance(rest, And)
+    law, negated = rest.children
+    assert isinstance(law, Term) and (law.field, law.text, law.phrase) == ("law", "保险法", False)
+    assert isinstance(negated, Not) and isinstance(negated.child, Range)
+
+
+@pytest.mark.parametrize("query, low, high", [
+    ("amount:50000", 50000.0, 50000.0),
+    ("amount:1万..5万", 10000.0, 50000.0),
+    ("amount:..2亿", None, 200000000.0),
+    ("amount:>=3万", 30000.0, None),
+    ("amount:<=50000", None, 50000.0),
+    ("date:2023", np.datetime64("2023-01-01"), np.datetime64("2023-12-31")),
+    ("date:2024-02", np.datetime64("2024-02-01"), np.datetime64("2024-02-29")),
+    ("date:2023-01..2023-06", np.datetime64("2023-01-01"), np.datetime64("2023-06-30")),
+    ("date:>2023-12", np.datetime64("2024-01-01"), None),
+    ("date:<2023/01/05", None, np.datetime64("2023-01-04")),
+])
+def test_ranges(query, low, high):
+    node = parse_query(query)
+    assert isinstance(node, Range)
+    assert (node.low, node.high) == (low, high)
+
+
+def test_strict_amount_bounds_exclude_the_value():
+    assert parse_query("amount:>100").low > 100
+    assert parse_query("amount:<100").high < 100
+
+
+@pytest.mark.parametrize("query, message", [
+    ("", "Empty query"),
+    ("   ", "Empty query"),
+    ('""', "Empty query"),
+    ("(a OR b", "Missing ')'"),
+    ("a OR b)", "Unexpected ')'"),
+    ("a AND", "Query ends where a term is expected"),
+    ("NOT", "Query ends where a term is expected"),
+    ("OR a", "Unexpected OR"),
+    ("()", "Unexpected )"),
+    ('"违规 发放', "Unterminated quoted phrase"),
+    ("title:", "Missing value for field title"),
+    ("amount:abc", "Invalid amount: abc"),
+    ("amount:..", "Empty range: amount:.."),
+    ("date:2023-13", "Invalid date: 2023-13"),
+    ('date:"2023"', "Field date takes a range, not a phrase"),
+])
+def test_syntax_errors(query, message):
+    with pytest.raises(QuerySyntaxError) as error:
+        parse_query(query)
+    assert str(error.value) == message
+    assert isinstance(error.value, ValueError)
@@ -0,0 +1,96 @@
+import ast
+import glob
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from app.services.csv_reader import read_csv_files
+from app.services.snapshot_store import snapshot_store
+
+DBCBIRC = os.path.join(os.path.dirname(__file__), "..", "..", "dbcbirc.py")
+
+
+def _streamlit_readers():
+    """The CSV readers of the Streamlit app; dbcbirc itself needs docx and
+    streamlit, so only these functions are loaded from its source."""
+    with open(DBCBIRC, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = {"read_csvlist", "restore_csvdtypes", "get_snapshotparts", "get_csvdf"}
+    module = ast.Module(
+        body=[node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name in names],
+        type_ignores=[],
+    )
+    namespace = {"glob": glob, "json": json, "os": os, "pd": pd}
+    exec(compile(module, DBCBIRC, "exec"), namespace)
+    return namespace
+
+
+@pytest.fixture
+def data_folder(tmp_path):
+    pd.DataFrame([
+        dict(title="t1", subtitle="s1", date="2024-01-05 10:00:00.0", doc="d1", id=11),
+        dict(title="t2", subtitle="s2", date="2024-01-20 10:00:00.0", doc="d2", id=12),
+    ]).to_csv(tmp_path / "cbircdtlbenji_20240101000000.csv", index=False)
+    pd.DataFrame([
+        dict(title="t3", subtitle="s3", date="2024-02-03 10:00:00.0", doc="d3", id=13),
+    ]).to_csv(tmp_path / "cbircdtljiguan_20240201000000.csv", index=False)
+    pd.DataFrame([
+        dict(id=11, amount=100.0, industry="银行", category="贷款", province="北京", flag=True),
+        dict(id=12, amount=None, industry="保险", category="内控", province="上海", flag=False),
+    ]).to_csv(tmp_path / "cbirccat20240101.csv", index=False)
+    return tmp_path
+
+
+def _add_newer_files(folder):
+    pd.DataFrame([
+        dict(title="t4", subtitle="s4", date="2024-03-01 10:00:00.0", doc="d4", id=14),
+    ]).to_csv(folder / "cbircdtlbenji_20240301000000.csv", index=False)
+    pd.DataFrame([
+        dict(id=13, amount=5, industry="银行", category="贷款", province="北京", flag=True),
+    ]).to_csv(folder / "cbirccat20240301.csv", index=False)
+
+
+def test_manifest_records_plain_csv_dtypes(data_folder):
+    manifest = snapshot_store.build(str(data_folder))
+    sources = manifest["families"]["cbirccat"]["sources"]
+    plain = pd.read_csv(data_folder / "cbirccat20240101.csv")
+    assert sources["cbirccat20240101.csv"]["dtypes"] == {name: str(dtype) for name, dtype in plain.dtypes.items()}
+    assert sources["cbirccat20240101.csv"]["rows"] == 2
+
+
+@pytest.mark.parametrize("family", ["cbircdtl", "cbirccat"])
+def test_load_round_trip(data_folder, family):
+    files = sorted(glob.glob(os.path.join(data_folder, f"{family}*.csv")))
+    expected = read_csv_files(files)
+    snapshot_store.build(str(data_folder))
+    pd.testing.assert_frame_equal(snapshot_store.load(files), expected)
+
+    # Files newer than the snapshot come from CSV and keep the schema types
+    _add_newer_files(data_folder)
+    files = sorted(glob.glob(os.path.join(data_folder, f"{family}*.csv")))
+    pd.testing.assert_frame_equal(snapshot_store.load(files), read_csv_files(files))
+
+
+@pytest.mark.parametrize("family", ["cbircdtl", "cbircdtlbenji", "cbirccat"])
+def test_streamlit_reader_matches_plain_csv(data_folder, family):
+    readers = _streamlit_readers()
+    _add_newer_files(data_folder)
+    expected = readers["get_csvdf"](str(data_folder), family)
+    assert expected["id"].dtype == "int64"
+
+    snapshot_store.build(str(data_folder))
+    assert readers["get_snapshotparts"](str(data_folder), glob.glob(os.path.join(data_folder, "*.csv")))
+    loaded = readers["get_csvdf"](str(data_folder), family)
+    assert loaded.dtypes.to_dict() == expected.dtypes.to_dict()
+    pd.testing.assert_frame_equal(loaded, expected)
+
+    # Same with files added after the snapshot was built
+    os.remove(data_folder / "cbircdtlbenji_20240301000000.csv")
+    os.remove(data_folder / "cbirccat20240301.csv")
+    snapshot_store.build(str(data_folder))
+    _add_newer_files(data_folder)
+    loaded = readers["get_csvdf"](str(data_folder), family)
+    assert loaded.dtypes.to_dict() == expected.dtypes.to_dict()
+    pd.testing.assert_frame_equal(loaded, expected)
@@ -56,10 +56,23 @@ def insert_data(df, collection):
 
 
 # get dataframes from MongoDB
-def get_data(collection):
-    # get data from MongoDB
-    df = pd.DataFrame(list(collection.find()))
-    return df
+def get_data(collection, projection=None, batch_size=10000, limit=None):
+    # 分批读取游标，每批直接转为DataFrame，避免一次性生成全部文档列表
+    cursor = collection.find({}, projection, batch_size=batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    chunks = []
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            chunks.append(pd.DataFrame(batch))
+            batch = []
+    if batch:
+        chunks.append(pd.DataFrame(batch))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
 
 
 # delete dataframes from MongoDB
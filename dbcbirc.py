@@ -322,34 +322,101 @@ def normalize_province_name(name: str) -> str:
     # Fallback
     return "未知省份"
 
-# @st.cache(allow_output_mutation=True)
-def get_csvdf(penfolder, beginwith):
-    # read parquet file if exists
-    filepath = penfolder + "/" + beginwith + ".parquet"
-    # if os.path.exists(filepath):
-    #     df = pd.read_parquet(filepath)
-    # else:
-    
-    # 只读取根目录下的文件，不递归查找子目录
-    files2 = glob.glob(os.path.join(penfolder, beginwith + "*.csv"))
-    
+# 读取 CSV 文件列表
+def read_csvlist(files):
     dflist = []
-    # filelist = []
-    for filepath in files2:
+    for filepath in files:
         try:
             pendf = pd.read_csv(filepath)
             dflist.append(pendf)
-            # filelist.append(filename)
         except Exception as e:
             print(f"读取文件 {filepath} 失败: {e}")
-    
     if len(dflist) > 0:
         df = pd.concat(dflist)
         df.reset_index(drop=True, inplace=True)
     else:
         df = pd.DataFrame()
-        # convert df to paquet
-        # df.to_parquet(penfolder + "/" + beginwith + ".parquet")
+    return df
+
+
+# 将快照中的列还原为直接读取 csv 时的列和类型 (dtypes 记录在快照清单中)
+def restore_csvdtypes(df, dtypes):
+    df = df[list(dtypes)].copy()
+    for col, dtype in dtypes.items():
+        target = pd.api.types.pandas_dtype(dtype)
+        if target.kind == "b":
+            df[col] = df[col].map(lambda v: str(v).lower() == "true").astype(bool)
+        elif target.kind in "iuf":
+            df[col] = pd.to_numeric(df[col]).astype(target)
+        elif pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype(str).where(df[col].notna())
+    return df
+
+
+# 读取快照中仍然有效的文件 (snapshot/manifest.json 由后端 /admin/build-snapshot 生成)
+def get_snapshotparts(penfolder, files):
+    manifest_path = os.path.join(penfolder, "snapshot", "manifest.json")
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            families = json.load(f).get("families", {})
+    except Exception as e:
+        print(f"读取快照清单失败: {e}")
+        return {}
+
+    parts = {}
+    for family, info in families.items():
+        sources = info.get("sources", {})
+        covered = []
+        for filepath in files:
+            name = os.path.basename(filepath)
+            meta = sources.get(name)
+            # 没有记录 dtypes 的旧清单不使用快照
+            if not name.startswith(family) or not meta or "dtypes" not in meta:
+                continue
+            stat = os.stat(filepath)
+            if stat.st_mtime_ns == meta.get("mtime_ns") and stat.st_size == meta.get("size"):
+                covered.append(name)
+        if not covered:
+            continue
+        try:
+            snapdf = pd.read_parquet(
+                os.path.join(penfolder, "snapshot", info["path"]),
+                filters=[("_source", "in", covered)],
+            )
+        except Exception as e:
+            print(f"读取快照 {family} 失败: {e}")
+            continue
+        for name, part in snapdf.groupby("_source", sort=False):
+            try:
+                parts[name] = restore_csvdtypes(part, sources[name]["dtypes"])
+            except Exception as e:
+                print(f"还原快照 {name} 的列类型失败，改为读取 csv: {e}")
+    return parts
+
+
+# @st.cache(allow_output_mutation=True)
+def get_csvdf(penfolder, beginwith):
+    # 只读取根目录下的文件，不递归查找子目录
+    files2 = sorted(glob.glob(os.path.join(penfolder, beginwith + "*.csv")))
+
+    # 快照中未变化的文件读取 parquet，其余 (新于快照的) 文件读取 csv
+    parts = get_snapshotparts(penfolder, files2)
+    dflist = []
+    for filepath in files2:
+        name = os.path.basename(filepath)
+        if name in parts:
+            dflist.append(parts[name])
+        else:
+            dflist.append(read_csvlist([filepath]))
+    dflist = [d for d in dflist if not d.empty]
+
+    if len(dflist) > 0:
+        df = pd.concat(dflist)
+        df.reset_index(drop=True, inplace=True)
+    else:
+        df = pd.DataFrame()
     return df
 
 
@@ -2147,7 +2214,7 @@ def uplink_cbircsum():
         st.success("案例数据删除成功！")
 
     # get all online data
-    online_data = get_data(collection)
+    online_data = get_data(collection, projection={"id": 1, "_id": 0})
 
     # get unique id number from online data
     online_id = online_data["id"].nunique()